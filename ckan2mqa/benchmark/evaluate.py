@@ -0,0 +1,144 @@
+"""
+Benchmark suite of the evaluator (MqaEvaluate) by phase, on synthetic DCAT-AP catalogs (benchmark.synthetic) of
+--sizes datasets:
+- parse: MqaEvaluate constructor (catalog load and indicator index)
+- counts: count_entity_property indicators
+- vocabularies: vocabulary indicators (count_values_* methods)
+- links: code=200 indicators, offline (every URL is reachable, nothing is requested)
+- shacl: DCAT-AP compliance (SHACL_MODE, SHACL_INFERENCE of the environment)
+
+Each catalog size runs in its own process and reports, by phase, the wall and CPU time, the peak RSS of the process
+at the end of the phase and the triples per second. The catalogs are generated once in --workdir (same --seed, same
+catalog), so the runs are reproducible and offline. --output writes the results as JSON, and --baseline compares
+them with the JSON of a previous run (e.g. before a change).
+
+Run from the ckan2mqa folder:
+    python -m benchmark.evaluate --sizes 1000 10000 --output /tmp/benchmark.json
+    python -m benchmark.evaluate --sizes 1000 10000 --baseline /tmp/benchmark.json
+"""
+
+# inbuilt libraries
+import os
+import sys
+import json
+import glob
+import resource
+import argparse
+import tempfile
+import subprocess
+from time import perf_counter, process_time
+
+# custom functions
+import controller.link_checker as link_checker
+from controller.link_checker import LinkResult
+from controller.mqa_evaluate import MqaEvaluate
+from config.defaults import MQA_INDICATORS
+from benchmark.synthetic import SyntheticCatalog
+
+PHASES = ['parse', 'counts', 'vocabularies', 'links', 'shacl']
+PHASE_METHODS = {
+    'counts': ['count_entity_property'],
+    'vocabularies': ['count_values_containing_vocabulary', 'count_values_contained_in_vocabulary'],
+    'links': ['count_urls_with_200_code'],
+    'shacl': ['shacl'],
+}
+
+
+def offline_check_urls(urls, on_result=None, **kwargs):
+    results = {}
+    for url in urls:
+        results[str(url)] = LinkResult(str(url), True, 200, None)
+        if on_result is not None:
+            on_result(results[str(url)])
+    return results
+
+def catalog_file(workdir, datasets, seed, app_dir):
+    filename = os.path.join(workdir, f"synthetic_{datasets}_{seed}.nt")
+    if not os.path.exists(filename):
+        os.makedirs(workdir, exist_ok=True)
+        SyntheticCatalog(datasets, app_dir, seed=seed).write(f"{filename}.tmp.nt")
+        os.replace(f"{filename}.tmp.nt", filename)
+    return filename
+
+def measure(phase, function):
+    start, cpu_start = perf_counter(), process_time()
+    result = function()
+    elapsed = perf_counter() - start
+    timing = {
+        'phase': phase,
+        'seconds': round(elapsed, 2),
+        'cpu_seconds': round(process_time() - cpu_start, 2),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    return timing, result
+
+def run_phases(catalog, phases, version, app_dir):
+    link_checker.check_urls = offline_check_urls
+    link_checker.open_url_cache = lambda: None
+    shapes = f"{app_dir}/ckan2mqa/assets/{version}/dcat-ap_{version}_shacl_"
+    vocabulary = glob.glob(f"{shapes}mdr-vocabularies.shape*.ttl")[0]
+
+    with tempfile.TemporaryDirectory() as folder:
+        timing, evaluation = measure('parse', lambda: MqaEvaluate(
+            catalog, 'benchmark', folder, f"{shapes}shapes.ttl", vocabulary, f"{shapes}deprecateduris.ttl", app_dir, 'nt'))
+        triples = len(evaluation.graph)
+        timings = [timing]
+        evaluation.write_header()
+        for phase in phases:
+            if phase == 'parse':
+                continue
+            functions = [info['function'] for info in MQA_INDICATORS.values() if info['count_method'] in PHASE_METHODS[phase]]
+            timing, _ = measure(phase, lambda: [getattr(evaluation, function)() for function in functions])
+            timings.append(timing)
+        evaluation.write_total()
+        evaluation.close()
+    for timing in timings:
+        timing['triples_per_second'] = round(triples / timing['seconds']) if timing['seconds'] else None
+    return {'triples': triples, 'datasets': evaluation.datasetCount, 'distributions': evaluation.distributionCount, 'phases': timings}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000], help='datasets of each catalog (e.g. 1000 10000 100000)')
+    parser.add_argument('--phases', nargs='*', default=PHASES, choices=PHASES)
+    parser.add_argument('--version', default='2.1.1', help='DCAT-AP version of the shapes')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'ckan2mqa_benchmark'), help='folder of the generated catalogs')
+    parser.add_argument('--app-dir', default=os.path.dirname(os.getcwd()), help='folder of ckan2mqa/assets (default: parent folder)')
+    parser.add_argument('--output', help='JSON file of the results')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare with')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_phases(args.child, args.phases, args.version, args.app_dir)))
+        return
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = {(run['size'], timing['phase']): timing for run in json.load(baseline_file) for timing in run['phases']}
+
+    runs = []
+    print('\t'.join(['datasets', 'triples', 'phase', 'seconds', 'cpu_seconds', 'peak_rss_mb', 'triples_per_second'] + (['vs_baseline'] if baseline else [])))
+    for size in args.sizes:
+        catalog = catalog_file(args.workdir, size, args.seed, args.app_dir)
+        child = subprocess.run([sys.executable, '-m', 'benchmark.evaluate', '--child', catalog, '--phases', *args.phases,
+                                '--version', args.version, '--app-dir', args.app_dir], capture_output=True, text=True)
+        if child.returncode != 0:
+            print(f"{size}: failed\n{child.stderr.strip()[-2000:]}")
+            continue
+        run = {'size': size, **json.loads(child.stdout.strip().splitlines()[-1])}
+        runs.append(run)
+        for timing in run['phases']:
+            row = [size, run['triples'], timing['phase'], timing['seconds'], timing['cpu_seconds'], timing['peak_rss_mb'], timing['triples_per_second']]
+            previous = baseline.get((size, timing['phase']))
+            if baseline:
+                row.append(f"x{round(previous['seconds'] / timing['seconds'], 2)}" if previous and timing['seconds'] else '-')
+            print('\t'.join(str(value) for value in row))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(runs, output_file, indent=2)
+
+if __name__ == "__main__":
+    main()
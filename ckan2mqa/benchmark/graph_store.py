@@ -0,0 +1,119 @@
+"""
+Benchmark of the graph stores (GRAPH_STORE): rdflib in-memory graph ('memory') against the on-disk SQLite store
+('sqlite'), loading a synthetic DCAT catalog of --triples triples (N-Triples) and computing the MQA indicator counts
+(IndicatorEngine, the walk of every evaluation).
+
+Each store runs in its own process, so the peak RSS reported is the one of that store only.
+
+Run from the ckan2mqa folder:
+    python -m benchmark.graph_store --triples 1000000
+"""
+
+# inbuilt libraries
+import os
+import sys
+import json
+import resource
+import argparse
+import tempfile
+import subprocess
+from time import perf_counter
+
+# custom functions
+from controller.graph_store import new_graph, close_graph
+from controller.indicator_engine import IndicatorEngine
+from config.defaults import MQA_INDICATORS
+
+LANGUAGES = ['en', 'es', 'de', 'fr', 'it']
+STORES = ['memory', 'sqlite']
+
+
+def dataset_triples(number, base_url='http://example.org'):
+    '''
+    N-Triples lines of one dataset with 3 distributions (40 triples)
+    '''
+    dataset = f"<{base_url}/dataset/{number}>"
+    lines = [
+        f"{dataset} <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/ns/dcat#Dataset> .",
+        f"{dataset} <http://www.w3.org/ns/dcat#keyword> \"keyword {number % 50}\" .",
+        f"{dataset} <http://www.w3.org/ns/dcat#theme> <http://publications.europa.eu/resource/authority/data-theme/{'ECON' if number % 2 else 'GOVE'}> .",
+        f"{dataset} <http://purl.org/dc/terms/publisher> <{base_url}/organization/{number % 100}> .",
+        f"{dataset} <http://purl.org/dc/terms/issued> \"2020-01-01\"^^<http://www.w3.org/2001/XMLSchema#date> .",
+        f"{dataset} <http://purl.org/dc/terms/modified> \"2021-06-{1 + number % 28:02d}\"^^<http://www.w3.org/2001/XMLSchema#date> .",
+        f"{dataset} <http://purl.org/dc/terms/accessRights> <http://publications.europa.eu/resource/authority/access-right/PUBLIC> .",
+    ]
+    for language in LANGUAGES:
+        lines.append(f"{dataset} <http://purl.org/dc/terms/title> \"Dataset {number}\"@{language} .")
+        lines.append(f"{dataset} <http://purl.org/dc/terms/description> \"Description of dataset {number}\"@{language} .")
+    for index in range(3):
+        distribution = f"<{base_url}/dataset/{number}/resource/{index}>"
+        lines += [
+            f"{dataset} <http://www.w3.org/ns/dcat#distribution> {distribution} .",
+            f"{distribution} <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/ns/dcat#Distribution> .",
+            f"{distribution} <http://www.w3.org/ns/dcat#accessURL> <{base_url}/download/{number}-{index}.csv> .",
+            f"{distribution} <http://purl.org/dc/terms/format> <http://publications.europa.eu/resource/authority/file-type/CSV> .",
+            f"{distribution} <http://www.w3.org/ns/dcat#mediaType> <http://www.iana.org/assignments/media-types/text/csv> .",
+            f"{distribution} <http://purl.org/dc/terms/license> <http://publications.europa.eu/resource/authority/licence/CC_BY_4_0> .",
+            f"{distribution} <http://www.w3.org/ns/dcat#byteSize> \"{number * 10 + index}\"^^<http://www.w3.org/2001/XMLSchema#decimal> .",
+        ]
+    return lines
+
+def write_catalog(filename, triples):
+    count = 0
+    number = 0
+    with open(filename, 'w', encoding='utf-8') as catalog_file:
+        while count < triples:
+            lines = dataset_triples(number)
+            catalog_file.write('\n'.join(lines) + '\n')
+            count += len(lines)
+            number += 1
+    return count
+
+def run_store(store, catalog, store_dir):
+    timings = {}
+    start = perf_counter()
+    graph = new_graph(store, 'benchmark', store_dir)
+    graph.parse(catalog, format='nt')
+    timings['load_seconds'] = round(perf_counter() - start, 1)
+    timings['triples'] = len(graph)
+
+    start = perf_counter()
+    engine = IndicatorEngine(graph)
+    for info in MQA_INDICATORS.values():
+        if info['count_method'] == 'count_entity_property':
+            engine.count_entity_property(info['entity'], info['property'])
+    timings['indicators_seconds'] = round(perf_counter() - start, 1)
+    timings['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    if store == 'sqlite':
+        timings['disk_mb'] = round(os.path.getsize(graph.store.path) / 2**20, 1)
+    close_graph(graph)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--triples', type=int, default=100000)
+    parser.add_argument('--stores', nargs='*', default=STORES, choices=STORES)
+    parser.add_argument('--store-dir', default=tempfile.gettempdir(), help='folder of the SQLite files')
+    parser.add_argument('--child', choices=STORES, help=argparse.SUPPRESS)
+    parser.add_argument('--catalog', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_store(args.child, args.catalog, args.store_dir)))
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        catalog = os.path.join(folder, 'catalog.nt')
+        triples = write_catalog(catalog, args.triples)
+        print(f"Catalog of {triples} triples ({round(os.path.getsize(catalog) / 2**20, 1)} MB)")
+        for store in args.stores:
+            child = subprocess.run(
+                [sys.executable, '-m', 'benchmark.graph_store', '--child', store, '--catalog', catalog, '--store-dir', args.store_dir],
+                capture_output=True, text=True)
+            if child.returncode != 0:
+                print(f"{store}: failed ({child.stderr.strip().splitlines()[-1] if child.stderr.strip() else child.returncode})")
+                continue
+            print(f"{store}: {child.stdout.strip().splitlines()[-1]}")
+
+if __name__ == "__main__":
+    main()
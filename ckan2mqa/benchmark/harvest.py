@@ -0,0 +1,217 @@
+"""
+Benchmark of the catalog harvest + load, building the graph and writing pretty-xml (default) against
+streaming the pages to N-Triples (HARVEST_STREAM).
+
+A local paged (Hydra) catalog is served with --pages pages of --items-per-page datasets. Each mode runs in
+its own process, so the peak RSS reported (after the harvest and after the load) is the one of that mode only.
+
+Run from the ckan2mqa folder:
+    python -m benchmark.harvest --pages 50 --items-per-page 100
+
+With --sparql, a local SPARQL endpoint stand-in (rdflib) is loaded with a catalog file instead, and the datasets are
+harvested with the CONSTRUCT queries of the SPARQL evaluation (SparqlConstructSource). The harvested triples are
+compared with the description of every dataset: its triples, the triples of its distributions and of every blank node
+reached from them. Exits with status 1 if they differ:
+    python -m benchmark.harvest --sparql assets/samples/dcatap-ch_catalog.ttl --batch-size 7
+"""
+
+# inbuilt libraries
+import os
+import sys
+import json
+import resource
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.server
+from time import perf_counter
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs
+
+# third-party libraries
+import rdflib
+from rdflib import RDF, BNode, Literal, Namespace, URIRef
+from rdflib.util import guess_format
+
+# custom functions
+from controller.rdf_management import download_rdf
+from controller.harvester import Harvester, SparqlSource, SparqlConstructSource
+
+DCAT = Namespace('http://www.w3.org/ns/dcat#')
+DCT = Namespace('http://purl.org/dc/terms/')
+HYDRA = Namespace('http://www.w3.org/ns/hydra/core#')
+LANGUAGES = ['en', 'es', 'de', 'fr', 'it']
+
+
+def make_page(page, pages, items_per_page, base_url='http://example.org'):
+    graph = rdflib.Graph()
+    collection = URIRef(f"{base_url}/catalog.rdf?page={page}")
+    graph.add((collection, RDF.type, HYDRA.PagedCollection))
+    graph.add((collection, HYDRA.totalItems, Literal(pages * items_per_page)))
+    graph.add((collection, HYDRA.itemsPerPage, Literal(items_per_page)))
+    for item in range(items_per_page):
+        dataset = URIRef(f"{base_url}/dataset/{page}-{item}")
+        graph.add((dataset, RDF.type, DCAT.Dataset))
+        graph.add((dataset, DCAT.keyword, Literal(f"keyword {item % 20}")))
+        for language in LANGUAGES:
+            graph.add((dataset, DCT.title, Literal(f"Dataset {page}-{item} ({language})", lang=language)))
+            graph.add((dataset, DCT.description, Literal(f"Description of dataset {page}-{item} " * 10, lang=language)))
+        for number in range(3):
+            distribution = URIRef(f"{base_url}/dataset/{page}-{item}/resource/{number}")
+            graph.add((dataset, DCAT.distribution, distribution))
+            graph.add((distribution, RDF.type, DCAT.Distribution))
+            graph.add((distribution, DCAT.accessURL, URIRef(f"{base_url}/download/{page}-{item}-{number}.csv")))
+            graph.add((distribution, DCT['format'], URIRef('http://publications.europa.eu/resource/authority/file-type/CSV')))
+    return graph.serialize(format='pretty-xml', encoding='utf-8')
+
+def serve_pages(pages):
+    class PagedCatalogHandler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            page = int(self.path.split('page=')[1]) if 'page=' in self.path else 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/rdf+xml')
+            self.send_header('Content-Length', str(len(pages[page])))
+            self.end_headers()
+            self.wfile.write(pages[page])
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), PagedCatalogHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def serve_sparql(store):
+    '''
+    SPARQL endpoint stand-in of store: query (GET or POSTed form) answered as JSON results or N-Triples (CONSTRUCT)
+    '''
+    lock = threading.Lock()
+    queries = Counter()
+
+    class SparqlHandler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def answer(self, query):
+            with lock:
+                result = store.query(query)
+                queries[result.type] += 1
+            if result.type == 'CONSTRUCT':
+                body, content_type = result.graph.serialize(format='nt', encoding='utf-8'), 'application/n-triples'
+            else:
+                body, content_type = result.serialize(format='json'), 'application/sparql-results+json'
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self.answer(parse_qs(urlsplit(self.path).query)['query'][0])
+
+        def do_POST(self):
+            length = int(self.headers['Content-Length'])
+            self.answer(parse_qs(self.rfile.read(length).decode('utf-8'))['query'][0])
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), SparqlHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, queries
+
+def dataset_descriptions(store):
+    '''
+    Triples of the datasets of store (IRIs, a blank node dataset cannot be queried by IRI), of their distributions and
+    of the blank nodes reached from them
+    '''
+    triples = set()
+    def describe(node):
+        for p, o in store.predicate_objects(node):
+            if (node, p, o) not in triples:
+                triples.add((node, p, o))
+                if isinstance(o, BNode):
+                    describe(o)
+    for dataset in store.subjects(RDF.type, DCAT.Dataset):
+        if isinstance(dataset, BNode):
+            continue
+        describe(dataset)
+        for distribution in store.objects(dataset, DCAT.distribution):
+            describe(distribution)
+    return triples
+
+def run_sparql(args):
+    '''
+    Harvests the datasets of the --sparql catalog from the endpoint stand-in, returns True if the triples match
+    '''
+    store = rdflib.Graph().parse(args.sparql, format=guess_format(args.sparql))
+    expected = dataset_descriptions(store)
+    server, queries = serve_sparql(store)
+    select = 'PREFIX dcat: <http://www.w3.org/ns/dcat#>\nSELECT DISTINCT ?s WHERE { ?s a dcat:Dataset . FILTER (isIRI(?s)) }'
+    source = SparqlConstructSource(SparqlSource(f"http://127.0.0.1:{server.server_port}/sparql", select), batch_size=args.batch_size)
+    start = perf_counter()
+    graph = Harvester(source).harvest()
+    elapsed = perf_counter() - start
+    server.shutdown()
+    # Blank nodes are relabelled by the harvest: the other triples must be the same, and the predicates as many
+    without_blank_nodes = lambda triples: {triple for triple in triples if not any(isinstance(term, BNode) for term in triple)}
+    same = without_blank_nodes(graph) == without_blank_nodes(expected) and Counter(p for _, p, _ in graph) == Counter(p for _, p, _ in expected)
+    print(f"sparql\t{args.sparql}\t{elapsed:.2f}s\tqueries={dict(queries)}\ttriples={len(graph)}/{len(expected)}\tidentical={same}")
+    return same
+
+def run_mode(mode, url, filename):
+    stream = mode == 'stream'
+    start = perf_counter()
+    download_rdf(url, filename, stream=stream)
+    harvested = perf_counter() - start
+    harvest_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    graph = rdflib.Graph()
+    graph.parse(source=filename, format='nt' if stream else 'application/rdf+xml')
+    loaded = perf_counter() - start - harvested
+    return {
+        'mode': mode,
+        'harvest_s': round(harvested, 2),
+        'load_s': round(loaded, 2),
+        'total_s': round(harvested + loaded, 2),
+        'triples': len(graph),
+        'file_mb': round(os.path.getsize(filename) / 2**20, 1),
+        'harvest_peak_rss_mb': round(harvest_rss / 1024, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--items-per-page', type=int, default=100)
+    parser.add_argument('--sparql', help='catalog file of the SPARQL endpoint stand-in (CONSTRUCT harvest check)')
+    parser.add_argument('--batch-size', type=int, default=100, help='datasets by CONSTRUCT query with --sparql')
+    parser.add_argument('--child', choices=['graph', 'stream'], help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.url, args.output)))
+        return
+    if args.sparql:
+        if not run_sparql(args):
+            sys.exit(1)
+        return
+
+    pages = {page: make_page(page, args.pages, args.items_per_page) for page in range(1, args.pages + 1)}
+    server = serve_pages(pages)
+    url = f"http://127.0.0.1:{server.server_port}/catalog.rdf"
+
+    columns = ('mode', 'harvest_s', 'load_s', 'total_s', 'triples', 'file_mb', 'harvest_peak_rss_mb', 'peak_rss_mb')
+    print('\t'.join(columns))
+    with tempfile.TemporaryDirectory() as folder:
+        for mode in ('graph', 'stream'):
+            output = os.path.join(folder, f"catalog_{mode}")
+            child = subprocess.run(
+                [sys.executable, '-m', 'benchmark.harvest', '--child', mode, '--url', url, '--output', output],
+                capture_output=True, text=True, check=True)
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            print('\t'.join(str(result[key]) for key in columns))
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Benchmark of the asyncio LinkChecker against the previous blocking check (requests.get in a ThreadPoolExecutor(max_workers=10)).
+
+A local HTTP stand-in is started on several ports (one "host" per port) and serves:
+- /ok/<n>: 200
+- /fail/<n>: 404
+- /slow/<n>: 200 after --slow-delay seconds
+- /nohead/<n>: 405 for HEAD, 200 for GET
+- /redirect/<n>: 302 to /ok/<n>
+- /gone/<n>: 302 to /fail/<n>
+- /close/<n>: 200 with "Connection: close"
+Every response has an ETag, and requests with a matching If-None-Match get 304.
+
+Run from the ckan2mqa folder:
+    python -m benchmark.link_checker --urls 3000
+
+With --cache the URLs are checked again with a UrlHealthCache: first with the fresh entries of the
+previous pass (no requests), then with all entries expired (conditional requests).
+
+With --queue, 6 * --per-host slow URLs of one host are checked with a timeout of 3 * --slow-delay: the requests
+queued for a connection of the host must not time out (the timeout only counts once a request has a connection).
+
+Exits with status 1 if any URL gets a different result than the reference check.
+"""
+# inbuilt libraries
+import os
+import sys
+import tempfile
+import random
+import asyncio
+import argparse
+import threading
+import concurrent.futures
+from time import perf_counter
+
+# third-party libraries
+import requests
+
+# custom functions
+from controller.link_checker import LinkChecker
+from controller.url_cache import UrlHealthCache
+
+KINDS = ['ok'] * 60 + ['fail'] * 10 + ['slow'] * 5 + ['nohead'] * 10 + ['redirect'] * 5 + ['gone'] * 5 + ['close'] * 5
+
+
+class StandInServer:
+    def __init__(self, ports, slow_delay):
+        self.ports = ports
+        self.slow_delay = slow_delay
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.servers = [self.loop.run_until_complete(asyncio.start_server(self._handle, '127.0.0.1', port, backlog=1024)) for port in self.ports]
+        self.ports = [server.sockets[0].getsockname()[1] for server in self.servers]
+        self.ready.set()
+        self.loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode('latin-1').split(' ', 2)
+                if_none_match = None
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    if name.lower() == 'if-none-match':
+                        if_none_match = value.strip()
+                kind, _, n = path.strip('/').partition('/')
+                status, extra, close = 200, '', False
+                if kind == 'fail':
+                    status = 404
+                elif kind == 'slow':
+                    await asyncio.sleep(self.slow_delay)
+                elif kind == 'nohead' and method == 'HEAD':
+                    status = 405
+                elif kind == 'redirect':
+                    status, extra = 302, f"Location: /ok/{n}\r\n"
+                elif kind == 'gone':
+                    status, extra = 302, f"Location: /fail/{n}\r\n"
+                elif kind == 'close':
+                    close = True
+                etag = f'"{kind}-{n}"'
+                if status == 200 and if_none_match == etag:
+                    status = 304
+                extra += f"ETag: {etag}\r\n"
+                body = b'' if method == 'HEAD' or status == 304 else b'x' * 1024
+                writer.write((
+                    f"HTTP/1.1 {status} STATUS\r\n{extra}Content-Length: 1024\r\n"
+                    f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n"
+                ).encode('latin-1') + body)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def make_urls(ports, size, seed=0):
+    rnd = random.Random(seed)
+    return [f"http://127.0.0.1:{rnd.choice(ports)}/{rnd.choice(KINDS)}/{i}" for i in range(size)]
+
+def reference_check(url, timeout):
+    try:
+        response = requests.get(url, timeout=timeout)
+        return 200 <= response.status_code < 400
+    except Exception:
+        return False
+
+def run_reference(urls, timeout):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+        return dict(zip(urls, executor.map(lambda url: reference_check(url, timeout), urls)))
+
+def cache_passes(args, urls, results):
+    '''
+    Checks the URLs three times sharing one cache: cold, with fresh entries and with expired entries
+    '''
+    mismatches = []
+    with tempfile.TemporaryDirectory() as folder:
+        cache_file = os.path.join(folder, 'url_cache.sqlite')
+        for name, ttl in (('cold', 3600), ('fresh', 3600), ('expired', 0)):
+            cache = UrlHealthCache(cache_file, ttl=ttl, evict_after=3600)
+            checker = LinkChecker(concurrency=args.concurrency, per_host=args.per_host, timeout=args.timeout, cache=cache)
+            start = perf_counter()
+            cached_results = asyncio.run(checker.check_all(urls))
+            elapsed = perf_counter() - start
+            print(f"cache {name}\t{len(urls)} URLs\t{elapsed:.2f}s\trequests={checker.stats['requests']} "
+                  f"hits={cache.hits} revalidated={cache.revalidated} not_modified={checker.stats['not_modified']}")
+            cache.close()
+            mismatches += [url for url in urls if cached_results[url].ok != results[url].ok]
+    print(f"cache identical={not mismatches}")
+    return mismatches
+
+def queue_check(args, server):
+    '''
+    Checks more slow URLs of one host than its connections, returns the URLs that failed
+    '''
+    urls = [f"http://127.0.0.1:{server.ports[0]}/slow/queue-{i}" for i in range(6 * args.per_host)]
+    checker = LinkChecker(concurrency=args.concurrency, per_host=args.per_host, timeout=3 * args.slow_delay)
+    start = perf_counter()
+    results = asyncio.run(checker.check_all(urls))
+    elapsed = perf_counter() - start
+    failed = [url for url in urls if not results[url].ok]
+    print(f"queue\t{len(urls)} URLs of one host\t{elapsed:.2f}s\tper_host={args.per_host} timeout={checker.timeout}s\tfailed={len(failed)}")
+    for url in failed[:10]:
+        print(f"failed\t{url}\t{results[url].error}")
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--urls', type=int, default=3000)
+    parser.add_argument('--hosts', type=int, default=4)
+    parser.add_argument('--slow-delay', type=float, default=0.5)
+    parser.add_argument('--timeout', type=float, default=5)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--per-host', type=int, default=6)
+    parser.add_argument('--skip-reference', action='store_true', help='Only run the asyncio checker')
+    parser.add_argument('--cache', action='store_true', help='Also run the checker with a UrlHealthCache')
+    parser.add_argument('--queue', action='store_true', help='Also check the slow URLs of one host queued for its connections')
+    args = parser.parse_args()
+
+    server = StandInServer([0] * args.hosts, args.slow_delay).start()
+    urls = make_urls(server.ports, args.urls)
+
+    checker = LinkChecker(concurrency=args.concurrency, per_host=args.per_host, timeout=args.timeout)
+    start = perf_counter()
+    results = asyncio.run(checker.check_all(urls))
+    elapsed = perf_counter() - start
+    print(f"asyncio\t{len(urls)} URLs\t{elapsed:.2f}s\t{len(urls) / elapsed:.0f} URLs/s\t"
+          f"requests={checker.stats['requests']} connections={checker.stats['connections']} reused={checker.stats['reused']} get_fallbacks={checker.stats['get_fallbacks']}")
+
+    mismatches = 0
+    if not args.skip_reference:
+        start = perf_counter()
+        reference = run_reference(urls, args.timeout)
+        reference_elapsed = perf_counter() - start
+        print(f"threads\t{len(urls)} URLs\t{reference_elapsed:.2f}s\t{len(urls) / reference_elapsed:.0f} URLs/s\tspeedup={reference_elapsed / elapsed:.1f}x")
+        mismatches = [url for url in urls if reference[url] != results[url].ok]
+        print(f"reachable={sum(reference.values())}\tidentical={not mismatches}")
+        for url in mismatches[:10]:
+            print(f"mismatch\t{url}\treference={reference[url]}\tasyncio={results[url]}")
+
+    if args.cache:
+        mismatches = mismatches or cache_passes(args, urls, results)
+
+    if args.queue:
+        mismatches = mismatches or queue_check(args, server)
+
+    server.stop()
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark and conformance comparison of the SHACL inference modes (SHACL_INFERENCE): full RDFS inference of pyshacl
+('rdfs', current default) against the targeted closure of the shapes dependencies ('targeted'), and no inference ('none').
+
+Each sample catalog of assets/samples (or --catalogs) is validated with the full report (abort_on_first=False) by each
+mode in its own process, and the report: validation time, peak RSS, triples of the validated data graph (with the
+inferred ones) and if the conformance and the validation results are the same as the 'rdfs' mode. Results are compared
+by focus node, path, constraint component and value (blank nodes as _:).
+
+--copies N validates N renamed copies of each catalog in one graph, to see the growth with the catalog size.
+
+Run from the ckan2mqa folder:
+    python -m benchmark.shacl_inference --version 2.1.1 --copies 1
+
+Exits with status 1 if the 'targeted' mode has a different result than 'rdfs' for any catalog.
+"""
+
+# inbuilt libraries
+import os
+import sys
+import json
+import glob
+import resource
+import argparse
+import subprocess
+from collections import Counter
+from time import perf_counter
+
+# third-party libraries
+import rdflib
+from rdflib import RDF, BNode, URIRef
+from rdflib.namespace import SH
+
+# custom functions
+from controller.shapes import get_shapes_graph, shapes_version_files
+from controller.inference import inference_closure, shapes_dependencies, validate_graph
+
+MODES = ['rdfs', 'targeted', 'none']
+FORMATS = {'.ttl': 'turtle', '.rdf': 'xml', '.xml': 'xml', '.nt': 'nt'}
+
+
+def load_catalog(path, copies):
+    graph = rdflib.Graph()
+    graph.parse(path, format=FORMATS.get(os.path.splitext(path)[1], 'turtle'))
+    if copies <= 1:
+        return graph
+    subjects = {s for s in graph.subjects() if isinstance(s, URIRef)}
+    scaled = rdflib.Graph()
+    for copy in range(copies):
+        def rename(term):
+            if term in subjects:
+                return URIRef(f"{term}-copy{copy}")
+            if isinstance(term, BNode):
+                return BNode(f"{term}c{copy}")
+            return term
+        scaled.addN((rename(s), p, rename(o), scaled) for s, p, o in graph)
+    return scaled
+
+def result_keys(results_graph):
+    def key(term):
+        return '_:' if isinstance(term, BNode) or term is None else term.n3()
+    return Counter(
+        ' '.join(key(results_graph.value(result, prop)) for prop in (SH.focusNode, SH.resultPath, SH.sourceConstraintComponent, SH.value))
+        for result in results_graph.subjects(RDF.type, SH.ValidationResult))
+
+def run_mode(args):
+    shapes_files = shapes_version_files(*(glob.glob(f"assets/{args.version}/dcat-ap_{args.version}_shacl_{name}") [0]
+                                          for name in ('shapes.ttl', 'mdr-vocabularies.shape*.ttl', 'deprecateduris.ttl')))
+    shapes_graph = get_shapes_graph(shapes_files, cache_dir='')
+    graph = load_catalog(args.catalog, args.copies)
+    triples = len(graph)
+    if args.child == 'targeted':
+        triples += len(inference_closure(graph, *shapes_dependencies(shapes_graph)))
+    elif args.child == 'rdfs':
+        import owlrl
+        expanded = rdflib.Graph()
+        expanded += graph
+        owlrl.DeductiveClosure(owlrl.RDFS_Semantics).expand(expanded)
+        triples = len(expanded)
+        del expanded
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = perf_counter()
+    conforms, results_graph, results_text = validate_graph(graph, shapes_graph, inference=args.child, abort_on_first=False)
+    elapsed = perf_counter() - start
+    return {
+        'mode': args.child,
+        'seconds': round(elapsed, 2),
+        'triples': triples,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'rss_growth_mb': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1),
+        'conforms': conforms,
+        'results': result_keys(results_graph),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--version', default='2.1.1', help='DCAT-AP version of the shapes')
+    parser.add_argument('--catalogs', nargs='*', default=sorted(glob.glob('assets/samples/*_catalog.*')))
+    parser.add_argument('--copies', type=int, default=1)
+    parser.add_argument('--modes', nargs='*', default=MODES, choices=MODES)
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--catalog', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args)))
+        return
+
+    columns = ('mode', 'seconds', 'triples', 'peak_rss_mb', 'rss_growth_mb', 'conforms', 'results', 'same_as_rdfs')
+    print('\t'.join(('catalog',) + columns))
+    different = []
+    for catalog in args.catalogs:
+        reference = None
+        for mode in args.modes:
+            child = subprocess.run(
+                [sys.executable, '-m', 'benchmark.shacl_inference', '--child', mode, '--catalog', catalog,
+                 '--version', args.version, '--copies', str(args.copies)],
+                capture_output=True, text=True, check=True)
+            result = json.loads(child.stdout.strip().splitlines()[-1])
+            results = Counter(result['results'])
+            if mode == 'rdfs':
+                reference = (result['conforms'], results)
+            result['same_as_rdfs'] = '' if reference is None else (result['conforms'], results) == reference
+            if mode == 'targeted' and result['same_as_rdfs'] is False:
+                different.append(catalog)
+            result['results'] = sum(results.values())
+            print('\t'.join([os.path.basename(catalog)] + [str(result[key]) for key in columns]))
+    if different:
+        print(f"targeted inference differs from rdfs for {different}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Import-time budget of the ckan2mqa entry point: imports ckan2mqa.py in a new interpreter --runs times and fails
+(exit code 1) if the fastest cold start takes more than --max-seconds, imports more than --max-modules modules or
+imports any of the --lazy modules, which must only be imported by the code paths that need them (SHACL validation,
+vocabularies update, service mode, DEV_MODE debugger, SPARQL evaluation).
+
+The slowest imports (python -X importtime, cumulative) are listed to find the module that broke the budget.
+
+Run from the ckan2mqa folder (e.g. in CI after every change):
+    python -m benchmark.startup
+    python -m benchmark.startup --max-seconds 0.5 --max-modules 350
+"""
+
+# inbuilt libraries
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+from time import perf_counter
+
+LAZY_MODULES = ['pyshacl', 'requests', 'SPARQLWrapper', 'ptvsd', 'http.server', 'controller.service', 'controller.download_vocabs']
+SCRIPT = "import sys, ckan2mqa; print(' '.join(sys.modules))"
+
+
+def import_entry_point(app_dir):
+    '''
+    Imports ckan2mqa.py in a new interpreter. Returns (seconds, modules, -X importtime report)
+    '''
+    env = dict(os.environ, APP_DIR=app_dir)
+    start = perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', SCRIPT], capture_output=True, text=True, env=env)
+    seconds = perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import ckan2mqa failed:\n{result.stderr.strip()[-2000:]}")
+    return seconds, result.stdout.strip().splitlines()[-1].split(), result.stderr
+
+def slowest_imports(report, top=10):
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if name.strip() != 'ckan2mqa':
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='cold starts, the fastest one is compared with the budget')
+    parser.add_argument('--max-seconds', type=float, default=1.0, help='budget of the fastest cold start (interpreter included)')
+    parser.add_argument('--max-modules', type=int, default=400, help='budget of imported modules')
+    parser.add_argument('--lazy', nargs='*', default=LAZY_MODULES, help='modules that must not be imported at startup')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as app_dir:
+        runs = [import_entry_point(app_dir) for _ in range(max(1, args.runs))]
+    seconds, modules, report = min(runs, key=lambda run: run[0])
+
+    print(f"Cold start: {round(seconds, 3)} s (budget {args.max_seconds} s), {len(modules)} modules (budget {args.max_modules})")
+    print('Slowest imports (cumulative ms):')
+    for microseconds, name in slowest_imports(report):
+        print(f"  {round(microseconds / 1000, 1)}\t{name}")
+
+    errors = []
+    if seconds > args.max_seconds:
+        errors.append(f"cold start {round(seconds, 3)} s over the budget of {args.max_seconds} s")
+    if len(modules) > args.max_modules:
+        errors.append(f"{len(modules)} modules over the budget of {args.max_modules}")
+    eager = [name for name in args.lazy if name in modules]
+    if eager:
+        errors.append(f"modules imported at startup instead of lazily: {', '.join(eager)}")
+    for error in errors:
+        print(f"FAILED: {error}")
+    sys.exit(1 if errors else 0)
+
+if __name__ == "__main__":
+    main()
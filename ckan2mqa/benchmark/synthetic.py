@@ -0,0 +1,220 @@
+"""
+Generator of synthetic DCAT-AP catalogs for the benchmarks: a dcat:Catalog of --datasets datasets with 1 to
+--max-distributions distributions each, with the properties of every MQA indicator.
+
+- Formats (dct:format, dcat:mediaType) and licenses (dct:license) are drawn from the assets/vocabs files with the
+  weights of --formats and --licenses (label=weight), and --unknown-share of them are values not in the vocabularies.
+- --missing gives the share of datasets/distributions without a property (property=share), e.g.
+  "dct:spatial=0.6,dcat:byteSize=0.3". The defaults are close to the bundled samples.
+- --catalog-type 'ckan_uris'/'edp' writes formats as file-type/media-type URIs, 'ckan' as labels (CSV, text/csv).
+
+The same --seed always writes the same catalog. N-Triples are written line by line (any size), .ttl/.rdf outputs are
+converted with rdflib.
+
+Run from the ckan2mqa folder:
+    python -m benchmark.synthetic --datasets 10000 --output /tmp/synthetic_10k.nt
+"""
+
+# inbuilt libraries
+import os
+import random
+import argparse
+from time import perf_counter
+
+# third-party libraries
+import rdflib
+
+DCAT = 'http://www.w3.org/ns/dcat#'
+DCT = 'http://purl.org/dc/terms/'
+RDF_TYPE = '<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>'
+PREFIXES = {'dcat': DCAT, 'dct': DCT, 'vcard': 'http://www.w3.org/2006/vcard/ns#', 'foaf': 'http://xmlns.com/foaf/0.1/'}
+XSD_DATE = '<http://www.w3.org/2001/XMLSchema#date>'
+XSD_DECIMAL = '<http://www.w3.org/2001/XMLSchema#decimal>'
+
+FORMATS = {'CSV': 0.3, 'XLSX': 0.1, 'XLS': 0.05, 'JSON': 0.1, 'XML': 0.05, 'PDF': 0.15, 'ZIP': 0.08, 'HTML': 0.07,
+           'GEOJSON': 0.03, 'RDF_XML': 0.02, 'ODS': 0.02, 'DOC': 0.01, 'SHP': 0.02}
+LICENSES = {'CC_BY_4_0': 0.5, 'CC0': 0.2, 'CC_BYSA_4_0': 0.1, 'ODC_BY': 0.1, 'DLDE_BY_2_0': 0.1}
+MISSING = {'dcat:keyword': 0.1, 'dcat:theme': 0.2, 'dct:spatial': 0.6, 'dct:temporal': 0.7, 'dcat:contactPoint': 0.3,
+           'dct:publisher': 0.05, 'dct:accessRights': 0.5, 'dct:issued': 0.1, 'dct:modified': 0.1,
+           'dcat:downloadURL': 0.4, 'dct:format': 0.1, 'dcat:mediaType': 0.5, 'dct:license': 0.2, 'dct:rights': 0.8,
+           'dcat:byteSize': 0.5}
+# IANA media type of the file-type labels (dcat:mediaType)
+MEDIA_TYPES = {'CSV': 'text/csv', 'XLSX': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+               'XLS': 'application/vnd.ms-excel', 'JSON': 'application/json', 'XML': 'application/xml',
+               'PDF': 'application/pdf', 'ZIP': 'application/zip', 'HTML': 'text/html', 'GEOJSON': 'application/geo+json',
+               'RDF_XML': 'application/rdf+xml', 'ODS': 'application/vnd.oasis.opendocument.spreadsheet',
+               'DOC': 'application/msword'}
+THEMES = ['AGRI', 'ECON', 'EDUC', 'ENER', 'ENVI', 'GOVE', 'HEAL', 'INTR', 'JUST', 'REGI', 'SOCI', 'TECH', 'TRAN']
+ACCESS_RIGHTS = ['PUBLIC', 'PUBLIC', 'PUBLIC', 'RESTRICTED', 'NON_PUBLIC']
+LANGUAGES = ['en', 'es', 'de', 'fr']
+
+
+def parse_weights(text):
+    '''
+    "a=0.5,b=0.2" -> {'a': 0.5, 'b': 0.2}
+    '''
+    weights = {}
+    for item in filter(None, (item.strip() for item in text.split(','))):
+        key, _, value = item.partition('=')
+        weights[key.strip()] = float(value)
+    return weights
+
+def read_vocabulary(app_dir, vocabulary_file):
+    with open(f"{app_dir}/ckan2mqa/assets/vocabs/{vocabulary_file}", encoding='utf-8') as fp:
+        return [line.strip().split(',') for line in fp if line.strip()]
+
+def literal(text, lang=None):
+    escaped = text.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"@{lang}' if lang else f'"{escaped}"'
+
+
+class SyntheticCatalog:
+    '''
+    Writes a synthetic DCAT-AP catalog as N-Triples, with the formats/licenses weights and missing property shares
+    '''
+
+    def __init__(self, datasets, app_dir='/app', formats=FORMATS, licenses=LICENSES, missing=MISSING, unknown_share=0.05,
+                 max_distributions=4, catalog_type='ckan_uris', seed=1, base_url='http://example.org'):
+        self.datasets = datasets
+        self.missing = {**MISSING, **missing}
+        self.unknown_share = unknown_share
+        self.max_distributions = max_distributions
+        self.labels = catalog_type == 'ckan'
+        self.random = random.Random(seed)
+        self.base_url = base_url
+
+        # Values of the vocabularies by label, so the vocabulary indicators count them
+        file_types = {row[1]: row[0] for row in read_vocabulary(app_dir, 'file-types.csv') if len(row) > 1}
+        media_types = {row[1]: row[0] for row in read_vocabulary(app_dir, 'media-types.csv') if len(row) > 1}
+        license_urls = {row[1]: row[0] for row in read_vocabulary(app_dir, 'licenses.csv') if len(row) > 1}
+        unknown = [label for label in formats if label not in file_types] + [label for label in licenses if label not in license_urls]
+        if unknown:
+            raise ValueError(f"Labels not found in file-types.csv/licenses.csv: {unknown}")
+        self.formats = [(label, file_types[label], media_types.get(MEDIA_TYPES.get(label)), weight) for label, weight in formats.items()]
+        self.licenses = [(license_urls[label], weight) for label, weight in licenses.items()]
+
+    def has(self, property):
+        return self.random.random() >= self.missing.get(property, 0)
+
+    def choose(self, weighted):
+        return self.random.choices(weighted, weights=[item[-1] for item in weighted])[0]
+
+    def dataset_lines(self, number):
+        base = self.base_url
+        dataset = f"<{base}/dataset/{number}>"
+        organization = number % 97
+        lines = [f"<{base}/catalog> <{DCAT}dataset> {dataset} .",
+                 f"{dataset} {RDF_TYPE} <{DCAT}Dataset> ."]
+        for language in self.random.sample(LANGUAGES, self.random.randint(1, 2)):
+            lines.append(f"{dataset} <{DCT}title> {literal(f'Dataset {number} of organization {organization}', language)} .")
+            lines.append(f"{dataset} <{DCT}description> {literal(f'Description of dataset {number}. ' * 3, language)} .")
+        if self.has('dcat:keyword'):
+            lines += [f"{dataset} <{DCAT}keyword> {literal(f'keyword {self.random.randint(1, 500)}')} ." for _ in range(self.random.randint(1, 4))]
+        if self.has('dcat:theme'):
+            lines.append(f"{dataset} <{DCAT}theme> <http://publications.europa.eu/resource/authority/data-theme/{self.random.choice(THEMES)}> .")
+        if self.has('dct:spatial'):
+            lines.append(f"{dataset} <{DCT}spatial> <http://publications.europa.eu/resource/authority/country/{self.random.choice(['ESP', 'DEU', 'FRA', 'ITA'])}> .")
+        if self.has('dct:temporal'):
+            temporal = f"_:temporal{number}"
+            lines += [f"{dataset} <{DCT}temporal> {temporal} .",
+                      f"{temporal} {RDF_TYPE} <{DCT}PeriodOfTime> .",
+                      f"{temporal} <{DCAT}startDate> \"20{10 + number % 10}-01-01\"^^{XSD_DATE} ."]
+        if self.has('dcat:contactPoint'):
+            contact = f"<{base}/organization/{organization}/contact>"
+            lines += [f"{dataset} <{DCAT}contactPoint> {contact} .",
+                      f"{contact} {RDF_TYPE} <http://www.w3.org/2006/vcard/ns#Organization> .",
+                      f"{contact} <http://www.w3.org/2006/vcard/ns#hasEmail> <mailto:contact{organization}@example.org> ."]
+        if self.has('dct:publisher'):
+            publisher = f"<{base}/organization/{organization}>"
+            lines += [f"{dataset} <{DCT}publisher> {publisher} .",
+                      f"{publisher} {RDF_TYPE} <http://xmlns.com/foaf/0.1/Agent> .",
+                      f"{publisher} <http://xmlns.com/foaf/0.1/name> {literal(f'Organization {organization}')} ."]
+        if self.has('dct:accessRights'):
+            lines.append(f"{dataset} <{DCT}accessRights> <http://publications.europa.eu/resource/authority/access-right/{self.random.choice(ACCESS_RIGHTS)}> .")
+        if self.has('dct:issued'):
+            lines.append(f"{dataset} <{DCT}issued> \"20{10 + number % 10}-0{1 + number % 9}-15\"^^{XSD_DATE} .")
+        if self.has('dct:modified'):
+            lines.append(f"{dataset} <{DCT}modified> \"2024-0{1 + number % 9}-{1 + number % 28:02d}\"^^{XSD_DATE} .")
+        for index in range(self.random.randint(1, self.max_distributions)):
+            lines += self.distribution_lines(dataset, f"{base}/dataset/{number}/resource/{index}")
+        return lines
+
+    def distribution_lines(self, dataset, url):
+        distribution = f"<{url}>"
+        label, file_type, media_type, _ = self.choose(self.formats)
+        unknown = self.random.random() < self.unknown_share
+        lines = [f"{dataset} <{DCAT}distribution> {distribution} .",
+                 f"{distribution} {RDF_TYPE} <{DCAT}Distribution> .",
+                 f"{distribution} <{DCT}title> {literal(f'{label} file')} .",
+                 f"{distribution} <{DCAT}accessURL> <{url}/access> ."]
+        if self.has('dcat:downloadURL'):
+            lines.append(f"{distribution} <{DCAT}downloadURL> <{url}/download.{label.lower()}> .")
+        if self.has('dct:format'):
+            if unknown:
+                value = literal('UNKNOWN_FORMAT') if self.labels else f"<{self.base_url}/format/unknown>"
+            else:
+                value = literal(label) if self.labels else f"<{file_type}>"
+            lines.append(f"{distribution} <{DCT}format> {value} .")
+        if media_type and self.has('dcat:mediaType'):
+            value = literal(media_type.rsplit('media-types/', 1)[-1]) if self.labels else f"<{media_type}>"
+            lines.append(f"{distribution} <{DCAT}mediaType> {value} .")
+        if self.has('dct:license'):
+            value = f"<{self.base_url}/license/custom>" if unknown else f"<{self.choose(self.licenses)[0]}>"
+            lines.append(f"{distribution} <{DCT}license> {value} .")
+        if self.has('dct:rights'):
+            lines.append(f"{distribution} <{DCT}rights> {literal('Attribution required')} .")
+        if self.has('dcat:byteSize'):
+            lines.append(f"{distribution} <{DCAT}byteSize> \"{self.random.randint(1000, 10**8)}\"^^{XSD_DECIMAL} .")
+        return lines
+
+    def write(self, filename):
+        '''
+        Writes the catalog (N-Triples, or converted to the format of the .ttl/.rdf extension). Returns the number of triples
+        '''
+        extension = os.path.splitext(filename)[1]
+        nt_filename = filename if extension == '.nt' else f"{filename}.nt"
+        triples = 0
+        with open(nt_filename, 'w', encoding='utf-8') as catalog_file:
+            catalog = f"<{self.base_url}/catalog>"
+            header = [f"{catalog} {RDF_TYPE} <{DCAT}Catalog> .",
+                      f"{catalog} <{DCT}title> {literal('Synthetic DCAT-AP catalog', 'en')} .",
+                      f"{catalog} <{DCT}description> {literal(f'Synthetic catalog of {self.datasets} datasets', 'en')} .",
+                      f"{catalog} <{DCT}publisher> <{self.base_url}/organization/0> ."]
+            catalog_file.write('\n'.join(header) + '\n')
+            triples += len(header)
+            for number in range(self.datasets):
+                lines = self.dataset_lines(number)
+                catalog_file.write('\n'.join(lines) + '\n')
+                triples += len(lines)
+        if nt_filename != filename:
+            graph = rdflib.Graph()
+            for prefix, namespace in PREFIXES.items():
+                graph.bind(prefix, namespace)
+            graph.parse(nt_filename, format='nt')
+            graph.serialize(destination=filename, format='pretty-xml' if extension in ('.rdf', '.xml') else 'turtle')
+            os.remove(nt_filename)
+        return triples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--datasets', type=int, default=1000)
+    parser.add_argument('--output', required=True, help='.nt, .ttl or .rdf file')
+    parser.add_argument('--formats', type=parse_weights, default=FORMATS, help='file-type label=weight, ...')
+    parser.add_argument('--licenses', type=parse_weights, default=LICENSES, help='license label of licenses.csv=weight, ...')
+    parser.add_argument('--missing', type=parse_weights, default={}, help='property=share of subjects without it, ...')
+    parser.add_argument('--unknown-share', type=float, default=0.05, help='share of formats/licenses not in the vocabularies')
+    parser.add_argument('--max-distributions', type=int, default=4)
+    parser.add_argument('--catalog-type', default='ckan_uris', choices=['ckan_uris', 'edp', 'ckan'])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--app-dir', default=os.path.dirname(os.getcwd()), help='folder of ckan2mqa/assets (default: parent folder)')
+    args = parser.parse_args()
+
+    start = perf_counter()
+    catalog = SyntheticCatalog(args.datasets, args.app_dir, args.formats, args.licenses, args.missing, args.unknown_share,
+                               args.max_distributions, args.catalog_type, args.seed)
+    triples = catalog.write(args.output)
+    print(f"{args.output}: {args.datasets} datasets, {triples} triples in {round(perf_counter() - start, 1)}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark of the compiled VocabularyMatcher against the list-based contains_vocabulary_word/contains_word_vocabulary.
+
+Run from the ckan2mqa folder:
+    python -m benchmark.vocabulary_matcher --app-dir ..
+
+Exits with status 1 if any result differs from the reference functions.
+"""
+
+# inbuilt libraries
+import os
+import sys
+import random
+import argparse
+from time import perf_counter
+
+# custom functions
+from controller.mqa_evaluate import contains_vocabulary_word, contains_word_vocabulary
+from controller.vocabularies import load_vocabulary, VocabularyMatcher
+
+VOCABULARY_FILES = [
+    '/vocabs/access-right.csv',
+    '/vocabs/file-types.csv',
+    '/vocabs/licenses.csv',
+    '/vocabs/machine-readable.csv',
+    '/vocabs/media-types.csv',
+    '/vocabs/non-proprietary.csv',
+]
+
+
+def sample_words(vocabulary, size, seed=0):
+    '''
+    Builds a mix of exact, case-changed, URI-embedded, partial and unknown values like the ones found in catalogs
+    '''
+    rnd = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789/.-+_:'
+    words = []
+    while len(words) < size:
+        entry = rnd.choice(vocabulary)
+        kind = rnd.randrange(6)
+        if kind == 0:
+            words.append(entry)
+        elif kind == 1:
+            words.append(entry.upper())
+        elif kind == 2:
+            words.append(f"http://publications.europa.eu/resource/authority/file-type/{entry}")
+        elif kind == 3 and len(entry) > 2:
+            start = rnd.randrange(len(entry) - 1)
+            words.append(entry[start:rnd.randrange(start + 1, len(entry) + 1)])
+        elif kind == 4:
+            words.append(f"{entry}{rnd.choice(alphabet)}")
+        else:
+            words.append(''.join(rnd.choice(alphabet) for _ in range(rnd.randrange(2, 40))))
+    return words
+
+def time_calls(function, vocabulary, words):
+    start = perf_counter()
+    results = [function(vocabulary, word) for word in words]
+    return perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app-dir', default=os.environ.get('APP_DIR', '/app'))
+    parser.add_argument('--words', type=int, default=5000, help='Distinct values checked per vocabulary column')
+    args = parser.parse_args()
+
+    mismatches = 0
+    print("vocabulary\tfield\tentries\tfunction\treference_s\tcompiled_s\tspeedup\tidentical")
+    for vocabulary_file in VOCABULARY_FILES:
+        for field in (0, 1):
+            vocabulary = load_vocabulary(vocabulary_file, field, args.app_dir)
+            if not vocabulary:
+                continue
+            words = sample_words(vocabulary, args.words)
+            start = perf_counter()
+            matcher = VocabularyMatcher(vocabulary)
+            build_time = perf_counter() - start
+            for function in (contains_vocabulary_word, contains_word_vocabulary):
+                reference_time, reference = time_calls(function, vocabulary, words)
+                compiled_time, compiled = time_calls(function, matcher, words)
+                identical = reference == compiled
+                mismatches += sum(1 for a, b in zip(reference, compiled) if a != b)
+                compiled_time += build_time
+                print(f"{vocabulary_file}\t{field}\t{len(vocabulary)}\t{function.__name__}\t{reference_time:.4f}\t{compiled_time:.4f}\t{reference_time / compiled_time:.1f}x\t{identical}")
+
+    if mismatches:
+        print(f"{mismatches} results differ from the reference functions")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,12 @@
 import os
 import ssl
 import logging
-import ptvsd
 from datetime import datetime
  
 # custom functions
-from controller.mqa_evaluate import MqaEvaluate
-from controller.rdf_management import download_rdf
-from controller.download_vocabs import main as download_vocabs
+from controller.batch import new_evaluation, read_catalogs, run_batch
+from controller import http_client
+from controller.profiling import RunProfile
 from config.log import log_file
 
 
@@ -29,6 +28,11 @@ if not os.path.exists(CATALOG_FILE_FOLDER):
         os.makedirs(CATALOG_FILE_FOLDER)
 CATALOG_FILE = f"{CATALOG_FILE_FOLDER}/{CATALOG_FILENAME}.rdf"
 CATALOG_FORMAT = "application/rdf+xml"
+# Stream each harvested page to an N-Triples file instead of building the graph and serializing it as RDF/XML
+HARVEST_STREAM = os.environ.get('HARVEST_STREAM', 'False')
+if HARVEST_STREAM == True or HARVEST_STREAM == "True":
+    CATALOG_FILE = f"{CATALOG_FILE_FOLDER}/{CATALOG_FILENAME}.nt"
+    CATALOG_FORMAT = "nt"
 DCATAP_FILES_VERSION = os.environ.get('DCATAP_FILES_VERSION', '2.1.1')
 UPDATE_VOCABS = os.environ.get('UPDATE_VOCABS', 'False')
 ## DCAT-AP Files
@@ -36,6 +40,14 @@ SHAPESFILE = f"ckan2mqa/assets/{DCATAP_FILES_VERSION}/dcat-ap_{DCATAP_FILES_VERS
 SHAPESVOCABULARYFILE = f"ckan2mqa/assets/{DCATAP_FILES_VERSION}/dcat-ap_{DCATAP_FILES_VERSION}_shacl_mdr-vocabularies.shape.ttl"
 SHAPESDEPRECATEDURISFILE = f"ckan2mqa/assets/{DCATAP_FILES_VERSION}/dcat-ap_{DCATAP_FILES_VERSION}_shacl_deprecateduris.ttl"
 CKAN_METADATA_TYPE = os.environ.get('CKAN_METADATA_TYPE', 'ckan_uris')
+# Only re-evaluate the datasets changed since the previous run of the same catalog
+INCREMENTAL_EVALUATION = os.environ.get('INCREMENTAL_EVALUATION', 'False')
+# Also write the indicator matrix and the score of every dataset
+DATASET_SCORES = os.environ.get('DATASET_SCORES', 'False')
+# Batch mode: file with the catalogs (URLs or local files) to evaluate concurrently, instead of CKAN_CATALOG_URL
+CATALOGS_FILE = os.environ.get('CATALOGS_FILE', '')
+# Service mode: HTTP API that queues evaluation jobs (catalog URLs or uploaded files), instead of a single run
+SERVICE_MODE = os.environ.get('SERVICE_MODE', 'False')
 log_module = "[ckan2mqa]"
 
 def main():
@@ -43,18 +55,52 @@ def main():
     
     if UPDATE_VOCABS == True or UPDATE_VOCABS == "True":
         logging.info(f"{log_module}:Update vocabs from EU Vocabularies (https://op.europa.eu/en/web/eu-vocabularies/authority-tables)")
+        from controller.download_vocabs import main as download_vocabs
         download_vocabs()
         
     if (not os.environ.get('PYTHONHTTPSVERIFY', '') and
         getattr(ssl, '_create_unverified_context', None)):
         ssl._create_default_https_context = ssl._create_unverified_context
    
-    download_rdf(CKAN_CATALOG_URL, CATALOG_FILE)
+    incremental = INCREMENTAL_EVALUATION == True or INCREMENTAL_EVALUATION == "True"
+    dataset_scores = DATASET_SCORES == True or DATASET_SCORES == "True"
+    shapes = (SHAPESFILE, SHAPESVOCABULARYFILE, SHAPESDEPRECATEDURISFILE)
+
+    if SERVICE_MODE == True or SERVICE_MODE == "True":
+        from controller.service import EvaluationService, serve
+        logging.info(f"{log_module}:Evaluation service with DCAT-AP Version: {DCATAP_FILES_VERSION}")
+        serve(EvaluationService(os.path.join(MQA_LOG_DIR, 'service'), shapes, APP_DIR, catalog_type=CKAN_METADATA_TYPE,
+                                stream=(CATALOG_FORMAT == "nt"), incremental=incremental, dataset_scores=dataset_scores))
+        return
+
+    if CATALOGS_FILE:
+        catalogs = read_catalogs(CATALOGS_FILE, CKAN_METADATA_TYPE)
+        logging.info(f"{log_module}:Batch evaluation of {len(catalogs)} catalogs of '{CATALOGS_FILE}' with DCAT-AP Version: {DCATAP_FILES_VERSION}")
+        run_batch(catalogs, MQA_LOG_DIR, shapes, APP_DIR, stream=(CATALOG_FORMAT == "nt"), incremental=incremental, dataset_scores=dataset_scores)
+        return
+
+    # Imported for the download only (requests), not at startup
+    from controller.rdf_management import download_rdf
+    profile = RunProfile()
+    graph = None
+    http_before = http_client.stats()
+    with profile.phase('download') as phase:
+        if CATALOG_FORMAT == "nt":
+            phase['triples'] = download_rdf(CKAN_CATALOG_URL, CATALOG_FILE, stream=True)
+        else:
+            # The harvested graph is evaluated as is, CATALOG_FILE is not parsed again
+            graph = download_rdf(CKAN_CATALOG_URL, CATALOG_FILE, keep_graph=True)
+            phase['triples'] = len(graph) if graph is not None else None
+        phase['http'] = http_client.stats_since(http_before)
+    logging.info(f"{log_module}:Catalog download HTTP: {http_client.describe(phase['http'])}")
     logging.info(f"{log_module}:{CKAN_METADATA_TYPE} catalog: {CKAN_CATALOG_URL} with file: '{CATALOG_FILE}' downloaded. Catalog format: '{CATALOG_FORMAT}' evaluate with DCAT-AP Version: {DCATAP_FILES_VERSION}")
     
     # Evaluation: Case 6: DCAT-AP Controlled Vocabularies & Case 7: DCAT-AP Full (with background knowledge)
-    mqa_evaluation = MqaEvaluate(CATALOG_FILE, CATALOG_FILENAME, CATALOG_FILE_FOLDER, SHAPESFILE, SHAPESVOCABULARYFILE, SHAPESDEPRECATEDURISFILE, APP_DIR, CATALOG_FORMAT, CKAN_METADATA_TYPE)
-    mqa_evaluation.evaluate() 
+    mqa_evaluation = new_evaluation(CATALOG_FILE, CATALOG_FILENAME, CATALOG_FILE_FOLDER, shapes, APP_DIR, CATALOG_FORMAT, CKAN_METADATA_TYPE, CKAN_CATALOG_URL, incremental, dataset_scores, profile, graph)
+    try:
+        mqa_evaluation.evaluate()
+    finally:
+        mqa_evaluation.close()
 
 if __name__ == "__main__":
     if DEV_MODE == True or DEV_MODE == "True":
@@ -63,6 +109,8 @@ if __name__ == "__main__":
         
         # ptvsd: Python Tools for Visual Studio Code
         if MQA_DEV_VSCODE == False or MQA_DEV_VSCODE == "False":
+            import ptvsd
+
             # Allow other computers to attach to ptvsd at this IP address and port.
             ptvsd.enable_attach(address=("0.0.0.0", MQA_DEV_PORT), redirect_output=True)
 
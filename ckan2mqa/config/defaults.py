@@ -43,6 +43,13 @@ HYDRA = 'http://www.w3.org/ns/hydra/core#'
 APP_DIR = os.environ.get('APP_DIR', '/app')
 VOCABS_DIR = Path(APP_DIR) / 'ckan2mqa/assets/vocabs'
 
+# Harvest of paged catalogs (rdf_management.download_rdf)
+HARVEST_WORKERS = int(os.environ.get('HARVEST_WORKERS', 8))
+HARVEST_RETRIES = int(os.environ.get('HARVEST_RETRIES', 3))
+HARVEST_BACKOFF = float(os.environ.get('HARVEST_BACKOFF', 1))
+## Datasets by search page of the dataset harvests (controller.harvester: CKAN API, EDP search and SPARQL)
+HARVEST_PAGE_SIZE = int(os.environ.get('HARVEST_PAGE_SIZE', 1000))
+
 # Evaluation vars
 EVALUATION_DEFAULT_FORMAT = 'catalog.ttl'
 CKAN_API_OUTPUT = 'local_evaluation'
@@ -56,8 +63,20 @@ EDP_SPARQL_OUTPUT = EDP_API_OUTPUT + '/'
 EDP_SPARQL_URL = urljoin(EDP_API_CKAN_BASE_URL, 'sparql')
 EDP_SPARQL_EVALUATION_PUBLISHER = os.environ.get('EDP_SPARQL_EVALUATION_', 'http://datos.gob.es/recurso/sector-publico/org/Organismo/E00003801')
 EDP_SPARQL_EVALUATION_KEYWORD = os.environ.get('EDP_SPARQL_EVALUATION_KEYWORD', 'environment')
+## Retrieval of the datasets: 'construct' (CONSTRUCT queries of SPARQL_BATCH_SIZE datasets, SPARQL_WORKERS at the same time) or 'documents' (a Turtle document by dataset, HARVEST_WORKERS at the same time)
+SPARQL_HARVEST = os.environ.get('SPARQL_HARVEST', 'construct')
+SPARQL_BATCH_SIZE = int(os.environ.get('SPARQL_BATCH_SIZE', 100))
+SPARQL_WORKERS = int(os.environ.get('SPARQL_WORKERS', 4))
 
 # HTTP parameters
+## Shared HTTP session (controller.http_client) of the catalog and dataset harvests and the vocabularies download: timeout (seconds), retries of failed requests, initial backoff (seconds, Retry-After if the server sends it), hosts with open connections and open connections by host
+HTTP_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', 60))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 3))
+HTTP_BACKOFF = float(os.environ.get('HTTP_BACKOFF', 1))
+HTTP_POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS', 10))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 16))
+## HTTPS certificates are only verified if PYTHONHTTPSVERIFY is set, the same rule as the unverified ssl context of ckan2mqa.py
+HTTPS_VERIFY = bool(os.environ.get('PYTHONHTTPSVERIFY', ''))
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
 }
@@ -73,6 +92,47 @@ DATASET = 'dcat:Dataset'
 CODE_200 = ' code=200'
 FROM_VOCABULARY = ' from vocabulary'
 TIMEOUT = 10
+## Incremental evaluation: per-dataset results of previous runs, re-evaluated if changed or older than INCREMENTAL_MAX_AGE seconds
+INCREMENTAL_STATE_FILE = os.environ.get('INCREMENTAL_STATE_FILE', os.path.join(APP_DIR, 'log/mqa/incremental_state.sqlite'))
+INCREMENTAL_MAX_AGE = int(os.environ.get('INCREMENTAL_MAX_AGE', 7 * 24 * 3600))
+## Link checks (dcat:accessURL/dcat:downloadURL code=200)
+LINK_CHECK_CONCURRENCY = int(os.environ.get('LINK_CHECK_CONCURRENCY', 50))
+LINK_CHECK_PER_HOST = int(os.environ.get('LINK_CHECK_PER_HOST', 6))
+## URL health cache shared across runs, empty URL_CACHE_FILE disables it. TTL and eviction in seconds
+URL_CACHE_FILE = os.environ.get('URL_CACHE_FILE', os.path.join(APP_DIR, 'log/mqa/url_cache.sqlite'))
+URL_CACHE_TTL = int(os.environ.get('URL_CACHE_TTL', 3 * 24 * 3600))
+URL_CACHE_EVICT_AFTER = int(os.environ.get('URL_CACHE_EVICT_AFTER', 30 * 24 * 3600))
+## SHACL shapes: combined shapes graph cached by hash of the shapes files (empty SHAPES_CACHE_DIR disables it)
+SHAPES_CACHE_DIR = os.environ.get('SHAPES_CACHE_DIR', os.path.join(APP_DIR, 'log/mqa/shapes_cache'))
+## Extra shapes files of the DCAT-AP version loaded with the shapes, e.g. "range,shapes_recommended" (2.1.1 and 3.0.0)
+SHACL_EXTRA_FILES = [name.strip() for name in os.environ.get('SHACL_EXTRA_FILES', '').split(',') if name.strip()]
+## SHACL validation: 'catalog' (whole catalog, compliance of all datasets or none) or 'datasets' (by dataset shard, compliance of each dataset)
+SHACL_MODE = os.environ.get('SHACL_MODE', 'catalog')
+SHACL_WORKERS = int(os.environ.get('SHACL_WORKERS') or os.cpu_count() or 1)
+SHACL_BATCH_SIZE = int(os.environ.get('SHACL_BATCH_SIZE', 50))
+## Inference before the SHACL validation: 'rdfs' (full RDFS entailment), 'targeted' (only the entailments the shapes depend on) or 'none'
+SHACL_INFERENCE = os.environ.get('SHACL_INFERENCE', 'rdfs')
+## Graph store of the catalog: 'memory' (rdflib in-memory graph) or 'sqlite' (on-disk SQLite file in GRAPH_STORE_DIR, for catalogs larger than RAM)
+GRAPH_STORE = os.environ.get('GRAPH_STORE', 'memory')
+GRAPH_STORE_DIR = os.environ.get('GRAPH_STORE_DIR', os.path.join(APP_DIR, 'log/mqa/graph_store'))
+## Lean loading of the catalog: only the triples of the predicates read by the indicators (and the SHACL shapes) are kept, the others (e.g. titles, descriptions, vCard details) are dropped while parsing
+LEAN_LOADING = os.environ.get('LEAN_LOADING', 'False') == 'True'
+## Snapshots of the parsed catalogs (memory store) by hash of the catalog file, CATALOG_SNAPSHOTS most recently used kept (opt-in: 0 or empty CATALOG_SNAPSHOT_DIR disables them)
+CATALOG_SNAPSHOT_DIR = os.environ.get('CATALOG_SNAPSHOT_DIR', os.path.join(APP_DIR, 'log/mqa/catalog_snapshots'))
+CATALOG_SNAPSHOTS = int(os.environ.get('CATALOG_SNAPSHOTS', 0))
+## Batch evaluation (CATALOGS_FILE): catalogs evaluated concurrently (default: number of CPUs)
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS') or os.cpu_count() or 1)
+## Evaluation service (SERVICE_MODE): HTTP API address (local only by default, 0.0.0.0 to publish it from a container), worker processes (default: number of CPUs), queued jobs and upload size (MB) limits
+SERVICE_HOST = os.environ.get('SERVICE_HOST', '127.0.0.1')
+SERVICE_PORT = int(os.environ.get('SERVICE_PORT', 8000))
+SERVICE_WORKERS = int(os.environ.get('SERVICE_WORKERS') or os.cpu_count() or 1)
+SERVICE_QUEUE_SIZE = int(os.environ.get('SERVICE_QUEUE_SIZE', 100))
+SERVICE_MAX_UPLOAD = int(os.environ.get('SERVICE_MAX_UPLOAD', 200))
+## Run profile (<catalog>_profile.json next to _results.txt): time, memory and throughput by phase. RUN_PROFILE_CPROFILE also dumps a cProfile file by phase
+RUN_PROFILE = os.environ.get('RUN_PROFILE', 'True') == 'True'
+RUN_PROFILE_CPROFILE = os.environ.get('RUN_PROFILE_CPROFILE', 'False') == 'True'
+## Structured results next to _results.txt: 'jsonl' (_results.jsonl) and/or 'tsv' (_results_indicators/_links/_run.tsv tables), empty to disable
+RESULTS_FORMATS = [name.strip() for name in os.environ.get('RESULTS_FORMATS', 'jsonl,tsv').split(',') if name.strip()]
 CKAN_URIS = 'ckan_uris'
 CKAN = 'ckan'
 EDP = 'edp'
@@ -190,6 +250,7 @@ MQA_INDICATORS = {
         'population_attr': 'distributionCount',
         'points': 10,
         'count_method': 'count_values_containing_vocabulary',
+        'property_suffix': FROM_VOCABULARY,
         'log_message': "Evaluating interoperability format from vocabulary.",
         'function': 'interoperability_format_from_vocabulary'
     },
@@ -210,6 +271,7 @@ MQA_INDICATORS = {
         'population_attr': 'distributionCount',
         'points': 20,
         'count_method': 'count_values_containing_vocabulary',
+        'property_suffix': ' non-proprietary',
         'log_message': "Evaluating interoperability non-proprietary format.",
         'function': 'interoperability_format_nonProprietary'
     },
@@ -220,6 +282,7 @@ MQA_INDICATORS = {
         'population_attr': 'distributionCount',
         'points': 20,
         'count_method': 'count_values_containing_vocabulary',
+        'property_suffix': ' machine-readable',
         'log_message': "Evaluating interoperability machine-readable format.",
         'function': 'interoperability_format_machineReadable'
     },
@@ -250,6 +313,7 @@ MQA_INDICATORS = {
         'population_attr': 'distributionCount',
         'points': 10,
         'count_method': 'count_values_containing_vocabulary',
+        'property_suffix': FROM_VOCABULARY,
         'log_message': "Evaluating reusability license from vocabulary.",
         'function': 'reusability_license_from_vocabulary'
     },    
@@ -270,6 +334,7 @@ MQA_INDICATORS = {
         'population_attr': 'datasetCount',
         'points': 5,
         'count_method': 'count_values_contained_in_vocabulary',
+        'property_suffix': FROM_VOCABULARY,
         'log_message': "Evaluating reusability access rights from vocabulary.",
         'function': 'reusability_accessRights_from_vocabulary'
     },
@@ -0,0 +1,206 @@
+# inbuilt libraries
+import os
+import re
+import csv
+import time
+import logging
+import multiprocessing
+from datetime import datetime
+from collections import namedtuple
+
+# third-party libraries
+from rdflib.util import guess_format
+
+# custom functions
+from config.log import get_log_module
+from controller.mqa_evaluate import MqaEvaluate
+from controller.incremental import IncrementalEvaluate
+from controller.indicator_matrix import MatrixEvaluate, INDICATOR_VOCABULARIES
+from controller import http_client
+from controller.profiling import RunProfile
+from controller.shapes import get_shapes_graph, shapes_version_files
+from controller.inference import load_validator
+from controller.vocabularies import load_vocabulary_matcher
+from config.defaults import (
+    WEIGHT_TOTAL,
+    MQA_INDICATORS,
+    BATCH_WORKERS
+)
+
+log_module = get_log_module()
+
+# One line of the catalogs file: source is a catalog URL or a local RDF file
+Catalog = namedtuple('Catalog', ['name', 'source', 'catalog_type'])
+DIMENSIONS = list(dict.fromkeys(info['dimension'] for info in MQA_INDICATORS.values()))
+
+
+def catalog_name(source):
+    '''
+    Folder/file name of a catalog from its URL or path, e.g. 'datos.example.org_catalog.rdf'
+    '''
+    name = re.sub(r'^[a-z]+://', '', source) if '://' in source else os.path.basename(source)
+    return re.sub(r'[^A-Za-z0-9.-]+', '_', name).strip('_.') or 'catalog'
+
+def read_catalogs(path, catalog_type):
+    '''
+    Reads the catalogs file: one catalog per line, "<URL or file> [name] [metadata type]", separated by spaces or tabs.
+    Empty lines and lines starting with # are ignored.
+    '''
+    catalogs = []
+    names = set()
+    with open(path, encoding='utf-8') as catalogs_file:
+        for line in catalogs_file:
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            name = fields[1] if len(fields) > 1 else catalog_name(fields[0])
+            unique_name, number = name, 1
+            while unique_name in names:
+                number += 1
+                unique_name = f"{name}_{number}"
+            names.add(unique_name)
+            catalogs.append(Catalog(unique_name, fields[0], fields[2] if len(fields) > 2 else catalog_type))
+    return catalogs
+
+def new_evaluation(catalog_file, catalog_filename, catalog_file_folder, shapes, app_dir, catalog_format, catalog_type, catalog_key, incremental=False, dataset_scores=False, profile=None, graph=None):
+    '''
+    Evaluation of a catalog: IncrementalEvaluate, MatrixEvaluate (dataset_scores) or MqaEvaluate.
+    shapes: (shapes, vocabularies, deprecated URIs) files of the DCAT-AP version
+    profile: RunProfile of the run (e.g. with the download phase), a new one if None
+    graph: catalog graph already harvested (download_rdf keep_graph), catalog_file is not parsed again
+    '''
+    if incremental:
+        if dataset_scores:
+            logging.warning(f"{log_module}:DATASET_SCORES is not used with INCREMENTAL_EVALUATION, {catalog_filename} is evaluated incrementally without dataset scores")
+        return IncrementalEvaluate(catalog_file, catalog_filename, catalog_file_folder, *shapes, app_dir, catalog_format, catalog_type, catalog_key=catalog_key, profile=profile, graph=graph)
+    if dataset_scores:
+        return MatrixEvaluate(catalog_file, catalog_filename, catalog_file_folder, *shapes, app_dir, catalog_format, catalog_type, profile=profile, graph=graph)
+    return MqaEvaluate(catalog_file, catalog_filename, catalog_file_folder, *shapes, app_dir, catalog_format, catalog_type, profile=profile, graph=graph)
+
+def warm_resources(shapes, app_dir):
+    '''
+    Loads the shapes graph and the vocabulary matchers of the evaluation. Called before the pool starts, so the
+    (forked) workers share them read-only, and as the initializer of each worker (cache hits after a fork).
+    '''
+    load_validator()
+    get_shapes_graph(shapes_version_files(*shapes))
+    for vocabulary_files, by_catalog_type in INDICATOR_VOCABULARIES.values():
+        files = vocabulary_files.values() if isinstance(vocabulary_files, dict) else [vocabulary_files]
+        for vocabulary_file in files:
+            for field in ((0, 1) if by_catalog_type else (0,)):
+                load_vocabulary_matcher(vocabulary_file, field, app_dir)
+
+def evaluation_options(output_dir, shapes, app_dir='/app', stream=False, incremental=False, dataset_scores=False):
+    '''
+    Options of evaluate_catalog, the same for every catalog of a batch (or of the evaluation service)
+    '''
+    if incremental and dataset_scores:
+        # Warned once for the batch/service, instead of by catalog in new_evaluation
+        logging.warning(f"{log_module}:DATASET_SCORES is not used with INCREMENTAL_EVALUATION, the catalogs are evaluated incrementally without dataset scores")
+        dataset_scores = False
+    return {
+        'output_dir': output_dir,
+        'date': datetime.today().strftime('%Y-%m-%d'),
+        'shapes': tuple(shapes),
+        'app_dir': app_dir,
+        'stream': stream,
+        'incremental': incremental,
+        'dataset_scores': dataset_scores,
+    }
+
+def evaluate_catalog(catalog, options):
+    '''
+    Harvests (URL) and evaluates one catalog in <output_dir>/<name>_<date>/, the folder layout of a single evaluation.
+    Returns its summary row.
+    '''
+    start = time.perf_counter()
+    catalog_filename = f"{catalog.name}_{options['date']}"
+    catalog_file_folder = os.path.join(options['output_dir'], catalog_filename)
+    os.makedirs(catalog_file_folder, exist_ok=True)
+    summary = {'catalog': catalog.name, 'source': catalog.source, 'status': 'ok', 'folder': catalog_file_folder}
+    profile = RunProfile()
+    graph = None
+    try:
+        if '://' in catalog.source:
+            extension, catalog_format = ('nt', 'nt') if options['stream'] else ('rdf', 'application/rdf+xml')
+            catalog_file = os.path.join(catalog_file_folder, f"{catalog_filename}.{extension}")
+            from controller.rdf_management import download_rdf
+            http_before = http_client.stats()
+            with profile.phase('download') as phase:
+                if options['stream']:
+                    phase['triples'] = download_rdf(catalog.source, catalog_file, stream=True)
+                else:
+                    # The harvested graph is evaluated as is, catalog_file is not parsed again
+                    graph = download_rdf(catalog.source, catalog_file, keep_graph=True)
+                    phase['triples'] = len(graph) if graph is not None else None
+                phase['http'] = http_client.stats_since(http_before)
+            logging.info(f"{log_module}:Catalog {catalog.source} download HTTP: {http_client.describe(phase['http'])}")
+        else:
+            catalog_file = catalog.source
+            catalog_format = guess_format(catalog_file) or 'application/rdf+xml'
+
+        evaluation = new_evaluation(catalog_file, catalog_filename, catalog_file_folder, options['shapes'], options['app_dir'],
+                                    catalog_format, catalog.catalog_type, catalog.source, options['incremental'], options['dataset_scores'], profile, graph)
+        try:
+            evaluation.evaluate()
+        finally:
+            evaluation.close()
+        summary.update({
+            'datasets': evaluation.datasetCount,
+            'distributions': evaluation.distributionCount,
+            **{dimension: round(evaluation.dimensionPoints[dimension], 2) for dimension in DIMENSIONS},
+            'points': round(evaluation.totalPoints, 2),
+            'percentage': round(evaluation.totalPoints / WEIGHT_TOTAL, 2),
+            'rating': evaluation.get_rating(),
+        })
+    except Exception as e:
+        logging.error(f"{log_module}:Catalog {catalog.name} ({catalog.source}) failed: {e}")
+        summary['status'] = f"error: {e}"
+    summary['seconds'] = round(time.perf_counter() - start, 1)
+    return summary
+
+def _evaluate_catalog(args):
+    return evaluate_catalog(*args)
+
+def run_batch(catalogs, output_dir, shapes, app_dir='/app', workers=BATCH_WORKERS, stream=False, incremental=False, dataset_scores=False):
+    '''
+    Evaluates the catalogs concurrently in a pool of workers (in this process if workers <= 1), and writes the
+    summary of every catalog to <output_dir>/batch_summary_<date>.tsv. Returns the summary rows in catalogs order.
+    '''
+    start = time.perf_counter()
+    options = evaluation_options(output_dir, shapes, app_dir, stream, incremental, dataset_scores)
+    warm_resources(options['shapes'], app_dir)
+    workers = max(1, min(workers, len(catalogs)))
+    logging.info(f"{log_module}:Batch evaluation of {len(catalogs)} catalogs with {workers} workers")
+
+    summaries = {}
+    tasks = [(catalog, options) for catalog in catalogs]
+    if workers == 1:
+        results = map(_evaluate_catalog, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, initializer=warm_resources, initargs=(options['shapes'], app_dir))
+        results = pool.imap_unordered(_evaluate_catalog, tasks)
+    try:
+        for summary in results:
+            summaries[summary['catalog']] = summary
+            logging.info(f"{log_module}:[{len(summaries)}/{len(catalogs)}] {summary['catalog']}: {summary['status']}, {summary.get('points', '-')} points in {summary['seconds']}s")
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    summaries = [summaries[catalog.name] for catalog in catalogs]
+    write_summary(os.path.join(output_dir, f"batch_summary_{options['date']}.tsv"), summaries)
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for summary in summaries if summary['status'] != 'ok')
+    logging.info(f"{log_module}:Batch evaluation: {len(catalogs) - failed} catalogs evaluated, {failed} failed in {round(elapsed, 1)}s ({round(len(catalogs) / elapsed * 60, 1)} catalogs/min)")
+    return summaries
+
+def write_summary(filename, summaries):
+    columns = ['catalog', 'source', 'status', 'datasets', 'distributions'] + DIMENSIONS + ['points', 'percentage', 'rating', 'seconds', 'folder']
+    with open(filename, 'w', newline='', encoding='utf-8') as summary_file:
+        writer = csv.writer(summary_file, delimiter='\t')
+        writer.writerow(columns)
+        for summary in summaries:
+            writer.writerow([summary.get(column, '') for column in columns])
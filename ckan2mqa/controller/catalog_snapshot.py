@@ -0,0 +1,91 @@
+# inbuilt libraries
+import os
+import glob
+import pickle
+import hashlib
+import logging
+
+# third-party libraries
+import rdflib
+
+# custom functions
+from config.log import get_log_module
+from controller.graph_store import new_graph, PredicateFilter
+from config.defaults import (
+    GRAPH_STORE,
+    CATALOG_SNAPSHOT_DIR,
+    CATALOG_SNAPSHOTS
+)
+
+log_module = get_log_module()
+
+
+def catalog_digest(filename, catalog_format, predicates=None):
+    '''
+    sha1 of the catalog file content and format (and the rdflib version, the snapshots are rdflib pickles), and of
+    the predicates of a lean loading
+    '''
+    digest = hashlib.sha1(f"{rdflib.__version__}|{catalog_format}|".encode('utf-8'))
+    if predicates is not None:
+        digest.update(' '.join(sorted(predicates)).encode('utf-8'))
+    with open(filename, 'rb') as catalog_file:
+        for chunk in iter(lambda: catalog_file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_snapshot(snapshot_file):
+    try:
+        with open(snapshot_file, 'rb') as graph_file:
+            graph = pickle.load(graph_file)
+        # Recently used snapshots are the last ones evicted
+        os.utime(snapshot_file)
+        return graph
+    except Exception as e:
+        logging.warning(f"{log_module}:Catalog snapshot {snapshot_file} not loaded: {e}")
+        return None
+
+def save_snapshot(graph, snapshot_file, keep=CATALOG_SNAPSHOTS):
+    '''
+    Writes the snapshot (write and rename, another process never reads a partial file) and removes the least
+    recently used ones beyond keep
+    '''
+    snapshot_dir = os.path.dirname(snapshot_file)
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        temp_file = f"{snapshot_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'wb') as graph_file:
+            pickle.dump(graph, graph_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, snapshot_file)
+        snapshots = sorted(glob.glob(os.path.join(snapshot_dir, 'catalog_*.pickle')), key=os.path.getmtime, reverse=True)
+        for old_snapshot in snapshots[keep:]:
+            os.remove(old_snapshot)
+    except OSError as e:
+        logging.warning(f"{log_module}:Catalog snapshot {snapshot_file} not written: {e}")
+
+def load_catalog_graph(filename, catalog_format, store=GRAPH_STORE, name='graph', snapshot_dir=CATALOG_SNAPSHOT_DIR, predicates=None, keep=CATALOG_SNAPSHOTS):
+    '''
+    Returns (graph, origin) of the catalog file: its parsed graph in the store backend (GRAPH_STORE) and 'parse', or
+    with the memory store, the snapshot of a previous parse of the same content (pickle in snapshot_dir by
+    catalog_digest) and 'snapshot'. The snapshots are opt-in: keep (CATALOG_SNAPSHOTS) 0 or empty snapshot_dir
+    disables them, a one-off run neither hashes the file nor writes its snapshot.
+    predicates: lean loading, only the triples of these predicates are kept (the others are dropped while parsing)
+    '''
+    snapshot_file = None
+    if store == 'memory' and snapshot_dir and keep > 0:
+        snapshot_file = os.path.join(snapshot_dir, f"catalog_{catalog_digest(filename, catalog_format, predicates)}.pickle")
+        if os.path.exists(snapshot_file):
+            graph = load_snapshot(snapshot_file)
+            if graph is not None:
+                logging.info(f"{log_module}:Catalog {filename} loaded from snapshot {snapshot_file}")
+                return graph, 'snapshot'
+
+    graph = new_graph(store, name)
+    if predicates is None:
+        graph.parse(source=filename, format=catalog_format)
+    else:
+        sink = PredicateFilter(graph, predicates)
+        rdflib.Graph(store=sink).parse(source=filename, format=catalog_format)
+        logging.info(f"{log_module}:Lean loading of {filename}: {len(graph)} triples kept, {sink.dropped} dropped")
+    if snapshot_file:
+        save_snapshot(graph, snapshot_file, keep)
+    return graph, 'parse'
@@ -1,29 +1,47 @@
 # inbuilt libraries
 import csv
-import requests
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import os
 import logging
 
 # custom functions
 from config.log import get_log_module
+from controller.vocabularies import compile_bundle, load_bundle
+from controller import http_client
 from config.defaults import (
     EU_VOCABULARIES,
     EUROVOC,
     SKOS,
     APP_DIR,
-    VOCABS_DIR,
-    headers
+    VOCABS_DIR
 )
 
 # third-party libraries
 from rdflib import Graph, RDF
+from rdflib.store import Store
 from xml.etree import ElementTree as ET
 
 log_module = get_log_module()
 
 
+class TripleSink(Store):
+    '''
+    rdflib store that keeps nothing: every parsed triple is handed to on_triple, so a vocabulary is extracted while
+    it is downloaded, without building its graph
+    '''
+    def __init__(self, on_triple):
+        super().__init__()
+        self.on_triple = on_triple
+
+    def add(self, triple, context, quoted=False):
+        self.on_triple(*triple)
+
+def stream_triples(stream, on_triple, rdf_format='xml'):
+    Graph(store=TripleSink(on_triple)).parse(source=stream, format=rdf_format)
+
+
 class RdfFile:
     def __init__(self, base_filename, url, description, name):
         self.base_filename = base_filename
@@ -31,16 +49,20 @@ class RdfFile:
         self.description = description
         self.name = name
 
-    def extract_description(self, rdf_content, rdf_url):
+    def extract_description(self, stream, rdf_url):
+        '''
+        Rows of the vocabulary CSV, read from the (file-like) stream of the downloaded vocabulary
+        '''
         raise NotImplementedError
 
 
 class BasicRdfFile(RdfFile):
-    def extract_description(self, rdf_content, rdf_url):
-        graph = Graph().parse(data=rdf_content, format='xml')
+    def extract_description(self, stream, rdf_url):
+        subjects = set()
+        stream_triples(stream, lambda s, p, o: subjects.add(s))
         data = set()
 
-        for concept in graph.subjects():
+        for concept in subjects:
             uri = str(concept)
             label = concept.split('/')[-1]
             if uri != rdf_url and label != rdf_url.split('/')[-1]:
@@ -49,30 +71,48 @@ class BasicRdfFile(RdfFile):
         return data
 
 class LicenseRdfFile(RdfFile):
-    def extract_description(self, rdf_content, rdf_url):
-        graph = Graph().parse(data=rdf_content, format='xml')
+    def extract_description(self, stream, rdf_url):
+        concepts = set()
+        exact_matches = {}
+
+        def on_triple(s, p, o):
+            if p == RDF.type and o == SKOS.Concept:
+                concepts.add(s)
+            elif p == SKOS.exactMatch:
+                exact_matches.setdefault(s, o)
+
+        stream_triples(stream, on_triple)
         data = set()
 
-        for concept in graph.subjects(RDF.type, SKOS.Concept):
+        for concept in concepts:
             label = concept.split('/')[-1]
             eu_uri = concept
-            uri = str(graph.value(concept, SKOS.exactMatch, default=eu_uri))
+            uri = str(exact_matches.get(concept, eu_uri))
             if concept != rdf_url and label != rdf_url.split('/')[-1]:
                 data.add((uri, label, eu_uri))
 
         return data
 
 class FileTypesRdfFile(RdfFile):
-    def extract_description(self, rdf_content, rdf_url):
-        graph = Graph().parse(data=rdf_content, format='xml')
+    def extract_description(self, stream, rdf_url):
+        file_types = set()
+        non_prop_exts = {}
+
+        def on_triple(s, p, o):
+            if p == RDF.type and o == EUROVOC.FileType:
+                file_types.add(s)
+            elif p == EUROVOC.nonPropExt:
+                non_prop_exts.setdefault(s, o)
+
+        stream_triples(stream, on_triple)
         data = set()
         non_proprietary_data = set()
         machine_readable_data = set()
 
-        for concept in graph.subjects(RDF.type, EUROVOC.FileType):
+        for concept in file_types:
             uri = str(concept)
             label = uri.split('/')[-1]
-            non_prop_ext = str(graph.value(concept, EUROVOC.nonPropExt, default="false"))
+            non_prop_ext = str(non_prop_exts.get(concept, "false"))
 
             if uri != rdf_url and label != rdf_url.split('/')[-1]:
                 data.add((uri, label, non_prop_ext))
@@ -92,21 +132,21 @@ class FileTypesRdfFile(RdfFile):
         return data
 
 class MediaTypesRdfFile(RdfFile):
-    def extract_description(self, xml_content, rdf_url):
+    def extract_description(self, stream, rdf_url):
         data = set()
 
-        tree = ET.ElementTree(ET.fromstring(xml_content))
-        root = tree.getroot()
-
-        for record in root.findall(".//{http://www.iana.org/assignments}record"):
+        # Records are read one by one and cleared, the registry is never fully in memory
+        for _, record in ET.iterparse(stream):
+            if record.tag != "{http://www.iana.org/assignments}record":
+                continue
             name_elem = record.find("{http://www.iana.org/assignments}file")
             name = name_elem.text if name_elem is not None else ""
-            label_elem = record.find("{http://www.iana.org/assignments}file")
-            label = label_elem.text if label_elem is not None else ""
+            label = name
 
             if name != rdf_url.split('/')[-1]:
                 uri = f"http://www.iana.org/assignments/media-types/{name}"
                 data.add((uri, label))
+            record.clear()
 
         return data
 
@@ -118,6 +158,50 @@ def save_to_csv(data, csv_file):
         writer = csv.writer(csvfile)
         writer.writerows(sorted_data)
 
+def conditional_headers(source):
+    '''
+    Request headers of a vocabulary already downloaded (source: its validators in the vocabulary bundle), so an
+    unchanged vocabulary is answered with 304 Not Modified instead of downloaded again
+    '''
+    request_headers = {}
+    if source.get('etag'):
+        request_headers['If-None-Match'] = source['etag']
+    if source.get('last_modified'):
+        request_headers['If-Modified-Since'] = source['last_modified']
+    return request_headers
+
+def update_vocabulary(rdf_file, source):
+    '''
+    Downloads a vocabulary (conditional GET with the validators of source) and saves its CSV. Returns its new source
+    (validators), the previous one if it is not modified or could not be downloaded
+    '''
+    file_name = f"{rdf_file.base_filename}.csv"
+    has_csv = (VOCABS_DIR / file_name).exists()
+    try:
+        with http_client.get(rdf_file.url, headers=conditional_headers(source if has_csv else {}), stream=True) as response:
+            if response.status_code == 304:
+                logging.info(f"{log_module}:{rdf_file.name} not modified since {source.get('downloaded')}, {file_name} kept")
+                return source
+            if response.status_code != 200:
+                logging.warning(f"{log_module}:Failed to retrieve data for URL: {rdf_file.url}. Status Code: {response.status_code}")
+                return source
+            # Parsed while it is downloaded, gzip/deflate transfer encodings decoded on the fly
+            response.raw.decode_content = True
+            extracted_data = rdf_file.extract_description(response.raw, rdf_file.url)
+            if not extracted_data:  # Avoid creating CSV if no valid descriptions
+                return source
+            save_to_csv(extracted_data, VOCABS_DIR / file_name)
+            logging.info(f"{log_module}:{rdf_file.name} data extracted and saved to {file_name}")
+            return {
+                'url': rdf_file.url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'downloaded': datetime.now().isoformat(timespec='seconds'),
+            }
+    except Exception as e:
+        logging.error(f"{log_module}:An error occurred for URL: {rdf_file.url}. Error: {e}")
+        return source
+
 def main():
     rdf_files = []
     for rdf_data in EU_VOCABULARIES:
@@ -137,20 +221,15 @@ def main():
         else:
             logging.warning(f"{log_module}:Unrecognized RDF type '{rdf_type}'. Skipping.")
 
-    for rdf_file in rdf_files:
-        try:
-            response = requests.get(rdf_file.url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                rdf_content = response.text
-                extracted_data = rdf_file.extract_description(rdf_content, rdf_file.url)
-                if extracted_data:  # Avoid creating CSV if no valid descriptions
-                    file_name = f"{rdf_file.base_filename}.csv"
-                    save_to_csv(extracted_data, VOCABS_DIR / file_name)
-                    logging.info(f"{log_module}:{rdf_file.name} data extracted and saved to {file_name}")
-            else:
-                logging.warning(f"{log_module}:Failed to retrieve data for URL: {rdf_file.url}. Status Code: {response.status_code}")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"{log_module}:An error occurred for URL: {rdf_file.url}. Error: {e}")
+    # Vocabularies downloaded concurrently, then compiled in a single bundle loaded by the evaluations
+    http_before = http_client.stats()
+    previous = load_bundle(APP_DIR, cached=False) or {}
+    sources = previous.get('sources', {})
+    with ThreadPoolExecutor(max_workers=max(1, len(rdf_files))) as executor:
+        updated = executor.map(lambda rdf_file: (rdf_file.base_filename, update_vocabulary(rdf_file, sources.get(rdf_file.base_filename, {}))), rdf_files)
+        sources = {**sources, **dict(updated)}
+    logging.info(f"{log_module}:Vocabularies download HTTP: {http_client.describe(http_client.stats_since(http_before))}")
+    compile_bundle(APP_DIR, sources)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,14 +5,14 @@ import sys
 import json
 
 # third-party libraries
-import requests
 from requests.exceptions import HTTPError
-from urllib.request import urlopen
 import rdflib
 from urllib.parse import urlparse
 
 # custom functions
 from controller.mqa_evaluate import MqaEvaluate
+from controller.harvester import Harvester, CkanPackageSource
+from controller import http_client
 from config.defaults import (
     HYDRA,
     CKAN_API_OUTPUT as OUTPUT,
@@ -38,8 +38,7 @@ def parse_json_response(search_request, graph = None):
     """
     print(search_request)
     try:
-        response = requests.get(search_request)
-        response.raise_for_status()
+        response = http_client.get(search_request)
         # access JSOn content
         jsonResponse = response.json()
         rdf_catalog = jsonResponse["result"]
@@ -77,19 +76,10 @@ def catalog_search(ckan_url, file_name, keyword = 'test', serialization_format =
 
 def package_search(ckan_url, file_name, keyword = 'test'):
     """
-    Downloads the RDF in a paged JSON response with dataset identifiers
+    Downloads the RDF of every dataset of a (paged) package_search, concurrently (controller.harvester)
     """
-    search_request = ckan_url + '/api/3/action/package_search?q='+keyword+'&rows=1000'
-    print(search_request)
     try:
-        response = urlopen(search_request)
-        jsonResponse = json.load(response)
-        rows = jsonResponse["result"]["results"]
-        graph = rdflib.Graph()
-        for row in rows:
-            dataset_request = ckan_url + '/dataset/'+ row["name"] + '.rdf'
-            print(dataset_request)
-            graph.parse(dataset_request, format="application/rdf+xml")
+        graph = Harvester(CkanPackageSource(ckan_url, keyword)).harvest()
         #graph.serialize(destination=file_name, format='pretty-xml')
         graph.serialize(destination=file_name, format='turtle')
     except Exception as err:
@@ -4,14 +4,13 @@ import ssl
 import sys
 
 # third-party libraries
-import requests
-from requests.exceptions import HTTPError
-from urllib.request import urlopen
 import json
 import rdflib
 
 # custom functions
 from controller.mqa_evaluate import MqaEvaluate
+from controller import http_client
+from controller.harvester import Harvester, EdpSearchSource, edp_dataset_url
 from config.defaults import (
     HYDRA,
     CKAN_API_OUTPUT as OUTPUT,
@@ -24,27 +23,20 @@ def parse_dataset(id, graph):
     """
     Downloads the file in url (intended to be the RDF end-point of a CKAN site) and stores it in filename
     """
-    ttl_url = EDP_API_CKAN_BASE_URL / 'data/api/datasets/'+ id + '.ttl?useNormalizedId=true&locale=en'
+    ttl_url = edp_dataset_url(id)
     print(ttl_url)
     try:
-        graph.parse(ttl_url, format="turtle")
+        graph.parse(data=http_client.get(ttl_url).content, format="turtle", publicID=ttl_url)
     except Exception as err:
         print(f'Other error occurred: {err}')
     return graph
 
 def search(ckan_url, file_name, keyword = 'test'):
     """
-    Downloads the RDF in a paged JSON response with dataset identifiers
+    Downloads the RDF of every dataset of a (paged) search, concurrently (controller.harvester)
     """
-    search_request = ckan_url + '/search?q=%22'+keyword +'%22&limit=1000'
-    print(search_request)
     try:
-        response = urlopen(search_request)
-        jsonResponse = json.load(response)
-        rows = jsonResponse["result"]["results"]
-        graph = rdflib.Graph()
-        for row in rows:
-            parse_dataset(row["id"],graph)
+        graph = Harvester(EdpSearchSource(ckan_url, keyword)).harvest()
         #graph.serialize(destination=file_name, format='pretty-xml')
         graph.serialize(destination=file_name, format='turtle')
     except Exception as err:
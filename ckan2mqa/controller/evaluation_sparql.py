@@ -4,10 +4,11 @@ import ssl
 
 # third-party libraries
 import rdflib
-from SPARQLWrapper import SPARQLWrapper, JSON
 
 # custom functions
 from controller.mqa_evaluate import MqaEvaluate
+from controller import http_client
+from controller.harvester import Harvester, SparqlSource, SparqlConstructSource, edp_dataset_url
 from config.defaults import (
     HYDRA,
     CKAN_API_OUTPUT as OUTPUT,
@@ -15,7 +16,10 @@ from config.defaults import (
     EDP_API_CKAN_BASE_URL,
     EDP_SPARQL_URL,
     EDP_SPARQL_EVALUATION_PUBLISHER,
-    EDP_SPARQL_EVALUATION_KEYWORD
+    EDP_SPARQL_EVALUATION_KEYWORD,
+    SPARQL_HARVEST,
+    SPARQL_WORKERS,
+    HARVEST_WORKERS
 )
 
 
@@ -31,28 +35,31 @@ def parse_dataset(url, graph):
     """
     Parses the dataset with URL in the graph
     """
-    id = get_file_name(url)
     # https://www.europeandataportal.eu/data/api/datasets/https-opendata-aragon-es-datos-catalogo-dataset-oai-zaguan-unizar-es-94411.ttl?useNormalizedId=true&locale=en
-    ttl_url = EDP_API_CKAN_BASE_URL / 'api/datasets/'+ id + '.ttl?useNormalizedId=true&locale=en'
+    ttl_url = edp_dataset_url(get_file_name(url))
     print(ttl_url)
     try:
-        graph.parse(ttl_url, format="turtle")
+        graph.parse(data=http_client.get(ttl_url).content, format="turtle", publicID=ttl_url)
     except Exception as err:
         print(f'Other error occurred: {err}')
     return graph
 
-def parse_catalog(results, filename):
-    graph = rdflib.Graph()
-    for row in results["results"]["bindings"]:
-        """s"""
-        dataset = row["s"]["value"]
-        graph = parse_dataset(dataset,graph)
+def parse_catalog(source, filename, mode = SPARQL_HARVEST):
+    """
+    Harvests the datasets (?s) of a SparqlSource concurrently (controller.harvester) and saves them in filename:
+    with CONSTRUCT queries of batches of datasets to the endpoint (mode 'construct') or their Turtle documents
+    ('documents')
+    """
+    if mode == 'construct':
+        harvester = Harvester(SparqlConstructSource(source), workers=SPARQL_WORKERS)
+    else:
+        harvester = Harvester(source, workers=HARVEST_WORKERS)
+    graph = harvester.harvest()
     #graph.serialize(destination=filename, format='pretty-xml')
     graph.serialize(destination=filename, format='turtle')
 
 def search_datasets_new(url, filename, keyword):
-    sparql = SPARQLWrapper(url)
-    sparql.setQuery("""
+    query = """
           PREFIX dct:<http://purl.org/dc/terms/>
           PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
           PREFIX dcat: <http://www.w3.org/ns/dcat#>
@@ -66,14 +73,11 @@ def search_datasets_new(url, filename, keyword):
               FILTER regex(str(?value), '""" + keyword + """', 'i') 
             }
           }
-        """)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    parse_catalog(results, filename)
+        """
+    parse_catalog(SparqlSource(url, query), filename)
 
 def search_datasets(url, filename, keyword):
-    sparql = SPARQLWrapper(url)
-    sparql.setQuery("""
+    query = """
           PREFIX dct:<http://purl.org/dc/terms/>
           PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
           PREFIX dcat: <http://www.w3.org/ns/dcat#>
@@ -91,15 +95,12 @@ def search_datasets(url, filename, keyword):
               }
           }
           }
-        """)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    parse_catalog(results,filename)
+        """
+    parse_catalog(SparqlSource(url, query), filename)
 
 
 def search_datasets_with_publisher(url, filename, keyword, publisher):
-    sparql = SPARQLWrapper(url)
-    sparql.setQuery("""
+    query = """
           PREFIX dct:<http://purl.org/dc/terms/>
           PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
           PREFIX dcat: <http://www.w3.org/ns/dcat#>
@@ -116,15 +117,12 @@ def search_datasets_with_publisher(url, filename, keyword, publisher):
                ?s dct:publisher <""" + publisher + """> 
             }
           }
-        """)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    parse_catalog(results,filename)
+        """
+    parse_catalog(SparqlSource(url, query), filename)
 
 
 def search_datasets_example_endpoint(url, filename, keyword):
-    sparql = SPARQLWrapper(url)
-    sparql.setQuery("""
+    query = """
           PREFIX dct:<http://purl.org/dc/terms/>
           PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
           PREFIX dcat: <http://www.w3.org/ns/dcat#>
@@ -156,10 +154,8 @@ def search_datasets_example_endpoint(url, filename, keyword):
                FILTER(str(?id)='r_toscan') . 
           }
           }
-        """)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    parse_catalog(results,filename)
+        """
+    parse_catalog(SparqlSource(url, query), filename)
 
 
 def transform_to_file_name(url):
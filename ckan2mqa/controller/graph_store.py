@@ -0,0 +1,286 @@
+# inbuilt libraries
+import os
+import sqlite3
+import hashlib
+import logging
+from functools import lru_cache
+
+# third-party libraries
+import rdflib
+from rdflib import BNode, Literal, URIRef
+from rdflib.store import Store, VALID_STORE
+from rdflib.plugins.stores.memory import SimpleMemory
+
+# custom functions
+from config.log import get_log_module
+from config.defaults import (
+    GRAPH_STORE,
+    GRAPH_STORE_DIR
+)
+
+log_module = get_log_module()
+
+# Kind of term of the terms table
+URI, BLANK, LITERAL = 0, 1, 2
+
+
+@lru_cache(maxsize=65536)
+def encode_term(term):
+    '''
+    Returns (id, kind, value, datatype, lang) of a term. The id is a 64 bits hash of the term, so terms are not
+    looked up when triples are added
+    '''
+    if isinstance(term, URIRef):
+        row = (URI, str(term), None, None)
+    elif isinstance(term, BNode):
+        row = (BLANK, str(term), None, None)
+    elif isinstance(term, Literal):
+        row = (LITERAL, str(term), str(term.datatype) if term.datatype else None, term.language)
+    else:
+        raise TypeError(f"Term {term!r} not supported by SQLiteStore")
+    digest = hashlib.blake2b('\x00'.join(str(value) for value in row).encode('utf-8'), digest_size=8).digest()
+    return (int.from_bytes(digest, 'big', signed=True),) + row
+
+@lru_cache(maxsize=65536)
+def decode_term(kind, value, datatype, lang):
+    if kind == URI:
+        return URIRef(value)
+    if kind == BLANK:
+        return BNode(value)
+    return Literal(value, lang=lang, datatype=URIRef(datatype) if datatype else None)
+
+
+class SQLiteStore(Store):
+    '''
+    rdflib store of one graph in a SQLite file, for catalogs that do not fit in memory. It needs no server or
+    extra package.
+
+    The triples table is indexed by (s, p, o), (p, o, s) and (o, s, p), as the indexes of the rdflib memory
+    store, so every triple pattern is an index lookup. Terms are stored once in the terms table by id.
+    Added triples are buffered and written in batches of batch_size, before any read.
+
+    Namespace bindings are kept in memory. SPARQL queries run with the rdflib engine over triples().
+    The store holds one graph: it is context and graph aware (pyshacl wraps the data graph store in a Dataset),
+    but every context is that graph.
+    '''
+    context_aware = True
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = True
+
+    def __init__(self, configuration=None, identifier=None, batch_size=20000):
+        self.identifier = identifier
+        self.batch_size = batch_size
+        self.connection = None
+        self.path = None
+        self.graph = None
+        self.pending = []
+        self.count = 0
+        self.bindings = SimpleMemory()
+        super().__init__(configuration)
+
+    def open(self, configuration, create=True):
+        self.path = configuration
+        self.connection = sqlite3.connect(configuration)
+        # Scratch store of one evaluation: no durability needed
+        self.connection.execute("PRAGMA journal_mode=OFF")
+        self.connection.execute("PRAGMA synchronous=OFF")
+        self.connection.execute("PRAGMA cache_size=-65536")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS terms (
+                id INTEGER PRIMARY KEY,
+                kind INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                datatype TEXT,
+                lang TEXT
+            )""")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS triples (
+                s INTEGER NOT NULL,
+                p INTEGER NOT NULL,
+                o INTEGER NOT NULL,
+                PRIMARY KEY (s, p, o)
+            ) WITHOUT ROWID""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p)")
+        self.count = self.connection.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        if self.connection is not None:
+            self.flush()
+            self.connection.close()
+            self.connection = None
+
+    def destroy(self, configuration):
+        self.close()
+        for path in (configuration, f"{configuration}-journal"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def flush(self):
+        '''
+        Writes the buffered triples
+        '''
+        if not self.pending:
+            return
+        terms = {}
+        rows = []
+        for triple in self.pending:
+            ids = []
+            for term in triple:
+                encoded = encode_term(term)
+                terms[encoded[0]] = encoded
+                ids.append(encoded[0])
+            rows.append(ids)
+        self.pending = []
+        self.connection.executemany("INSERT OR IGNORE INTO terms VALUES (?, ?, ?, ?, ?)", terms.values())
+        self.count += self.connection.executemany("INSERT OR IGNORE INTO triples VALUES (?, ?, ?)", rows).rowcount
+        self.connection.commit()
+
+    def commit(self):
+        self.flush()
+
+    def rollback(self):
+        self.pending = []
+
+    def add(self, triple, context, quoted=False):
+        self.pending.append(triple)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def addN(self, quads):
+        for s, p, o, context in quads:
+            self.add((s, p, o), context)
+
+    def _where(self, triple_pattern):
+        '''
+        Returns the WHERE clause and parameters of a triple pattern
+        '''
+        conditions = []
+        parameters = []
+        for column, term in zip('spo', triple_pattern):
+            if term is not None:
+                conditions.append(f"t.{column} = ?")
+                parameters.append(encode_term(term)[0])
+        return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', parameters
+
+    def remove(self, triple_pattern, context=None):
+        self.flush()
+        where, parameters = self._where(triple_pattern)
+        self.count -= self.connection.execute(f"DELETE FROM triples AS t{where}", parameters).rowcount
+        self.connection.commit()
+
+    def triples(self, triple_pattern, context=None):
+        self.flush()
+        where, parameters = self._where(triple_pattern)
+        # Join the terms of the unbound positions only
+        columns = []
+        joins = []
+        for column, term in zip('spo', triple_pattern):
+            if term is None:
+                columns.append(f"{column}t.kind, {column}t.value, {column}t.datatype, {column}t.lang")
+                joins.append(f" JOIN terms AS {column}t ON {column}t.id = t.{column}")
+        contexts = (context if context is not None else self.default_graph(),)
+        if not columns:
+            if self.connection.execute(f"SELECT 1 FROM triples AS t{where}", parameters).fetchone():
+                yield triple_pattern, iter(contexts)
+            return
+        cursor = self.connection.execute(f"SELECT {', '.join(columns)} FROM triples AS t{''.join(joins)}{where}", parameters)
+        for row in cursor:
+            terms = iter(decode_term(*row[i:i + 4]) for i in range(0, len(row), 4))
+            yield tuple(term if term is not None else next(terms) for term in triple_pattern), iter(contexts)
+
+    def __len__(self, context=None):
+        self.flush()
+        return self.count
+
+    def default_graph(self):
+        '''
+        Graph of the store, the context of every triple
+        '''
+        if self.graph is None:
+            self.graph = rdflib.Graph(store=self, identifier=self.identifier)
+        return self.graph
+
+    def contexts(self, triple=None):
+        if triple is None or triple in self.default_graph():
+            yield self.default_graph()
+
+    def add_graph(self, graph):
+        pass
+
+    def remove_graph(self, graph):
+        pass
+
+    def bind(self, prefix, namespace, override=True):
+        self.bindings.bind(prefix, namespace, override)
+
+    def namespace(self, prefix):
+        return self.bindings.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.bindings.prefix(namespace)
+
+    def namespaces(self):
+        return self.bindings.namespaces()
+
+
+class PredicateFilter(Store):
+    '''
+    Parsing sink that adds to graph only the triples of predicates, the others are dropped (counted) while the
+    catalog is parsed, never stored (lean loading: Graph(store=PredicateFilter(graph, predicates)).parse(...))
+    '''
+
+    def __init__(self, graph, predicates):
+        super().__init__()
+        self.graph = graph
+        self.predicates = frozenset(predicates)
+        self.dropped = 0
+        self._add = graph.store.add
+
+    def add(self, triple, context, quoted=False):
+        if triple[1] in self.predicates:
+            self._add(triple, self.graph, False)
+        else:
+            self.dropped += 1
+
+    def bind(self, prefix, namespace, override=True):
+        self.graph.bind(prefix, namespace, override=override)
+
+def filter_graph(graph, predicates):
+    '''
+    Removes from graph the triples whose predicate is not in predicates (lean loading of a graph already built, e.g.
+    harvested). Returns the number of removed triples
+    '''
+    dropped = 0
+    for predicate in set(graph.predicates(unique=True)) - set(predicates):
+        before = len(graph)
+        graph.remove((None, predicate, None))
+        dropped += before - len(graph)
+    return dropped
+
+def new_graph(store=GRAPH_STORE, name='graph', store_dir=GRAPH_STORE_DIR):
+    '''
+    Returns an empty rdflib.Graph on the GRAPH_STORE backend:
+    - 'memory': rdflib default in-memory store.
+    - 'sqlite': SQLiteStore in store_dir/<name>_<pid>.sqlite, removed by close_graph.
+    '''
+    if store == 'memory':
+        return rdflib.Graph()
+    if store != 'sqlite':
+        raise ValueError(f"Unknown graph store '{store}', expected 'memory' or 'sqlite'")
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, f"{os.path.basename(name)}_{os.getpid()}.sqlite")
+    if os.path.exists(path):
+        os.remove(path)
+    logging.debug(f"{log_module}:Graph store {path}")
+    return rdflib.Graph(store=SQLiteStore(path))
+
+def close_graph(graph):
+    '''
+    Releases the store of a graph of new_graph (removes the SQLite file)
+    '''
+    store = graph.store
+    if isinstance(store, SQLiteStore) and store.path:
+        store.destroy(store.path)
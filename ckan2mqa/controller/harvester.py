@@ -0,0 +1,250 @@
+# inbuilt libraries
+import json
+import time
+import logging
+import threading
+import concurrent.futures
+from collections import deque
+from urllib.parse import quote
+
+# third-party libraries
+import rdflib
+
+# custom functions
+from config.log import get_log_module
+from controller import http_client
+from config.defaults import (
+    EDP_API_CKAN_BASE_URL,
+    HARVEST_WORKERS,
+    HARVEST_RETRIES,
+    HARVEST_BACKOFF,
+    HARVEST_PAGE_SIZE,
+    SPARQL_BATCH_SIZE
+)
+
+log_module = get_log_module()
+
+
+def edp_dataset_url(dataset):
+    '''
+    Turtle document of an European Data Portal dataset (its id or its URI, whose last segment is the id)
+    '''
+    dataset_id = dataset.rstrip('/').split('/')[-1]
+    return f"{EDP_API_CKAN_BASE_URL}/data/api/datasets/{dataset_id}.ttl?useNormalizedId=true&locale=en"
+
+
+class HarvestSource:
+    '''
+    Datasets of a harvest: documents() yields every document to harvest (all the pages of the search, fetched as
+    they are consumed), fetch returns the RDF of a document in rdf_format. By default the documents are the URLs of
+    the datasets.
+    '''
+    rdf_format = 'turtle'
+
+    def documents(self):
+        raise NotImplementedError
+
+    def fetch(self, document, retries = HARVEST_RETRIES, backoff = HARVEST_BACKOFF):
+        return http_client.get(document, retries=retries, backoff=backoff).content
+
+    def label(self, document):
+        return document
+
+
+class CkanPackageSource(HarvestSource):
+    '''
+    Datasets of a CKAN package_search (/dataset/<name>.rdf), paged with start/rows until result.count
+    '''
+    rdf_format = 'xml'
+
+    def __init__(self, ckan_url, keyword, page_size = HARVEST_PAGE_SIZE):
+        self.ckan_url = ckan_url.rstrip('/')
+        self.keyword = keyword
+        self.page_size = page_size
+
+    def documents(self):
+        start = 0
+        while True:
+            search_request = f"{self.ckan_url}/api/3/action/package_search?q={quote(self.keyword)}&rows={self.page_size}&start={start}"
+            result = get_json(search_request)['result']
+            for row in result['results']:
+                yield f"{self.ckan_url}/dataset/{row['name']}.rdf"
+            start += len(result['results'])
+            if not result['results'] or start >= result['count']:
+                return
+
+
+class EdpSearchSource(HarvestSource):
+    '''
+    Datasets of an European Data Portal search (data/search), paged with page/limit until result.count
+    '''
+    def __init__(self, search_url, keyword, page_size = HARVEST_PAGE_SIZE):
+        self.search_url = search_url.rstrip('/')
+        self.keyword = keyword
+        self.page_size = page_size
+
+    def documents(self):
+        page = 0
+        harvested = 0
+        while True:
+            search_request = f"{self.search_url}/search?q={quote(chr(34) + self.keyword + chr(34))}&limit={self.page_size}&page={page}"
+            result = get_json(search_request)['result']
+            for row in result['results']:
+                yield edp_dataset_url(row['id'])
+            harvested += len(result['results'])
+            page += 1
+            if not result['results'] or harvested >= result['count']:
+                return
+
+
+class SparqlSource(HarvestSource):
+    '''
+    Datasets (?s) of a SPARQL SELECT query on the European Data Portal, paged with LIMIT/OFFSET (ordered by ?s, so the
+    pages do not overlap) until a page has less than page_size results
+    '''
+    def __init__(self, endpoint, query, page_size = HARVEST_PAGE_SIZE):
+        self.endpoint = endpoint
+        self.query = query
+        self.page_size = page_size
+
+    def documents(self):
+        for dataset in self.dataset_iris():
+            yield edp_dataset_url(dataset)
+
+    def dataset_iris(self):
+        from SPARQLWrapper import SPARQLWrapper, JSON
+        offset = 0
+        while True:
+            sparql = SPARQLWrapper(self.endpoint)
+            sparql.setQuery(f"{self.query}\nORDER BY ?s LIMIT {self.page_size} OFFSET {offset}")
+            sparql.setReturnFormat(JSON)
+            bindings = sparql.query().convert()['results']['bindings']
+            for row in bindings:
+                yield row['s']['value']
+            offset += len(bindings)
+            if len(bindings) < self.page_size:
+                return
+
+
+class SparqlConstructSource(HarvestSource):
+    '''
+    Descriptions of the datasets of a SparqlSource retrieved from the SPARQL endpoint itself, without a request by
+    dataset: the dataset IRIs (paged SELECT) are grouped in batches of batch_size and each batch is a CONSTRUCT query
+    (VALUES block), POSTed to the endpoint, of the triples of the datasets and of their distributions, and of the
+    blank nodes reached from them through blank nodes (e.g. contact point and its address, temporal, checksum of a
+    distribution), up to blank_depth nested blank nodes.
+    '''
+    BLANK_DEPTH = 4
+
+    def __init__(self, datasets, batch_size = SPARQL_BATCH_SIZE, blank_depth = BLANK_DEPTH):
+        self.datasets = datasets
+        self.batch_size = max(1, batch_size)
+        self.blank_depth = blank_depth
+
+    def construct_query(self, datasets):
+        '''
+        CONSTRUCT of the datasets: ?r is a dataset or one of its distributions (dcat:distribution? path), each nested
+        OPTIONAL follows the triples of a blank object ?o<n> of the previous level
+        '''
+        template = ['?r ?p0 ?o0 .'] + [f"?o{level - 1} ?p{level} ?o{level} ." for level in range(1, self.blank_depth + 1)]
+        optional = ''
+        for level in range(self.blank_depth, 0, -1):
+            optional = f"OPTIONAL {{ ?o{level - 1} ?p{level} ?o{level} . FILTER (isBlank(?o{level - 1})) {optional}}}"
+        values = ' '.join(f"<{dataset}>" for dataset in datasets)
+        return (f"PREFIX dcat: <http://www.w3.org/ns/dcat#>\n"
+                f"CONSTRUCT {{ {' '.join(template)} }}\n"
+                f"WHERE {{ VALUES ?s {{ {values} }} ?s dcat:distribution? ?r . ?r ?p0 ?o0 . {optional}}}")
+
+    def documents(self):
+        batch = []
+        for dataset in self.datasets.dataset_iris():
+            batch.append(dataset)
+            if len(batch) == self.batch_size:
+                yield tuple(batch)
+                batch = []
+        if batch:
+            yield tuple(batch)
+
+    def fetch(self, document, retries = HARVEST_RETRIES, backoff = HARVEST_BACKOFF):
+        query = self.construct_query(document)
+        # Turtle or N-Triples (a subset of Turtle), both parsed as rdf_format
+        return http_client.post(self.datasets.endpoint, data={'query': query}, headers={'Accept': 'text/turtle, application/n-triples;q=0.9'},
+                                retries=retries, backoff=backoff).content
+
+    def label(self, document):
+        return f"{len(document)} datasets from {document[0]}"
+
+
+def get_json(url, retries = HARVEST_RETRIES, backoff = HARVEST_BACKOFF):
+    return json.loads(http_client.get(url, retries=retries, backoff=backoff).content)
+
+
+class Harvester:
+    '''
+    Harvests the documents of a HarvestSource: at most 2 * workers documents are fetched (shared session) and
+    parsed at the same time while the source pages are read. Each worker thread parses its documents in its own graph,
+    without locks, and the worker graphs are merged in the graph of the harvest when every document is parsed.
+    A document that still fails after the retries is logged and skipped (failed).
+    '''
+
+    def __init__(self, source, workers = HARVEST_WORKERS, retries = HARVEST_RETRIES, backoff = HARVEST_BACKOFF):
+        self.source = source
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.documents = 0
+        self.failed = []
+        self._local = threading.local()
+        self._worker_graphs = []
+
+    def _worker_graph(self):
+        graph = getattr(self._local, 'graph', None)
+        if graph is None:
+            graph = self._local.graph = rdflib.Graph()
+            # list.append is atomic, every worker registers its own graph once
+            self._worker_graphs.append(graph)
+        return graph
+
+    def _fetch(self, document):
+        content = self.source.fetch(document, self.retries, self.backoff)
+        # Parsed on its own first, a document that fails to parse adds none of its triples
+        public_id = document if isinstance(document, str) else None
+        document_graph = rdflib.Graph().parse(data=content, format=self.source.rdf_format, publicID=public_id)
+        worker_graph = self._worker_graph()
+        for prefix, namespace in document_graph.namespaces():
+            worker_graph.bind(prefix, namespace, override=False)
+        worker_graph.addN((s, p, o, worker_graph) for s, p, o in document_graph)
+
+    def harvest(self, graph = None):
+        '''
+        Returns graph (a new one if None) with the triples of every document of the source
+        '''
+        graph = rdflib.Graph() if graph is None else graph
+        http_before = http_client.stats()
+        documents = self.source.documents()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for document in documents:
+                pending.append((document, executor.submit(self._fetch, document)))
+                if len(pending) >= 2 * self.workers:
+                    break
+            while pending:
+                document, future = pending.popleft()
+                try:
+                    future.result()
+                    self.documents += 1
+                except Exception as e:
+                    logging.error(f"{log_module}:Failed to harvest {self.source.label(document)}: {e}")
+                    self.failed.append(document)
+                next_document = next(documents, None)
+                if next_document is not None:
+                    pending.append((next_document, executor.submit(self._fetch, next_document)))
+
+        for worker_graph in self._worker_graphs:
+            for prefix, namespace in worker_graph.namespaces():
+                graph.bind(prefix, namespace, override=False)
+            graph.addN((s, p, o, graph) for s, p, o in worker_graph)
+        self._worker_graphs = []
+        self._local = threading.local()
+        logging.info(f"{log_module}:Harvested {self.documents} documents ({len(self.failed)} failed), {len(graph)} triples. HTTP: {http_client.describe(http_client.stats_since(http_before))}")
+        return graph
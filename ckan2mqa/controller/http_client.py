@@ -0,0 +1,178 @@
+# inbuilt libraries
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from email.utils import parsedate_to_datetime
+
+# custom functions
+from config.log import get_log_module
+from config.defaults import (
+    HTTP_TIMEOUT,
+    HTTP_RETRIES,
+    HTTP_BACKOFF,
+    HTTP_POOL_HOSTS,
+    HTTP_POOL_SIZE,
+    HTTPS_VERIFY,
+    headers
+)
+
+log_module = get_log_module()
+
+# Status codes retried (rate limited or temporarily unavailable), after their Retry-After if any
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Longest Retry-After waited (seconds), a longer one fails the request
+MAX_RETRY_AFTER = 120
+
+# Session of the process (a forked worker opens its own connections) and its counters
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_stats = Counter()
+
+
+def get_session():
+    '''
+    requests session shared by the HTTP requests of the process (catalog harvest, dataset harvests, vocabularies
+    download): a pool of HTTP_POOL_SIZE keep-alive connections for each of the last HTTP_POOL_HOSTS hosts, and
+    compressed responses (gzip, deflate). Requests are counted (stats) and have a HTTP_TIMEOUT timeout by default.
+    Certificates are verified only if PYTHONHTTPSVERIFY is set (HTTPS_VERIFY), like the urllib requests of rdflib.
+    '''
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            class CountingSession(requests.Session):
+                def request(self, method, url, **kwargs):
+                    kwargs.setdefault('timeout', HTTP_TIMEOUT)
+                    # Per request, a session verify is overridden by REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE
+                    kwargs.setdefault('verify', self.verify)
+                    response = super().request(method, url, **kwargs)
+                    count_response(response, kwargs.get('stream', False))
+                    return response
+
+            _session = CountingSession()
+            _session.headers.update(headers)
+            _session.headers['Accept-Encoding'] = 'gzip, deflate'
+            _session.verify = HTTPS_VERIFY
+            if not HTTPS_VERIFY:
+                import urllib3
+                urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_SIZE)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _session_pid = os.getpid()
+            _stats.clear()
+        return _session
+
+def count_response(response, stream=False):
+    '''
+    Counts a response (and its redirects) and the bytes received, as transferred (compressed) and decoded. The body
+    of a streamed response is read by the caller, its transferred bytes are counted when it is closed
+    '''
+    with _session_lock:
+        _stats['requests'] += 1 + len(response.history)
+    if not stream:
+        with _session_lock:
+            _stats['bytes'] += response.raw.tell()
+            _stats['decoded_bytes'] += len(response.content or b'')
+        return
+    close = response.close
+    def close_and_count():
+        with _session_lock:
+            _stats['bytes'] += response.raw.tell()
+        close()
+    response.close = close_and_count
+
+def retry_after(response, default):
+    '''
+    Seconds to wait before retrying response: its Retry-After (seconds or HTTP date) or default
+    '''
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return default
+    return max(0.0, seconds)
+
+def request(method, url, retries = HTTP_RETRIES, backoff = HTTP_BACKOFF, **kwargs):
+    '''
+    Request with the shared session. Connection errors, timeouts, interrupted transfers and RETRY_STATUS responses are
+    retried up to retries times, after the Retry-After of the response or an exponential backoff (backoff,
+    2 * backoff, ...). Returns the response, raises a requests.exceptions.RequestException (HTTPError for an error
+    status) if the last attempt fails.
+    '''
+    from requests.exceptions import ConnectionError, Timeout, ChunkedEncodingError, ContentDecodingError
+    session = get_session()
+    for attempt in range(retries + 1):
+        wait = backoff * 2 ** attempt
+        try:
+            response = session.request(method, url, **kwargs)
+        except (ConnectionError, Timeout, ChunkedEncodingError, ContentDecodingError) as e:
+            if attempt == retries:
+                raise
+            error = e
+        else:
+            if response.status_code not in RETRY_STATUS or attempt == retries:
+                response.raise_for_status()
+                return response
+            wait = retry_after(response, wait)
+            if wait > MAX_RETRY_AFTER:
+                response.raise_for_status()
+            error = f"status {response.status_code}"
+            response.close()
+        with _session_lock:
+            _stats['retries'] += 1
+        logging.warning(f"{log_module}:Retrying URL {url} in {round(wait, 1)}s ({attempt + 1}/{retries}): {error}")
+        time.sleep(wait)
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+def stats():
+    '''
+    Counters of the process: requests, retries, bytes (transferred) and decoded_bytes (responses read at once),
+    connections opened and requests that reused an open connection
+    '''
+    with _session_lock:
+        counters = dict(_stats)
+        pools = []
+        if _session is not None and _session_pid == os.getpid():
+            # Connection pools of the hosts still in the pool manager (HTTP_POOL_HOSTS most recent)
+            pool_manager = _session.adapters['https://'].poolmanager
+            pools = [pool_manager.pools[key] for key in pool_manager.pools.keys()]
+    connections = sum(pool.num_connections for pool in pools)
+    pool_requests = sum(pool.num_requests for pool in pools)
+    return {
+        'requests': counters.get('requests', 0),
+        'retries': counters.get('retries', 0),
+        'bytes': counters.get('bytes', 0),
+        'decoded_bytes': counters.get('decoded_bytes', 0),
+        'connections': connections,
+        'reused': max(0, pool_requests - connections),
+    }
+
+def stats_since(before):
+    '''
+    Counters of stats() since a previous stats() (e.g. of a profile phase)
+    '''
+    return {key: value - before.get(key, 0) for key, value in stats().items()}
+
+def describe(counters):
+    '''
+    One line summary of stats() counters for the logs
+    '''
+    megabytes = lambda count: round(count / 1024 / 1024, 2)
+    return (f"{counters['requests']} requests ({counters['retries']} retries), {counters['connections']} connections opened "
+            f"and {counters['reused']} reused, {megabytes(counters['bytes'])} MB transferred ({megabytes(counters['decoded_bytes'])} MB decoded)")
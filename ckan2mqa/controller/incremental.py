@@ -0,0 +1,295 @@
+# inbuilt libraries
+import os
+import glob
+import json
+import hashlib
+import time
+import sqlite3
+import logging
+from collections import Counter, defaultdict
+
+# custom functions
+from config.log import get_log_module
+from controller.mqa_evaluate import MqaEvaluate
+from controller.indicator_engine import IndicatorEngine
+from controller.shards import DatasetShards, validate_shards, write_violations
+from controller.profiling import link_timings
+from controller.link_checker import LinkResult
+from controller.shapes import hash_files
+from config.defaults import (
+    DATASET,
+    DISTRIBUTION,
+    MQA_INDICATORS,
+    INCREMENTAL_STATE_FILE,
+    INCREMENTAL_MAX_AGE,
+    SHACL_INFERENCE
+)
+
+log_module = get_log_module()
+
+
+class IncrementalState:
+    '''
+    SQLite store of the per-dataset results of previous runs, by catalog:
+    - datasets: fingerprint, evaluation time and indicator results of each dataset key
+    - indicators: dimension, property label and weight printed for each indicator
+    - configurations: digest of the evaluation configuration of the stored results (IncrementalEvaluate.config_digest)
+    '''
+
+    def __init__(self, path=INCREMENTAL_STATE_FILE, catalog=''):
+        self.path = path
+        self.catalog = catalog
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS datasets (
+                catalog TEXT NOT NULL,
+                dataset TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                evaluated_at REAL NOT NULL,
+                results TEXT NOT NULL,
+                PRIMARY KEY (catalog, dataset)
+            )""")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS indicators (
+                catalog TEXT NOT NULL,
+                indicator TEXT NOT NULL,
+                dimension TEXT NOT NULL,
+                property TEXT NOT NULL,
+                weight NOT NULL,
+                PRIMARY KEY (catalog, indicator)
+            )""")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS configurations (
+                catalog TEXT NOT NULL PRIMARY KEY,
+                digest TEXT NOT NULL
+            )""")
+
+    def check_configuration(self, digest):
+        '''
+        Drops the stored datasets and indicators of the catalog if they were evaluated with another configuration
+        (or before the configurations were stored). Returns True if they were dropped.
+        '''
+        row = self.connection.execute("SELECT digest FROM configurations WHERE catalog = ?", (self.catalog,)).fetchone()
+        if row is not None and row[0] == digest:
+            return False
+        self.connection.execute("DELETE FROM datasets WHERE catalog = ?", (self.catalog,))
+        self.connection.execute("DELETE FROM indicators WHERE catalog = ?", (self.catalog,))
+        self.connection.execute("INSERT OR REPLACE INTO configurations (catalog, digest) VALUES (?, ?)", (self.catalog, digest))
+        self.connection.commit()
+        return row is not None
+
+    def load(self):
+        '''
+        Returns {dataset: (fingerprint, evaluated_at, results)} of the catalog
+        '''
+        rows = self.connection.execute(
+            "SELECT dataset, fingerprint, evaluated_at, results FROM datasets WHERE catalog = ?", (self.catalog,))
+        return {dataset: (fingerprint, evaluated_at, results) for dataset, fingerprint, evaluated_at, results in rows}
+
+    def load_labels(self):
+        rows = self.connection.execute(
+            "SELECT indicator, dimension, property, weight FROM indicators WHERE catalog = ?", (self.catalog,))
+        return {indicator: [dimension, property, weight] for indicator, dimension, property, weight in rows}
+
+    def save(self, results, deleted, labels):
+        '''
+        Stores {dataset: (fingerprint, results)}, removes the deleted datasets and updates the indicator labels
+        '''
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO datasets (catalog, dataset, fingerprint, evaluated_at, results) VALUES (?, ?, ?, ?, ?)",
+            ((self.catalog, dataset, fingerprint, now, json.dumps(result)) for dataset, (fingerprint, result) in results.items()))
+        self.connection.executemany(
+            "DELETE FROM datasets WHERE catalog = ? AND dataset = ?", ((self.catalog, dataset) for dataset in deleted))
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO indicators (catalog, indicator, dimension, property, weight) VALUES (?, ?, ?, ?, ?)",
+            ((self.catalog, indicator, *label) for indicator, label in labels.items()))
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class IncrementalEvaluate(MqaEvaluate):
+    '''
+    MQA evaluation that only re-evaluates the datasets that are new, changed (different fingerprint) or whose
+    stored results are older than max_age, and drops the deleted ones. The per-dataset indicator results are
+    kept in an IncrementalState, and the catalog totals of _results.txt and the _errors_<property>.txt link
+    check files are rebuilt from the stored results of every dataset.
+
+    SHACL validation only runs on the shards of the re-evaluated datasets (controller.shards). As in the full
+    evaluation, the DCAT-AP compliance count is the dataset count if every dataset conforms, 0 otherwise, or the
+    number of conforming datasets with SHACL_MODE=datasets.
+    '''
+
+    def __init__(self, *args, state_file=INCREMENTAL_STATE_FILE, catalog_key=None, max_age=INCREMENTAL_MAX_AGE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state_file = state_file
+        self.catalog_key = catalog_key if catalog_key is not None else self.catalog_filename
+        self.max_age = max_age
+        self.record = None
+        self.current_indicator = None
+        self.labels = {}
+
+    def evaluate(self):
+        logging.debug(f"{log_module}: Starting incremental evaluation process.")
+        shards = DatasetShards(self.graph)
+        state = IncrementalState(self.state_file, self.catalog_key)
+        try:
+            if state.check_configuration(self.config_digest()):
+                logging.info(f"{log_module}:{self.catalog_filename} evaluation configuration changed, every dataset is evaluated again")
+            stored = state.load()
+            now = time.time()
+            fingerprints = {key: shards.fingerprint(key) for key in shards.keys()}
+            changed = [key for key, fingerprint in fingerprints.items()
+                       if key not in stored or stored[key][0] != fingerprint or now - stored[key][1] > self.max_age]
+            deleted = [key for key in stored if key not in fingerprints]
+            logging.info(f"{log_module}:{self.catalog_filename} incremental evaluation: {len(fingerprints)} datasets, {len(changed)} new or changed, {len(deleted)} deleted")
+
+            changed_keys = set(changed)
+            results = {key: json.loads(stored[key][2]) for key in fingerprints if key not in changed_keys}
+            if changed:
+                self.prefetch_urls(set().union(*(shards.subjects(key) for key in changed)))
+                conforms = self.shacl_shards(shards, changed)
+                with self.profile.phase('indicators'):
+                    for key in changed:
+                        logging.debug(f"{log_module}: Evaluating dataset {key}")
+                        results[key] = self.evaluate_subjects(shards.subjects(key), conforms[key])
+            state.save({key: (fingerprints[key], results[key]) for key in changed}, deleted, self.labels)
+            labels = state.load_labels()
+        finally:
+            state.close()
+
+        self.write_results(results, labels)
+        self.write_profile()
+        logging.info(f"{log_module}:{self.catalog_filename} total points: {round(self.totalPoints, 2)}")
+
+    def config_digest(self):
+        '''
+        sha1 of the configuration the stored results depend on: catalog type, SHACL mode and inference, MQA indicators,
+        and the content of the shapes files and of the vocabulary files
+        '''
+        digest = hashlib.sha1(json.dumps([self.catalog_type, self.shacl_mode, SHACL_INFERENCE, MQA_INDICATORS], sort_keys=True, default=str).encode('utf-8'))
+        files = self.shapes_files() if self.shapes is not None else []
+        files += sorted(glob.glob(f"{self.app_dir}/ckan2mqa/assets/vocabs/*.csv"))
+        digest.update(hash_files(files).encode('utf-8'))
+        return digest.hexdigest()
+
+    def evaluate_subjects(self, subjects, conforms):
+        '''
+        Runs every indicator restricted to subjects (one dataset key) and returns its counts and link errors
+        '''
+        full_evaluation = (self.indicators, self.datasetCount, self.distributionCount)
+        self.indicators = IndicatorEngine(self.graph, subjects=subjects)
+        self.datasetCount = self.count_entities(DATASET)
+        self.distributionCount = self.count_entities(DISTRIBUTION)
+        self.record = {'counts': {}, 'errors': {}, 'conforms': conforms}
+        try:
+            for key, value in MQA_INDICATORS.items():
+                self.current_indicator = key
+                getattr(self, value['function'])()
+            return self.record
+        finally:
+            self.indicators, self.datasetCount, self.distributionCount = full_evaluation
+            self.record = None
+            self.current_indicator = None
+
+    def prefetch_urls(self, subjects):
+        '''
+        Checks every URL of the re-evaluated datasets in one batch
+        '''
+        engine = IndicatorEngine(self.graph, subjects=subjects)
+        urls = set()
+        for value in MQA_INDICATORS.values():
+            if value['count_method'] == 'count_urls_with_200_code':
+                urls.update(str(url) for url in engine.value_counts(DISTRIBUTION, value['property']))
+        with self.profile.phase('links', urls=len(urls)) as phase:
+            results = self.link_results.check(sorted(urls))
+            phase.update(link_timings(results.values()))
+
+    def shacl_shards(self, shards, keys):
+        '''
+        Validates the shards of keys (controller.shards) and returns {key: conforms}
+        '''
+        if self.catalog is None or self.shapes is None:
+            return {key: True for key in keys}
+        with self.profile.phase('shacl', triples=len(self.graph)):
+            conforms, violations = validate_shards(shards, keys, self.shapes_files())
+        if violations:
+            write_violations(f"{self.catalog_file_folder}/{self.catalog_filename}_errors_SHACL.txt", violations)
+        return conforms
+
+    def write_results(self, results, labels):
+        '''
+        Writes _results.txt and the link check error files from the per-dataset results. Only the failed URLs are
+        stored by dataset, so they are the only link outcomes of the structured results
+        '''
+        totals = defaultdict(lambda: [0, 0])
+        errors = defaultdict(Counter)
+        conforms = True
+        for result in results.values():
+            for indicator, (count, population) in result['counts'].items():
+                totals[indicator][0] += count
+                totals[indicator][1] += population
+            for property, urls in result['errors'].items():
+                errors[property].update(urls)
+            conforms = conforms and result['conforms']
+
+        # Link errors first: the run record written by write_total closes the results writer
+        for value in MQA_INDICATORS.values():
+            if value['count_method'] == 'count_urls_with_200_code':
+                property = value['property']
+                error_file_name = f"{self.catalog_file_folder}/{self.catalog_filename}_errors_{property.replace(':','_')}.txt"
+                with open(error_file_name, "w", encoding="utf-8") as text_file:
+                    for url, partialCount in errors[property].items():
+                        text_file.write(url + '\t' + str(partialCount) + '\n')
+                        self.results_writer.link(property, self.link_results.results.get(url) or LinkResult(url, False, None, None), partialCount)
+
+        self.totalPoints = 0
+        self.dimensionPoints.clear()
+        self.write_header()
+        for key, value in MQA_INDICATORS.items():
+            if key not in labels:
+                continue
+            dimension, property, weight = labels[key]
+            count, population = totals[key]
+            if value['count_method'] == 'shacl' and count >= 0 and self.shacl_mode != 'datasets':
+                count = population if conforms else 0
+            MqaEvaluate.print(self, dimension, property, count, population, weight)
+        self.write_total()
+
+    # Per-dataset evaluation: record the counts instead of writing them
+    def print(self, dimension, property, count, population, weight):
+        if self.record is None:
+            return super().print(dimension, property, count, population, weight)
+        self.record['counts'][self.current_indicator] = [count, population]
+        self.labels[self.current_indicator] = [dimension, property, weight]
+
+    def shacl(self):
+        if self.record is None:
+            return super().shacl()
+        return self.record['conforms']
+
+    def shacl_datasets(self):
+        if self.record is None:
+            return super().shacl_datasets()
+        return self.indicators.subjects[DATASET] if self.record['conforms'] else set()
+
+    def count_urls_with_200_code(self, property):
+        if self.record is None:
+            return super().count_urls_with_200_code(property)
+        count = 0
+        errors = Counter()
+        for value, partialCount in self.indicators.value_counts(DISTRIBUTION, property).items():
+            url = str(value)
+            result = self.link_results.results.get(url) or self.link_results.check([url])[url]
+            if result.ok:
+                count += partialCount
+            else:
+                errors[url] += partialCount
+        if errors:
+            self.record['errors'][property] = dict(errors)
+        return count
@@ -0,0 +1,153 @@
+# inbuilt libraries
+import logging
+from collections import Counter, defaultdict
+
+# third-party libraries
+from rdflib import RDF, RDFS, Namespace, URIRef
+
+# custom functions
+from config.log import get_log_module
+from config.defaults import (
+    DISTRIBUTION,
+    DATASET,
+    MQA_INDICATORS,
+)
+
+log_module = get_log_module()
+
+# Prefixes used by the MQA_INDICATORS CURIEs (same as the old per-indicator SPARQL queries)
+PREFIXES = {
+    'dct': Namespace('http://purl.org/dc/terms/'),
+    'dcat': Namespace('http://www.w3.org/ns/dcat#'),
+    'rdf': Namespace('http://www.w3.org/1999/02/22-rdf-syntax-ns#'),
+    'rdfs': Namespace('http://www.w3.org/2000/01/rdf-schema#'),
+    'xsd': Namespace('http://www.w3.org/2001/XMLSchema#'),
+}
+
+# Count methods that need the distinct values of a property, not only its availability
+VALUE_COUNT_METHODS = [
+    'count_values_containing_vocabulary',
+    'count_values_contained_in_vocabulary',
+    'count_urls_with_200_code',
+]
+
+
+def expand_curie(curie, graph=None):
+    '''
+    Expands a CURIE like 'dcat:Dataset' to a URIRef, falling back to the graph namespaces
+    '''
+    if isinstance(curie, URIRef):
+        return curie
+    prefix, _, name = curie.partition(':')
+    if prefix in PREFIXES:
+        return PREFIXES[prefix][name]
+    if graph is not None:
+        return graph.namespace_manager.expand_curie(curie)
+    raise ValueError(f"Unknown prefix '{prefix}' in {curie}")
+
+def indicator_value_properties(indicators=MQA_INDICATORS):
+    '''
+    Returns the (entity, property) pairs whose values are counted by the MQA indicators
+    '''
+    pairs = set()
+    for info in indicators.values():
+        if info['count_method'] not in VALUE_COUNT_METHODS:
+            continue
+        properties = info['property'] if isinstance(info['property'], list) else [info['property']]
+        for prop in properties:
+            pairs.add((info['entity'], prop))
+    return pairs
+
+def indicator_predicates(indicators=MQA_INDICATORS):
+    '''
+    Returns the predicates the MQA indicators read: their properties, rdf:type (entities), dcat:distribution (datasets
+    of the distributions) and rdfs:label (format labels of NTI catalogs)
+    '''
+    predicates = {RDF.type, RDFS.label, PREFIXES['dcat'].distribution}
+    for info in indicators.values():
+        properties = info['property'] if isinstance(info['property'], list) else [info['property']]
+        # 'DCAT-AP compliance' (SHACL) is not a property
+        predicates.update(expand_curie(prop) for prop in properties if prop.partition(':')[0] in PREFIXES)
+    return predicates
+
+
+class IndicatorEngine:
+    '''
+    Computes the entity and property counts of the MQA indicators in a single walk over the graph.
+
+    The Dataset and Distribution subject sets are built once, then every triple of those subjects
+    is visited one time to collect:
+    - the subjects that have each property (for count_entity_property)
+    - the number of subjects per distinct value for the tracked properties (the old GROUP BY ?value queries)
+    '''
+
+    def __init__(self, graph, entities=(DATASET, DISTRIBUTION), value_properties=None, subjects=None):
+        '''
+        subjects: optional set of subjects the counts are restricted to (e.g. one dataset and its distributions)
+        '''
+        self.graph = graph
+        if value_properties is None:
+            value_properties = indicator_value_properties()
+
+        self.subjects = {}
+        for entity in entities:
+            entity_type = expand_curie(entity, graph)
+            if subjects is None:
+                self.subjects[entity] = set(graph.subjects(RDF.type, entity_type))
+            else:
+                self.subjects[entity] = {s for s in subjects if (s, RDF.type, entity_type) in graph}
+
+        # {predicate: [entity, ...]} of the properties whose values are tallied
+        tracked = defaultdict(list)
+        for entity, prop in value_properties:
+            if entity in self.subjects:
+                tracked[expand_curie(prop, graph)].append(entity)
+
+        self.property_subjects = {entity: defaultdict(set) for entity in self.subjects}
+        self.property_values = {entity: defaultdict(Counter) for entity in self.subjects}
+        self._walk(tracked)
+
+    def _walk(self, tracked):
+        all_subjects = set().union(*self.subjects.values()) if self.subjects else set()
+        memberships = [(entity, subjects) for entity, subjects in self.subjects.items()]
+        for s in all_subjects:
+            entities = [entity for entity, subjects in memberships if s in subjects]
+            for p, o in self.graph.predicate_objects(s):
+                for entity in entities:
+                    self.property_subjects[entity][p].add(s)
+                if p in tracked:
+                    for entity in entities:
+                        if entity in tracked[p]:
+                            self.property_values[entity][p][o] += 1
+        logging.debug(f"{log_module}:Indicator engine indexed {len(all_subjects)} subjects")
+
+    def count_entities(self, entity):
+        return len(self.subjects[entity])
+
+    def count_entity_property(self, entity, property):
+        return len(self.property_subjects[entity].get(expand_curie(property, self.graph), ()))
+
+    def value_counts(self, entity, property):
+        '''
+        Returns a Counter {value: number of entities with that value}, like "SELECT ?value (COUNT(?value) as ?count) ... GROUP BY ?value"
+        '''
+        predicate = expand_curie(property, self.graph)
+        counts = self.property_values[entity].get(predicate)
+        if counts is None:
+            # Not tracked at construction time, count it now for this property only
+            counts = Counter()
+            for s in self.subjects[entity]:
+                for o in self.graph.objects(s, predicate):
+                    counts[o] += 1
+            self.property_values[entity][predicate] = counts
+        return counts
+
+    def label_counts(self, entity, property, label_property=RDFS.label):
+        '''
+        Returns a Counter {label: count} following property and then label_property, e.g. dct:format/rdfs:label for NTI catalogs
+        '''
+        counts = Counter()
+        for value, count in self.value_counts(entity, property).items():
+            for label in self.graph.objects(value, label_property):
+                counts[label] += count
+        return counts
@@ -0,0 +1,270 @@
+# inbuilt libraries
+import csv
+import logging
+from array import array
+from collections import defaultdict
+
+# third-party libraries
+from rdflib import RDF, RDFS
+
+# custom functions
+from config.log import get_log_module
+from controller.mqa_evaluate import MqaEvaluate, contains_vocabulary_word, contains_word_vocabulary
+from controller.indicator_engine import expand_curie
+from controller.vocabularies import load_vocabulary_matcher
+from config.defaults import (
+    WEIGHT_TOTAL,
+    DATASET,
+    DISTRIBUTION,
+    CKAN_URIS,
+    CKAN,
+    EDP,
+    MQA_INDICATORS,
+)
+
+log_module = get_log_module()
+
+# Vocabulary files of the vocabulary indicators, and if the vocabulary field/test depends on the catalog type (CKAN_METADATA_TYPE)
+INDICATOR_VOCABULARIES = {
+    'interoperability_format_from_vocabulary': ('/vocabs/media-types.csv', True),
+    'interoperability_format_mediatype_from_vocabulary': ({'dct:format': '/vocabs/file-types.csv', 'dcat:mediaType': '/vocabs/media-types.csv'}, True),
+    'interoperability_format_nonProprietary': ('/vocabs/non-proprietary.csv', True),
+    'interoperability_format_machineReadable': ('/vocabs/machine-readable.csv', True),
+    'reusability_license_from_vocabulary': ('/vocabs/licenses.csv', False),
+    'reusability_accessRights_from_vocabulary': ('/vocabs/access-right.csv', False),
+}
+
+
+def indicator_properties(info):
+    return info['property'] if isinstance(info['property'], list) else [info['property']]
+
+def indicator_label(info):
+    '''
+    Indicator/property column of _results.txt
+    '''
+    if isinstance(info['property'], list):
+        return '/'.join(info['property'])
+    return info['property'] + info.get('property_suffix', '')
+
+def score_column(counts, populations, weight):
+    '''
+    Points of each row, as MqaEvaluate.print: round(count / population * weight, 2), 0 if there is no count
+    '''
+    return array('d', [round(count / population * weight, 2) if count > 0 and population > 0 else 0
+                       for count, population in zip(counts, populations)])
+
+
+class IndicatorMatrix:
+    '''
+    Per-subject indicator counts, one row per dcat:Dataset/dcat:Distribution and one column per MQA indicator of that entity.
+
+    Each column is an array with the count of its row, so the catalog count of an indicator is the sum of its column and
+    the count of a dataset for a distribution indicator is the sum of the rows of its distributions.
+    - count_entity_property: 1 if the subject has the property.
+    - value indicators (vocabularies, code=200): number of values of the subject that pass value_test.
+    - shacl: 1 for every dataset if conforms, or for the datasets in conforms if it is a set (SHACL_MODE=datasets).
+
+    The graph is walked once by predicate: every triple of a tracked predicate whose subject is a row updates its columns.
+    value_test(key, property) returns (predicate, test) where test(value) is the count of a value; the result of each
+    distinct value is computed once per column.
+
+    The layout is columnar, but numpy is not a dependency: the columns are stdlib arrays (compact, one C value by
+    row) and the column operations (sums, scores, totals by dataset) are Python loops, not vectorized operations.
+    '''
+
+    def __init__(self, graph, value_test, conforms=True, indicators=MQA_INDICATORS):
+        self.graph = graph
+        self.indicators = indicators
+        self.conforms = conforms
+        self.rows = {}
+        self.index = {}
+        for entity in (DATASET, DISTRIBUTION):
+            self.rows[entity] = sorted(set(graph.subjects(RDF.type, expand_curie(entity, graph))), key=str)
+            self.index[entity] = {subject: row for row, subject in enumerate(self.rows[entity])}
+
+        self.columns = {}
+        # {entity: {predicate: [(column, test or None), ...]}}
+        dispatch = {entity: defaultdict(list) for entity in self.rows}
+        for key, info in indicators.items():
+            entity = info['entity']
+            self.columns[key] = array('I', [0]) * len(self.rows[entity])
+            if info['count_method'] == 'shacl':
+                if isinstance(conforms, (set, frozenset)):
+                    self.columns[key] = array('I', [int(subject in conforms) for subject in self.rows[entity]])
+                elif conforms:
+                    self.columns[key] = array('I', [1]) * len(self.rows[entity])
+            elif info['count_method'] == 'count_entity_property':
+                dispatch[entity][expand_curie(info['property'], graph)].append((self.columns[key], None))
+            else:
+                for property in indicator_properties(info):
+                    predicate, test = value_test(key, property)
+                    dispatch[entity][expand_curie(predicate, graph)].append((self.columns[key], self._memoize(test)))
+
+        # (distribution row, dataset row) of every dcat:distribution
+        self.links_distribution = array('i')
+        self.links_dataset = array('i')
+        self._walk(dispatch)
+        # Number of distributions of each dataset
+        self.distribution_counts = self.group_by_dataset(array('I', [1]) * len(self.rows[DISTRIBUTION]))
+
+    @staticmethod
+    def _memoize(test):
+        results = {}
+
+        def memoized(value):
+            if value not in results:
+                results[value] = int(test(value))
+            return results[value]
+        return memoized
+
+    def _walk(self, dispatch):
+        dataset_index = self.index[DATASET]
+        distribution_index = self.index[DISTRIBUTION]
+        for s, o in self.graph.subject_objects(expand_curie('dcat:distribution', self.graph)):
+            if s in dataset_index and o in distribution_index:
+                self.links_distribution.append(distribution_index[o])
+                self.links_dataset.append(dataset_index[s])
+
+        # One scan of the triples of each tracked predicate (much faster than a lookup by subject)
+        for entity, entity_dispatch in dispatch.items():
+            index = self.index[entity]
+            for predicate, columns in entity_dispatch.items():
+                for s, o in self.graph.subject_objects(predicate):
+                    row = index.get(s)
+                    if row is None:
+                        continue
+                    for column, test in columns:
+                        if test is None:
+                            column[row] = 1
+                        else:
+                            column[row] += test(o)
+        logging.debug(f"{log_module}:Indicator matrix of {len(self.rows[DATASET])} datasets and {len(self.rows[DISTRIBUTION])} distributions")
+
+    def group_by_dataset(self, column):
+        '''
+        Sums a distribution column by dataset
+        '''
+        sums = array('I', [0]) * len(self.rows[DATASET])
+        for distribution, dataset in zip(self.links_distribution, self.links_dataset):
+            sums[dataset] += column[distribution]
+        return sums
+
+    def population(self, key):
+        '''
+        Catalog population of an indicator (number of subjects of its population_attr entity, by property)
+        '''
+        info = self.indicators[key]
+        entity = DATASET if info['population_attr'] == 'datasetCount' else DISTRIBUTION
+        return len(self.rows[entity]) * len(indicator_properties(info))
+
+    def catalog_count(self, key):
+        if self.indicators[key]['count_method'] == 'shacl' and self.conforms is None:
+            return -1
+        return sum(self.columns[key])
+
+    def dataset_counts(self, key):
+        '''
+        Returns the (counts, populations) columns of an indicator by dataset
+        '''
+        info = self.indicators[key]
+        width = len(indicator_properties(info))
+        if info['entity'] == DATASET:
+            counts = self.columns[key]
+        else:
+            counts = self.group_by_dataset(self.columns[key])
+        if info['population_attr'] == 'datasetCount':
+            populations = array('I', [width]) * len(self.rows[DATASET])
+        else:
+            populations = array('I', [count * width for count in self.distribution_counts])
+        return counts, populations
+
+    def dataset_scores(self):
+        '''
+        Returns the points columns of every indicator by dataset, {key: array}
+        '''
+        return {key: score_column(*self.dataset_counts(key), info['points']) for key, info in self.indicators.items()}
+
+    def write_matrix(self, filename, entity):
+        keys = [key for key, info in self.indicators.items() if info['entity'] == entity]
+        columns = [self.columns[key] for key in keys]
+        with open(filename, 'w', newline='', encoding='utf-8') as matrix_file:
+            writer = csv.writer(matrix_file, delimiter='\t')
+            writer.writerow([entity] + keys)
+            for row, subject in enumerate(self.rows[entity]):
+                writer.writerow([subject] + [column[row] for column in columns])
+
+    def write_dataset_scores(self, filename, rating):
+        scores = self.dataset_scores()
+        dimensions = list(dict.fromkeys(info['dimension'] for info in self.indicators.values()))
+        dimension_points = {dimension: [scores[key] for key, info in self.indicators.items() if info['dimension'] == dimension] for dimension in dimensions}
+        dimension_totals = {dimension: [sum(points) for points in zip(*columns)] for dimension, columns in dimension_points.items()}
+        totals = [sum(points) for points in zip(*scores.values())]
+        with open(filename, 'w', newline='', encoding='utf-8') as scores_file:
+            writer = csv.writer(scores_file, delimiter='\t')
+            writer.writerow(['dataset', 'distributions'] + dimensions + ['points', 'percentage', 'rating'])
+            for row, dataset in enumerate(self.rows[DATASET]):
+                points = round(totals[row], 2)
+                writer.writerow([dataset, self.distribution_counts[row]] + [round(dimension_totals[dimension][row], 2) for dimension in dimensions]
+                                + [points, round(points / WEIGHT_TOTAL, 2), rating(points)])
+
+
+class MatrixEvaluate(MqaEvaluate):
+    '''
+    MQA evaluation from an IndicatorMatrix: writes the same _results.txt (counts are the column sums), plus
+    - _matrix_datasets.tsv / _matrix_distributions.tsv: count of every indicator by dataset/distribution.
+    - _dataset_scores.tsv: points by dimension, total points and rating of every dataset, scored like a catalog with
+      only that dataset and its distributions.
+
+    The DCAT-AP compliance of each dataset is the catalog result, or its own with SHACL_MODE=datasets.
+    '''
+
+    def evaluate(self):
+        logging.debug(f"{log_module}: Starting matrix evaluation process.")
+        # Link checks: one batch by property, writes the _errors_<property>.txt files
+        for key, info in MQA_INDICATORS.items():
+            if info['count_method'] == 'count_urls_with_200_code':
+                self.count_urls_with_200_code(info['property'])
+
+        conforms = None
+        if self.catalog is not None and self.shapes is not None:
+            conforms = self.shacl_datasets() if self.shacl_mode == 'datasets' else self.shacl()
+        with self.profile.phase('indicator_matrix', triples=len(self.graph)):
+            self.matrix = IndicatorMatrix(self.graph, self.value_test, conforms)
+
+        self.write_header()
+        for key, info in MQA_INDICATORS.items():
+            self.print(info['dimension'], indicator_label(info), self.matrix.catalog_count(key), self.matrix.population(key), info['points'])
+        self.write_total()
+
+        prefix = f"{self.catalog_file_folder}/{self.catalog_filename}"
+        self.matrix.write_matrix(f"{prefix}_matrix_datasets.tsv", DATASET)
+        self.matrix.write_matrix(f"{prefix}_matrix_distributions.tsv", DISTRIBUTION)
+        self.matrix.write_dataset_scores(f"{prefix}_dataset_scores.tsv", self.get_rating)
+        self.write_profile()
+
+        logging.info(f"{log_module}:{self.catalog_filename} total points: {round(self.totalPoints, 2)}/{WEIGHT_TOTAL}")
+        logging.info(f"{log_module}:{self.catalog_filename} link checks: {len(self.link_results.results)} unique URLs checked, {self.link_results.saved} duplicate checks saved")
+
+    def value_test(self, key, property):
+        '''
+        Returns (predicate, test) of a value indicator, with the vocabulary and test of its count method for the catalog type
+        '''
+        info = MQA_INDICATORS[key]
+        if info['count_method'] == 'count_urls_with_200_code':
+            return property, lambda value: self.link_results.results[str(value)].ok
+
+        vocabulary_file, by_catalog_type = INDICATOR_VOCABULARIES[key]
+        if isinstance(vocabulary_file, dict):
+            vocabulary_file = vocabulary_file[property]
+        field = 1 if by_catalog_type and self.catalog_type == CKAN else 0
+        vocabulary = load_vocabulary_matcher(vocabulary_file, field, self.app_dir)
+
+        if by_catalog_type and self.catalog_type not in (CKAN_URIS, EDP, CKAN):
+            # NTI: last token of the rdfs:label of dct:format (MqaEvaluate.count_nti_formats_from_vocabulary)
+            def nti_test(value):
+                return sum(1 for label in self.graph.objects(value, RDFS.label)
+                           if contains_vocabulary_word(vocabulary, label.strip().split('/')[-1]))
+            return 'dct:format', nti_test
+        if info['count_method'] == 'count_values_contained_in_vocabulary':
+            return property, lambda value: contains_vocabulary_word(vocabulary, value)
+        return property, lambda value: contains_word_vocabulary(vocabulary, value)
@@ -0,0 +1,112 @@
+# inbuilt libraries
+import logging
+from collections import defaultdict
+
+# third-party libraries
+from rdflib import RDF, RDFS, BNode, Literal, URIRef
+from rdflib.namespace import SH
+
+# custom functions
+from config.log import get_log_module
+from config.defaults import SHACL_INFERENCE
+
+log_module = get_log_module()
+
+# Classes and path predicates of each shapes graph, by id (the shapes graphs are shared, controller.shapes)
+_dependencies = {}
+
+
+def shapes_dependencies(shapes_graph):
+    '''
+    Returns (classes, predicates) the shapes depend on: the sh:targetClass and sh:class classes, and the predicates
+    of their sh:path (including the ones of sequence, alternative and inverse paths)
+    '''
+    key = id(shapes_graph)
+    if key not in _dependencies or _dependencies[key][0] is not shapes_graph:
+        classes = set(shapes_graph.objects(None, SH.targetClass)) | set(shapes_graph.objects(None, SH['class']))
+        # Node shapes that are also classes are implicit class targets
+        classes |= {shape for shape in shapes_graph.subjects(RDF.type, RDFS.Class) if (shape, RDF.type, SH.NodeShape) in shapes_graph}
+        predicates = set()
+        pending = list(shapes_graph.objects(None, SH.path))
+        while pending:
+            path = pending.pop()
+            if isinstance(path, URIRef):
+                predicates.add(path)
+            elif isinstance(path, BNode):
+                # rdf:List of a sequence path, or sh:alternativePath/sh:inversePath/sh:zeroOrMorePath/... nodes
+                pending.extend(o for p, o in shapes_graph.predicate_objects(path) if p != RDF.type)
+        predicates.discard(RDF.nil)
+        _dependencies[key] = (shapes_graph, frozenset(classes), frozenset(predicates))
+    return _dependencies[key][1:]
+
+def inference_closure(graph, classes, predicates):
+    '''
+    Returns the RDFS entailments of graph that SHACL validation with these classes and predicates depends on
+    (the triples not already in graph):
+    - (x rdf:type C) for C in classes, from rdf:type + rdfs:subClassOf, and from rdfs:domain/rdfs:range of the properties
+      of x (and their rdfs:subPropertyOf super properties).
+    - (x q y) for q in predicates, from (x p y) where p is a rdfs:subPropertyOf of q.
+
+    The schema triples (rdfs:subClassOf, rdfs:subPropertyOf, rdfs:domain, rdfs:range) are the ones of the data graph,
+    as in the rdfs inference of pyshacl without ont_graph.
+    '''
+    # {class: target classes it is a subclass of}
+    super_classes = defaultdict(set)
+    for target in classes:
+        for sub_class in graph.transitive_subjects(RDFS.subClassOf, target):
+            if sub_class != target:
+                super_classes[sub_class].add(target)
+
+    def entailed_classes(cls):
+        return ({cls} & classes) | super_classes.get(cls, set())
+
+    closure = set()
+    for sub_class, targets in super_classes.items():
+        for instance in graph.subjects(RDF.type, sub_class):
+            closure.update((instance, RDF.type, target) for target in targets)
+
+    schema_properties = set(graph.subjects(RDFS.subPropertyOf)) | set(graph.subjects(RDFS.domain)) | set(graph.subjects(RDFS.range))
+    for prop in schema_properties:
+        super_properties = set(graph.transitive_objects(prop, RDFS.subPropertyOf))
+        implied_predicates = (super_properties - {prop}) & predicates
+        domains = set().union(*(entailed_classes(d) for q in super_properties for d in graph.objects(q, RDFS.domain)))
+        ranges = set().union(*(entailed_classes(r) for q in super_properties for r in graph.objects(q, RDFS.range)))
+        if not (implied_predicates or domains or ranges):
+            continue
+        for s, o in graph.subject_objects(prop):
+            closure.update((s, q, o) for q in implied_predicates)
+            closure.update((s, RDF.type, cls) for cls in domains)
+            if not isinstance(o, Literal):
+                closure.update((o, RDF.type, cls) for cls in ranges)
+
+    return {triple for triple in closure if triple not in graph}
+
+def load_validator():
+    '''
+    pyshacl validate, imported on first use: pyshacl (and the rdflib SPARQL engine it loads) is the slowest import
+    of the evaluation, and runs without a SHACL validation (e.g. incremental runs without changes) never need it
+    '''
+    from pyshacl import validate
+    return validate
+
+def validate_graph(data_graph, shapes_graph, inference=SHACL_INFERENCE, abort_on_first=False, inplace=False):
+    '''
+    pyshacl validate with the inference mode of SHACL_INFERENCE:
+    - 'rdfs': full RDFS inference by pyshacl, on a copy of the data graph.
+    - 'targeted': only the inference_closure of the shapes dependencies is added to the data graph, validated in place
+      with pyshacl inference off, and removed afterwards.
+    - 'none': no inference.
+    inplace: the data graph can be modified (e.g. shards built for the validation), only used by 'rdfs'.
+    '''
+    validate = load_validator()
+    if inference != 'targeted':
+        return validate(data_graph, shacl_graph=shapes_graph, inference=inference, abort_on_first=abort_on_first, inplace=inplace)
+
+    closure = inference_closure(data_graph, *shapes_dependencies(shapes_graph))
+    logging.debug(f"{log_module}:Targeted inference: {len(closure)} triples added to {len(data_graph)}")
+    data_graph.addN((s, p, o, data_graph) for s, p, o in closure)
+    try:
+        return validate(data_graph, shacl_graph=shapes_graph, inference='none', abort_on_first=abort_on_first, inplace=True)
+    finally:
+        for triple in closure:
+            data_graph.remove(triple)
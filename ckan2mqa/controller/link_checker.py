@@ -0,0 +1,335 @@
+# inbuilt libraries
+import ssl
+import time
+import base64
+import asyncio
+import logging
+from collections import Counter, namedtuple
+from urllib.parse import urlsplit, urljoin, quote, unquote
+from urllib.request import getproxies, proxy_bypass_environment
+
+# custom functions
+from config.log import get_log_module
+from controller.url_cache import open_url_cache
+from config.defaults import (
+    TIMEOUT,
+    LINK_CHECK_CONCURRENCY,
+    LINK_CHECK_PER_HOST,
+    headers
+)
+
+log_module = get_log_module()
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10
+# Characters left unquoted in the request target (same set as requests.utils.requote_uri)
+SAFE_CHARS = "!#$%&'()*+,/:;=?@[]~"
+
+LinkResult = namedtuple('LinkResult', ['url', 'ok', 'status', 'error', 'etag', 'last_modified', 'cached', 'seconds'], defaults=(None, None, False, None))
+
+
+class LinkCheckError(Exception):
+    pass
+
+
+def is_success(status):
+    return status is not None and 200 <= status < 400
+
+
+class LinkChecker:
+    '''
+    asyncio link checker used by MqaEvaluate.count_urls_with_200_code.
+
+    - concurrency: maximum number of URLs checked at the same time.
+    - per_host: maximum number of open connections to the same scheme/host/port.
+    - Each URL is first requested with HEAD, and with GET if HEAD fails (servers that do not implement HEAD).
+    - Connections of HEAD responses are kept alive and reused for the next URL of the same host. GET
+      connections are closed after the status line and headers, so the body is never downloaded.
+    - Redirects are followed, a URL is reachable if the final status code is 2xx/3xx (as requests.get did).
+    - With a UrlHealthCache, fresh URLs are not requested and stale ones are revalidated with conditional requests.
+    - timeout applies to each request once it has a connection slot of its host, time queued behind the other
+      requests to the same host is not counted.
+    - Requests go through the proxies of the environment (HTTP_PROXY, HTTPS_PROXY, NO_PROXY) as requests did,
+      https URLs through a CONNECT tunnel.
+    '''
+
+    def __init__(self, concurrency=LINK_CHECK_CONCURRENCY, per_host=LINK_CHECK_PER_HOST, timeout=TIMEOUT, head_first=True, cache=None, proxies=None):
+        self.concurrency = concurrency
+        self.cache = cache
+        self.per_host = per_host
+        self.timeout = timeout
+        self.head_first = head_first
+        self.proxies = getproxies() if proxies is None else proxies
+        self.user_agent = headers['User-Agent']
+        self.stats = Counter()
+        self._pools = {}
+        self._host_limits = {}
+        self._ssl_context = None
+
+    async def check_all(self, urls, on_result=None):
+        '''
+        Checks every URL and returns {url: LinkResult}. on_result(result) is called as soon as each result is available
+        '''
+        results = {}
+        pending = iter(urls)
+
+        async def worker():
+            for url in pending:
+                result = await self.check(url)
+                results[url] = result
+                if on_result is not None:
+                    on_result(result)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, self.concurrency))))
+        finally:
+            self.close()
+        logging.debug(f"{log_module}:Checked {len(results)} URLs with {self.stats['requests']} requests, {self.stats['connections']} connections and {self.stats['reused']} reused connections")
+        return results
+
+    async def check(self, url):
+        url = str(url)
+        start = time.perf_counter()
+        entry = self.cache.get(url) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.hits += 1
+            return LinkResult(url, True, entry.status, None, entry.etag, entry.last_modified, True, time.perf_counter() - start)
+
+        conditional_headers = {}
+        if entry is not None:
+            self.cache.revalidated += 1
+            if entry.etag:
+                conditional_headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                conditional_headers['If-Modified-Since'] = entry.last_modified
+
+        result = None
+        if self.head_first:
+            status, response_headers, error = await self._fetch('HEAD', url, conditional_headers)
+            if is_success(status):
+                result = self._result(url, status, response_headers, None, entry)
+            else:
+                self.stats['get_fallbacks'] += 1
+        if result is None:
+            status, response_headers, error = await self._fetch('GET', url, conditional_headers)
+            if error is None and not is_success(status):
+                error = f"Status code {status}"
+            result = self._result(url, status, response_headers, error, entry)
+        result = result._replace(seconds=time.perf_counter() - start)
+
+        if self.cache is not None:
+            self.cache.put(result)
+        return result
+
+    def _result(self, url, status, response_headers, error, entry):
+        etag = response_headers.get('etag')
+        last_modified = response_headers.get('last-modified')
+        if status == 304 and entry is not None:
+            # Not modified since the previous check, keep its status and validators
+            self.stats['not_modified'] += 1
+            status = entry.status
+            etag = etag or entry.etag
+            last_modified = last_modified or entry.last_modified
+        return LinkResult(url, is_success(status), status, error, etag, last_modified)
+
+    def close(self):
+        for pool in self._pools.values():
+            for reader, writer in pool:
+                writer.close()
+        self._pools = {}
+
+    async def _fetch(self, method, url, extra_headers=None):
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                status, response_headers = await self._request(method, url, extra_headers)
+                if status in REDIRECT_CODES and response_headers.get('location'):
+                    url = urljoin(url, response_headers['location'])
+                    continue
+                return status, response_headers, None
+            return None, {}, "Exceeded maximum redirects"
+        except asyncio.TimeoutError:
+            return None, {}, f"Timeout after {self.timeout}s"
+        except Exception as e:
+            return None, {}, f"{type(e).__name__}: {e}"
+
+    async def _request(self, method, url, extra_headers=None):
+        parts = urlsplit(url.strip())
+        if parts.scheme not in ('http', 'https'):
+            raise LinkCheckError(f"Unsupported URL scheme '{parts.scheme}'")
+        if not parts.hostname:
+            raise LinkCheckError("No host in URL")
+        host = parts.hostname.encode('idna').decode('ascii')
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        host_header = f"[{host}]" if ':' in host else host
+        if parts.port:
+            host_header += f":{parts.port}"
+        target = quote(parts.path or '/', safe=SAFE_CHARS)
+        if parts.query:
+            target += '?' + quote(parts.query, safe=SAFE_CHARS)
+        proxy = self._proxy(parts.scheme, host)
+        proxy_headers = ''
+        if proxy is not None and parts.scheme == 'http':
+            # Plain HTTP through the proxy: absolute URL as request target
+            target = f"http://{host_header}{target}"
+            proxy_headers = self._proxy_authorization(proxy)
+        request = (
+            f"{method} {target} HTTP/1.1\r\n"
+            f"Host: {host_header}\r\n"
+            f"User-Agent: {self.user_agent}\r\n"
+            "Accept: */*\r\n"
+            "Accept-Encoding: identity\r\n"
+            + proxy_headers
+            + ''.join(f"{name}: {value}\r\n" for name, value in (extra_headers or {}).items())
+            + "Connection: keep-alive\r\n\r\n"
+        ).encode('latin-1')
+
+        key = (parts.scheme, host, port)
+        if key not in self._host_limits:
+            self._host_limits[key] = asyncio.Semaphore(self.per_host)
+        # The timeout starts once the host has a free slot (connect and request only)
+        async with self._host_limits[key]:
+            return await asyncio.wait_for(self._exchange(key, method, request), self.timeout)
+
+    async def _exchange(self, key, method, request):
+        '''
+        Sends request on a connection of key (reused or new) and returns the status and headers of the response
+        '''
+        while True:
+            reader, writer, reused = await self._acquire(key)
+            try:
+                self.stats['requests'] += 1
+                writer.write(request)
+                await writer.drain()
+                version, status, response_headers = await self._read_head(reader)
+            except (ConnectionError, LinkCheckError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    # The server closed the idle keep-alive connection, retry on a new one
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            keep_alive = method == 'HEAD' and version == 'HTTP/1.1' and response_headers.get('connection', '').lower() != 'close'
+            if keep_alive:
+                self._pools.setdefault(key, []).append((reader, writer))
+            else:
+                writer.close()
+            return status, response_headers
+
+    async def _acquire(self, key):
+        pool = self._pools.get(key, [])
+        while pool:
+            reader, writer = pool.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.stats['reused'] += 1
+                return reader, writer, True
+            writer.close()
+        reader, writer = await self._open_connection(*key)
+        self.stats['connections'] += 1
+        return reader, writer, False
+
+    async def _open_connection(self, scheme, host, port):
+        ssl_context = self._get_ssl_context() if scheme == 'https' else None
+        proxy = self._proxy(scheme, host)
+        if proxy is None:
+            return await asyncio.open_connection(host, port, ssl=ssl_context)
+        proxy_ssl = self._get_ssl_context() if proxy.scheme == 'https' else None
+        reader, writer = await asyncio.open_connection(proxy.hostname, proxy.port or (443 if proxy.scheme == 'https' else 80), ssl=proxy_ssl)
+        if scheme == 'https':
+            try:
+                authority = f"[{host}]:{port}" if ':' in host else f"{host}:{port}"
+                writer.write(f"CONNECT {authority} HTTP/1.1\r\nHost: {authority}\r\n{self._proxy_authorization(proxy)}\r\n".encode('latin-1'))
+                await writer.drain()
+                _, status, _ = await self._read_head(reader)
+                if status != 200:
+                    raise LinkCheckError(f"Proxy CONNECT status code {status}")
+                await writer.start_tls(ssl_context, server_hostname=host)
+            except BaseException:
+                writer.close()
+                raise
+        return reader, writer
+
+    def _proxy(self, scheme, host):
+        '''
+        Split URL of the proxy of scheme for host, None without proxy or if host is in no_proxy
+        '''
+        proxy = self.proxies.get(scheme)
+        if not proxy or proxy_bypass_environment(host, self.proxies):
+            return None
+        return urlsplit(proxy if '://' in proxy else f"http://{proxy}")
+
+    def _proxy_authorization(self, proxy):
+        if proxy.username is None:
+            return ''
+        credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}".encode('latin-1')
+        return f"Proxy-Authorization: Basic {base64.b64encode(credentials).decode('ascii')}\r\n"
+
+    def _get_ssl_context(self):
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    async def _read_head(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise LinkCheckError("Connection closed without response")
+            words = line.decode('latin-1').split(None, 2)
+            if len(words) < 2 or not words[0].startswith('HTTP/') or not words[1].isdigit():
+                raise LinkCheckError(f"Invalid status line {line[:80]!r}")
+            version, status = words[0], int(words[1])
+            response_headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                response_headers[name.strip().lower()] = value.strip()
+            # Skip interim responses (100 Continue, 103 Early Hints)
+            if status >= 200:
+                return version, status, response_headers
+
+
+def check_urls(urls, on_result=None, **kwargs):
+    '''
+    Synchronous entry point of LinkChecker.check_all
+    '''
+    return asyncio.run(LinkChecker(**kwargs).check_all(urls, on_result))
+
+
+class LinkResultRegistry:
+    '''
+    Run-scoped link check results by URL, shared by every URL indicator of an evaluation.
+
+    accessURL and downloadURL are often the same URL, so each unique URL is only checked once per run
+    and its result is reused by the other indicators. saved counts the checks avoided.
+    '''
+
+    def __init__(self, **checker_options):
+        self.checker_options = checker_options
+        self.results = {}
+        self.saved = 0
+
+    def check(self, urls, on_result=None):
+        '''
+        Returns {url: LinkResult} for urls, only checking the URLs not checked before in this run
+        '''
+        pending = []
+        for url in urls:
+            url = str(url)
+            if url in self.results:
+                self.saved += 1
+                if on_result is not None:
+                    on_result(self.results[url])
+            else:
+                pending.append(url)
+
+        if pending:
+            url_cache = open_url_cache()
+            try:
+                self.results.update(check_urls(pending, on_result=on_result, cache=url_cache, **self.checker_options))
+            finally:
+                if url_cache is not None:
+                    url_cache.close()
+        return {str(url): self.results[str(url)] for url in urls}
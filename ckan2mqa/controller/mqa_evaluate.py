@@ -1,13 +1,22 @@
 # inbuilt libraries
-import urllib.request
-from pyshacl import validate
-import rdflib
 import logging
-import concurrent.futures
-import requests
+from collections import Counter
+
+# third-party libraries
+from rdflib import RDFS
 
 # custom functions
 from config.log import get_log_module
+from controller.indicator_engine import IndicatorEngine, indicator_predicates
+from controller.link_checker import LinkResultRegistry
+from controller.vocabularies import load_vocabulary_matcher, VocabularyMatcher
+from controller.shapes import get_shapes_graph, shapes_version_files
+from controller.shards import DatasetShards, validate_shards, write_violations
+from controller.inference import validate_graph, shapes_dependencies
+from controller.graph_store import close_graph, filter_graph
+from controller.catalog_snapshot import load_catalog_graph
+from controller.profiling import RunProfile, link_timings
+from controller.results_writer import ResultsWriter, dcat_ap_version
 from config.defaults import (
     WEIGHT_TOTAL, 
     FINDABILITY,
@@ -19,30 +28,23 @@ from config.defaults import (
     DATASET,
     CODE_200,
     FROM_VOCABULARY,
-    TIMEOUT,
     CKAN_URIS,
     CKAN,
     EDP,
     NTI,
     MQA_RATING_THRESHOLDS,
     MQA_INDICATORS,
+    SHACL_MODE,
+    GRAPH_STORE,
+    LEAN_LOADING,
 )
 
 log_module = get_log_module()
 
 
-def load_vocabulary(vocabulary_file, field = 0, app_dir = '/app'):
-    vocabulary = []
-    vocabulary_file_path =  f"{app_dir}/ckan2mqa/assets/{vocabulary_file}"
-    with open(vocabulary_file_path) as fp:
-        for line in fp:
-            words = line.strip().split(',')
-            if len(words) > field:
-                if words[field] != '':
-                    vocabulary.append(words[field])
-    return vocabulary
-
 def contains_vocabulary_word(vocabulary, word):
+    if isinstance(vocabulary, VocabularyMatcher):
+        return vocabulary.contains_vocabulary_word(word)
     for value in vocabulary:
         if value.lower().find(word.lower()) >= 0:
             # print (value, word)
@@ -50,41 +52,67 @@ def contains_vocabulary_word(vocabulary, word):
     return False
 
 def contains_word_vocabulary(vocabulary, word):
+    if isinstance(vocabulary, VocabularyMatcher):
+        return vocabulary.contains_word_vocabulary(word)
     for value in vocabulary:
         if word.lower().find(value.lower()) >= 0:
             return True
     return False
 
-def make_request(url):
-    try:
-        response = requests.get(url, timeout=TIMEOUT)
-        if 200 <= response.status_code < 400:
-            return True
-        else:
-            print(f"URL {url} returned status code {response.status_code}")
-    except requests.RequestException as e:
-        print(f"RequestException for URL {url}: {e}")
-    except Exception as e:
-        print(f"Exception for URL {url}: {e}")
-    return False
-
 class MqaEvaluate:
 
-    def __init__(self, catalog_rdf_file, catalog_rdf_filename, catalog_file_folder, shapes_turtle_file, shapes_vocabulary, shapes_deprecateduris, app_dir = "/app", catalog_format = 'application/rdf+xml', catalog_type = CKAN):
+    def __init__(self, catalog_rdf_file, catalog_rdf_filename, catalog_file_folder, shapes_turtle_file, shapes_vocabulary, shapes_deprecateduris, app_dir = "/app", catalog_format = 'application/rdf+xml', catalog_type = CKAN, shacl_mode = SHACL_MODE, graph_store = GRAPH_STORE, profile = None, graph = None, lean = LEAN_LOADING):
         self.app_dir = app_dir
+        self.profile = profile if profile is not None else RunProfile()
         self.catalog = catalog_rdf_file
         self.catalog_filename = catalog_rdf_filename
         self.shapes = shapes_turtle_file
         self.shapes_vocabulary = shapes_vocabulary
         self.shapes_deprecateduris = shapes_deprecateduris
-        self.graph = rdflib.Graph()
-        self.graph.parse(source=self.catalog, format = catalog_format)
+        # graph: catalog graph already built (e.g. by the harvest), instead of parsing catalog_rdf_file again
+        # lean: only the triples of lean_predicates are loaded
+        with self.profile.phase('parse') as phase:
+            predicates = self.lean_predicates() if lean else None
+            if graph is not None:
+                self.graph, phase['origin'] = graph, 'graph'
+                if predicates is not None:
+                    phase['dropped'] = filter_graph(self.graph, predicates)
+            else:
+                self.graph, phase['origin'] = load_catalog_graph(self.catalog, catalog_format, graph_store, self.catalog_filename, predicates=predicates)
+            self.indicators = IndicatorEngine(self.graph)
+            phase['triples'] = len(self.graph)
+        self.link_results = LinkResultRegistry()
         self.datasetCount = self.count_entities(DATASET)
         self.distributionCount = self.count_entities(DISTRIBUTION)
         self.totalPoints = 0
+        self.dimensionPoints = Counter()
         self.catalog_type = catalog_type
+        self.shacl_mode = shacl_mode
         self.catalog_file_folder = catalog_file_folder
         self.results_file = open(f"{self.catalog_file_folder}/{self.catalog_filename}_results.txt", 'w')
+        self.results_writer = ResultsWriter(f"{self.catalog_file_folder}/{self.catalog_filename}", {
+            'catalog': self.catalog_filename,
+            'started': self.profile.started,
+            'catalog_file': str(self.catalog),
+            'catalog_type': self.catalog_type,
+            'dcat_ap_version': dcat_ap_version(self.shapes),
+            'shacl_mode': self.shacl_mode,
+            'datasets': self.datasetCount,
+            'distributions': self.distributionCount,
+        })
+
+    def close(self):
+        '''
+        Releases the graph store of the catalog (GRAPH_STORE) and the results files
+        '''
+        close_graph(self.graph)
+        self.results_writer.close()
+
+    def write_profile(self):
+        '''
+        Writes the run profile (controller.profiling) next to _results.txt
+        '''
+        self.profile.write(f"{self.catalog_file_folder}/{self.catalog_filename}")
 
     def shacl(self):
         '''
@@ -93,13 +121,11 @@ class MqaEvaluate:
         Shapes files retrieved from https://joinup.ec.europa.eu/collection/semantic-interoperability-community-semic/solution/dcat-application-profile-data-portals-europe/releases
         The shacl service of EDP (https://www.europeandataportal.eu/shacl/) also has a copy of these files at https://gitlab.com/european-data-portal/metrics/edp-metrics-validating-shacl/-/tree/master/src/main/resources/rdf/shapes
         '''
-        sg = rdflib.Graph()
-        sg.parse(source=self.shapes, format='turtle')
-        sg.parse(source=self.shapes_vocabulary, format='turtle')
-        sg.parse(source=self.shapes_deprecateduris, format='turtle')
+        sg = self.load_shapes_graph()
 
         try:
-            r = validate(self.graph, shacl_graph=sg, inference='rdfs', abort_on_first=True)
+            with self.profile.phase('shacl', triples=len(self.graph)):
+                r = validate_graph(self.graph, sg, abort_on_first=True)
             conforms, results_graph, results_text = r
             if not conforms:
                 error_file_name = f"{self.catalog_file_folder}/{self.catalog_filename}_errors_SHACL.txt"
@@ -110,58 +136,52 @@ class MqaEvaluate:
             logging.error(f"{log_module}:Exception occurred: {err}")
             return False
 
+    def shacl_datasets(self):
+        '''
+        SHACL validation by dataset shard (SHACL_MODE=datasets), in parallel processes. Returns the set of conforming datasets
+        '''
+        with self.profile.phase('shacl', triples=len(self.graph)):
+            shards = DatasetShards(self.graph)
+            conforms, violations = validate_shards(shards, shards.keys(), self.shapes_files())
+        if violations:
+            write_violations(f"{self.catalog_file_folder}/{self.catalog_filename}_errors_SHACL.txt", violations)
+        return {dataset for dataset in self.indicators.subjects[DATASET] if conforms.get(shards.owner.get(dataset))}
+
+    def lean_predicates(self):
+        '''
+        Predicates of the lean loading (LEAN_LOADING): the ones read by the MQA indicators and, with SHACL validation,
+        the sh:path predicates of the shapes and the RDFS schema predicates of the SHACL inference
+        '''
+        predicates = indicator_predicates()
+        if self.shapes is not None:
+            predicates |= shapes_dependencies(self.load_shapes_graph())[1]
+            predicates |= {RDFS.subClassOf, RDFS.subPropertyOf, RDFS.domain, RDFS.range}
+        return predicates
+
+    def shapes_files(self):
+        return shapes_version_files(self.shapes, self.shapes_vocabulary, self.shapes_deprecateduris)
+
+    def load_shapes_graph(self):
+        '''
+        Shapes graph of the DCAT-AP version, shared by the evaluations of this process and cached on disk (controller.shapes)
+        '''
+        return get_shapes_graph(self.shapes_files())
+
     def count_entities(self, entity):
-        qres = self.graph.query("""
-                   PREFIX dct:<http://purl.org/dc/terms/>
-                   PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-                   PREFIX dcat: <http://www.w3.org/ns/dcat#>
-                    PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-                    SELECT  (count(DISTINCT ?resource) as ?values)  WHERE {
-                        ?resource rdf:type """+ entity +""" .
-                    }
-                    """)
-        for row in qres:
-            count = int(row["values"])
-        return count
+        return self.indicators.count_entities(entity)
 
     def count_entity_property(self, entity, property):
-        qres = self.graph.query("""
-                   PREFIX dct:<http://purl.org/dc/terms/>
-                   PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-                   PREFIX dcat: <http://www.w3.org/ns/dcat#>
-                    PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-                    SELECT  (count(DISTINCT ?resource) as ?values)  WHERE {
-                        ?resource rdf:type """+ entity + """ .
-        	            ?resource """ + property +""" ?value .
-                    }
-                    """)
-        for row in qres:
-            count = int(row["values"])
-        return count
+        return self.indicators.count_entity_property(entity, property)
 
     def count_uris_formats_from_vocabulary(self, vocabulary, entity = DISTRIBUTION, property = 'dct:format'):
         '''
         The format returned by EDP or CKAN GeoDCAT-AP instance is a URL, the last token of the URL is the label of the format, e.g. http://publications.europa.eu/resource/authority/file-type/XML
         '''
-        qres = self.graph.query("""
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            PREFIX dct: <http://purl.org/dc/terms/>
-            PREFIX dcat: <http://www.w3.org/ns/dcat#>
-            SELECT ?value (COUNT(?value) as ?count)
-            WHERE {
-                ?resource a """ + entity + """ .
-                ?resource """ + property + """ ?value .
-            }
-            GROUP BY ?value
-            """)
         count = 0
-        for row in qres:
-            format = row["value"]
+        for format, partialCount in self.indicators.value_counts(entity, property).items():
             words = format.strip().split('/')
             if len(words) > 0:
                 format_label = words[len(words)-1]
-                partialCount = int(row["count"])
                 # print('Recognised format: ', format_label, partialCount)
                 if contains_vocabulary_word(vocabulary,format_label):
                     count += partialCount
@@ -171,108 +191,57 @@ class MqaEvaluate:
         '''
         The format returned by NTI models is a dct:IMT
         '''
-        qres = self.graph.query("""
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            PREFIX dct: <http://purl.org/dc/terms/>
-            PREFIX dcat: <http://www.w3.org/ns/dcat#>
-            SELECT ?value (COUNT(?value) as ?count)
-            WHERE {
-                ?resource a dcat:Distribution .
-                ?resource dct:format ?format .
-                ?format rdfs:label ?value .
-            }
-            GROUP BY ?value
-            """)
         count = 0
-        for row in qres:
-            format = row["value"]
+        for format, partialCount in self.indicators.label_counts(DISTRIBUTION, 'dct:format').items():
             words = format.strip().split('/')
             if len(words) > 0:
                 format_label = words[len(words)-1]
-                partialCount = int(row["count"])
                 # print('Recognised format: ', format_label, partialCount)
                 if contains_vocabulary_word(vocabulary,format_label):
                     count += partialCount
         return count
 
     def count_values_contained_in_vocabulary(self, entity, property, vocabulary):
-        qres = self.graph.query("""
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema>
-            PREFIX dct: <http://purl.org/dc/terms/>
-            PREFIX dcat: <http://www.w3.org/ns/dcat#>
-            SELECT ?value (COUNT(?value) as ?count)
-            WHERE {
-                ?resource a """ + entity + """ .
-                ?resource """ + property + """ ?value .
-            }
-            GROUP BY ?value
-            """)
         count = 0
-        for row in qres:
-            format = row["value"]
-            partialCount = int(row["count"])
+        for format, partialCount in self.indicators.value_counts(entity, property).items():
             #if contains_exact(vocabulary,format):
             if contains_vocabulary_word(vocabulary, format):
                     count += partialCount
         return count
 
     def count_values_containing_vocabulary(self, entity, property, vocabulary):
-        qres = self.graph.query("""
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema>
-            PREFIX dct: <http://purl.org/dc/terms/>
-            PREFIX dcat: <http://www.w3.org/ns/dcat#>
-            SELECT ?value (COUNT(?value) as ?count)
-            WHERE {
-                ?resource a """ + entity + """ .
-                ?resource """ + property + """ ?value .
-            }
-            GROUP BY ?value
-            """)
         count = 0
-        for row in qres:
-            value = row["value"]
-            partialCount = int(row["count"])
+        for value, partialCount in self.indicators.value_counts(entity, property).items():
             # print(value, partialCount)
             if contains_word_vocabulary(vocabulary, value):
                 count += partialCount
         return count
     
     def count_urls_with_200_code(self, property):
-        qres = self.graph.query("""
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema>
-            PREFIX dct: <http://purl.org/dc/terms/>
-            PREFIX dcat: <http://www.w3.org/ns/dcat#>
-            SELECT ?value (COUNT(?value) as ?count)
-            WHERE {
-                ?resource a dcat:Distribution .
-                ?resource """+ property+""" ?value
-            }
-            GROUP BY ?value
-            """)
-
+        # URIRef and Literal values with the same text are the same URL
+        rows = Counter()
+        for value, partialCount in self.indicators.value_counts(DISTRIBUTION, property).items():
+            rows[str(value)] += partialCount
         count = 0
         error_file_name = f"{self.catalog_file_folder}/{self.catalog_filename}_errors_{property.replace(':','_')}.txt"
 
         with open(error_file_name, "w", encoding="utf-8") as text_file:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-                future_to_url = {executor.submit(make_request, row["value"]): row for row in qres}
-                for future in concurrent.futures.as_completed(future_to_url):
-                    row = future_to_url[future]
-                    url = row["value"]
-                    partialCount = int(row["count"])
-                    try:
-                        if future.result():
-                            count += partialCount
-                        else:
-                            text_file.write(url + '\t' + str(partialCount) + '\n')
-                            print(url + " not reached")
-                    except Exception as exc:
-                        text_file.write(url + '\t' + str(partialCount) + '\n')
-                        print(url + " generated an exception: %s" % exc)
+            def write_result(result):
+                nonlocal count
+                partialCount = rows[result.url]
+                self.results_writer.link(property, result, partialCount)
+                if result.ok:
+                    count += partialCount
+                else:
+                    text_file.write(result.url + '\t' + str(partialCount) + '\n')
+                    print(f"{result.url} not reached: {result.error}")
+
+            with self.profile.phase(f"links:{property}", urls=len(rows)) as phase:
+                checked = set(self.link_results.results)
+                results = self.link_results.check(rows, on_result=write_result)
+                # Timings of the URLs checked by this phase, not the ones reused from a previous indicator
+                phase['reused_urls'] = len(checked.intersection(results))
+                phase.update(link_timings(result for url, result in results.items() if url not in checked))
         return count
 
     # MQA Reports
@@ -284,13 +253,17 @@ class MqaEvaluate:
         if count > 0:
             partialPoints = round(percentage * weight, 2)
             self.totalPoints += partialPoints
+            self.dimensionPoints[dimension] += partialPoints
         else:
             partialPoints = 0
         self.results_file.write(f"{dimension}\t{property}\t{count}\t{population}\t{round(percentage, 2)}\t{partialPoints}\t{weight}\n")
+        self.results_writer.indicator(dimension, property, count, population, round(percentage, 2), partialPoints, weight)
 
-    def get_rating(self):
+    def get_rating(self, points=None):
+        if points is None:
+            points = self.totalPoints
         for rating, threshold in MQA_RATING_THRESHOLDS.items():
-            if self.totalPoints >= threshold:
+            if points >= threshold:
                 return rating
         return "Bad"  # Fallback, though it should not be necessary
 
@@ -301,12 +274,12 @@ class MqaEvaluate:
         '''
         dimension, entity, property, population_attr, points, count_method = self.get_property_info('interoperability_format_from_vocabulary')
         
-        vocabulary = load_vocabulary('/vocabs/media-types.csv', 0, self.app_dir)
+        vocabulary = load_vocabulary_matcher('/vocabs/media-types.csv', 0, self.app_dir)
         
         if self.catalog_type == CKAN_URIS or self.catalog_type == EDP:
             count = getattr(self, count_method)(entity, property, vocabulary)
         elif self.catalog_type == CKAN:
-            vocabulary = load_vocabulary('/vocabs/media-types.csv', 1, self.app_dir)
+            vocabulary = load_vocabulary_matcher('/vocabs/media-types.csv', 1, self.app_dir)
             count = getattr(self, count_method)(entity, property, vocabulary)
         else:
             # NTI
@@ -327,11 +300,11 @@ class MqaEvaluate:
         }
         counts = []
         for prop in property:
-            vocabulary = load_vocabulary(vocabulary_files[prop], 0, self.app_dir)
+            vocabulary = load_vocabulary_matcher(vocabulary_files[prop], 0, self.app_dir)
             if self.catalog_type == CKAN_URIS or self.catalog_type == EDP:
                 count = getattr(self, count_method)(entity, prop, vocabulary)
             elif self.catalog_type == CKAN:
-                vocabulary = load_vocabulary(vocabulary_files[prop], 1, self.app_dir)
+                vocabulary = load_vocabulary_matcher(vocabulary_files[prop], 1, self.app_dir)
                 count = getattr(self, count_method)(entity, prop, vocabulary)
             else:
                 count = self.count_nti_formats_from_vocabulary(vocabulary)
@@ -347,12 +320,12 @@ class MqaEvaluate:
         '''
         dimension, entity, property, population_attr, points, count_method = self.get_property_info('interoperability_format_nonProprietary')
         
-        vocabulary = load_vocabulary('/vocabs/non-proprietary.csv', 0, self.app_dir)
+        vocabulary = load_vocabulary_matcher('/vocabs/non-proprietary.csv', 0, self.app_dir)
         if self.catalog_type == CKAN_URIS or self.catalog_type == EDP:
                 count = getattr(self, count_method)(entity, property, vocabulary)
         # Import vocabs label and count values
         elif self.catalog_type == CKAN:
-            vocabulary = load_vocabulary('/vocabs/non-proprietary.csv', 1, self.app_dir)
+            vocabulary = load_vocabulary_matcher('/vocabs/non-proprietary.csv', 1, self.app_dir)
             count = getattr(self, count_method)(entity, property, vocabulary)
         else:
             #NTI
@@ -367,12 +340,12 @@ class MqaEvaluate:
         '''
         dimension, entity, property, population_attr, points, count_method = self.get_property_info('interoperability_format_machineReadable')
 
-        vocabulary = load_vocabulary('/vocabs/machine-readable.csv', 0, self.app_dir)
+        vocabulary = load_vocabulary_matcher('/vocabs/machine-readable.csv', 0, self.app_dir)
         if self.catalog_type == CKAN_URIS or self.catalog_type == EDP:
                 count = getattr(self, count_method)(entity, property, vocabulary)
         # Import vocabs label and count values
         elif self.catalog_type == CKAN:
-            vocabulary = load_vocabulary('/vocabs/machine-readable.csv', 1, self.app_dir)
+            vocabulary = load_vocabulary_matcher('/vocabs/machine-readable.csv', 1, self.app_dir)
             count = getattr(self, count_method)(entity, property, vocabulary)
         else:
             #NTI
@@ -384,7 +357,9 @@ class MqaEvaluate:
     def interoperability_DCAT_AP_compliance(self):
         dimension, entity, property, population_attr, points, count_method = self.get_property_info('interoperability_DCAT_AP_compliance')
         
-        if self.catalog is not None and self.shapes is not None:
+        if self.catalog is not None and self.shapes is not None and self.shacl_mode == 'datasets':
+            count = len(self.shacl_datasets())
+        elif self.catalog is not None and self.shapes is not None:
             conforms = getattr(self, count_method)()
             if conforms:
                 count = getattr(self, population_attr)
@@ -402,7 +377,7 @@ class MqaEvaluate:
         '''
         dimension, entity, property, population_attr, points, count_method = self.get_property_info('reusability_license_from_vocabulary')
         
-        vocabulary = load_vocabulary('/vocabs/licenses.csv', 0, self.app_dir)
+        vocabulary = load_vocabulary_matcher('/vocabs/licenses.csv', 0, self.app_dir)
         count = getattr(self, count_method)(entity, property, vocabulary)
         
         population = getattr(self, population_attr)
@@ -414,7 +389,7 @@ class MqaEvaluate:
         '''
         dimension, entity, property, population_attr, points, count_method = self.get_property_info('reusability_accessRights_from_vocabulary')
         
-        vocabulary = load_vocabulary('/vocabs/access-right.csv', 0, self.app_dir)
+        vocabulary = load_vocabulary_matcher('/vocabs/access-right.csv', 0, self.app_dir)
         count = getattr(self, count_method)(entity, property, vocabulary)
         
         population = getattr(self, population_attr)
@@ -506,22 +481,41 @@ class MqaEvaluate:
         population = getattr(self, population_attr)
         self.print(dimension, property + property_suffix, count, population, points)   
      
+    def write_header(self):
+        self.results_file.write("Dimension\tIndicator/property\tCount\tPopulation\tPercentage\tPoints\tWeight\n")
+        logging.debug(f"{log_module}: Header written to results file.")
+
+    def write_total(self):
+        logging.debug(f"{log_module}: Writing total points and rating to results file.")
+        self.results_file.write(f"Total points\tRating: {self.get_rating()}\t\t\t{round(self.totalPoints/WEIGHT_TOTAL, 2)}\t{round(self.totalPoints, 2)}\t{WEIGHT_TOTAL}\n")
+        self.results_file.close()
+        summary = self.profile.summary()
+        self.results_writer.run(
+            points=round(self.totalPoints, 2),
+            percentage=round(self.totalPoints/WEIGHT_TOTAL, 2),
+            rating=self.get_rating(),
+            weight_total=WEIGHT_TOTAL,
+            dimensions={dimension: round(points, 2) for dimension, points in self.dimensionPoints.items()},
+            seconds=summary['seconds'],
+            phases={phase['phase']: phase['seconds'] for phase in summary['phases'] if phase['parent'] is None},
+        )
+
     def evaluate(self):
         logging.debug(f"{log_module}: Starting evaluation process.")
         
-        self.results_file.write("Dimension\tIndicator/property\tCount\tPopulation\tPercentage\tPoints\tWeight\n")
-        logging.debug(f"{log_module}: Header written to results file.")
+        self.write_header()
         
         for key, value in MQA_INDICATORS.items():
             log_message = value['log_message']
             function_name = value['function']
             
             logging.debug(f"{log_module}: {log_message}")
-            getattr(self, function_name)()
+            with self.profile.phase(function_name):
+                getattr(self, function_name)()
         
-        logging.debug(f"{log_module}: Writing total points and rating to results file.")
-        self.results_file.write(f"Total points\tRating: {self.get_rating()}\t\t\t{round(self.totalPoints/WEIGHT_TOTAL, 2)}\t{round(self.totalPoints, 2)}\t{WEIGHT_TOTAL}\n")
-        self.results_file.close()
+        self.write_total()
+        self.write_profile()
         
         logging.info(f"{log_module}:{self.catalog_filename} total points: {round(self.totalPoints, 2)}/{WEIGHT_TOTAL}")
+        logging.info(f"{log_module}:{self.catalog_filename} link checks: {len(self.link_results.results)} unique URLs checked, {self.link_results.saved} duplicate checks saved")
 
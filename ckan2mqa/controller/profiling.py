@@ -0,0 +1,124 @@
+# inbuilt libraries
+import json
+import time
+import pstats
+import cProfile
+import logging
+import resource
+from datetime import datetime
+from contextlib import contextmanager
+
+# custom functions
+from config.log import get_log_module
+from config.defaults import (
+    RUN_PROFILE,
+    RUN_PROFILE_CPROFILE
+)
+
+log_module = get_log_module()
+
+SLOWEST_URLS = 10
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def rate(count, seconds):
+    return round(count / seconds, 1) if count is not None and seconds > 0 else None
+
+def link_timings(results):
+    '''
+    Latency summary of link checks (LinkResult.seconds) and their slowest URLs
+    '''
+    timed = sorted((result for result in results if result.seconds is not None), key=lambda result: result.seconds)
+    if not timed:
+        return {}
+    seconds = [result.seconds for result in timed]
+    return {
+        'link_seconds': {
+            'p50': round(seconds[len(seconds) // 2], 3),
+            'p95': round(seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))], 3),
+            'max': round(seconds[-1], 3),
+        },
+        'cached_urls': sum(1 for result in timed if result.cached),
+        'slowest_urls': [[result.url, round(result.seconds, 3), result.status, result.error] for result in reversed(timed[-SLOWEST_URLS:])],
+    }
+
+
+class RunProfile:
+    '''
+    Wall time, CPU time, peak memory and throughput (triples/s, URLs/s) of the phases of a run: download, parse,
+    every MQA_INDICATORS function, SHACL and link checks. Phases can be nested (e.g. shacl inside
+    interoperability_DCAT_AP_compliance), each one records its parent.
+
+    peak_rss_mb is the peak RSS of the process at the end of the phase, and rss_growth_mb how much the phase raised it.
+
+    With cprofile=True (RUN_PROFILE_CPROFILE) the outermost phases also run under cProfile, and write() dumps one
+    pstats file per phase (nested phases are included in the dump of their outermost phase).
+    '''
+
+    def __init__(self, enabled=RUN_PROFILE, cprofile=RUN_PROFILE_CPROFILE):
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.phases = []
+        self.profilers = {}
+        self._stack = []
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextmanager
+    def phase(self, name, **counts):
+        '''
+        Measures the block as phase name. Yields the phase record, where the block can set its 'triples' or 'urls' count
+        '''
+        record = {'phase': name, 'parent': self._stack[-1]['phase'] if self._stack else None, **counts}
+        profiler = None
+        if self.cprofile and not self._stack:
+            profiler = cProfile.Profile()
+            self.profilers.setdefault(name, []).append(profiler)
+        self._stack.append(record)
+        rss_start = peak_rss_mb()
+        start, cpu_start = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            record.update({
+                'seconds': round(seconds, 3),
+                'cpu_seconds': round(time.process_time() - cpu_start, 3),
+                'peak_rss_mb': round(peak_rss_mb(), 1),
+                'rss_growth_mb': round(peak_rss_mb() - rss_start, 1),
+            })
+            if record.get('triples') is not None:
+                record['triples_per_second'] = rate(record['triples'], seconds)
+            if record.get('urls') is not None:
+                record['urls_per_second'] = rate(record['urls'], seconds)
+            self.phases.append(record)
+
+    def summary(self):
+        return {
+            'started': self.started,
+            'seconds': round(time.perf_counter() - self._start, 3),
+            'cpu_seconds': round(time.process_time() - self._cpu_start, 3),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'phases': self.phases,
+        }
+
+    def write(self, prefix):
+        '''
+        Writes <prefix>_profile.json and, with cprofile, <prefix>_profile_<phase>.prof (pstats, e.g. for snakeviz)
+        '''
+        if not self.enabled:
+            return
+        with open(f"{prefix}_profile.json", 'w', encoding='utf-8') as profile_file:
+            json.dump(self.summary(), profile_file, indent=2)
+        for name, profilers in self.profilers.items():
+            pstats.Stats(*profilers).dump_stats(f"{prefix}_profile_{name.replace(':', '_')}.prof")
+        logging.info(f"{log_module}:Run profile written to {prefix}_profile.json")
@@ -1,43 +1,137 @@
 # third-party libraries
 import rdflib
 import rdflib.collection
-import urllib.error
+from requests.exceptions import RequestException
 import logging
+import math
+import concurrent.futures
+from collections import deque
 
 # custom functions
 from config.log import get_log_module
+from controller.graph_store import new_graph, close_graph
+from controller import http_client
+from config.defaults import (
+    HARVEST_WORKERS,
+    HARVEST_RETRIES,
+    HARVEST_BACKOFF,
+    GRAPH_STORE
+)
 
 HYDRA = "http://www.w3.org/ns/hydra/core#"
 
 
 log_module = get_log_module()
 
-def download_rdf(url, filename):
+def download_rdf(url, filename, workers = HARVEST_WORKERS, retries = HARVEST_RETRIES, stream = False, store = GRAPH_STORE, keep_graph = False):
     """
     Downloads the file in url (intended to be the RDF end-point of a CKAN site) and stores it in filename
+
+    When the catalog is a Hydra PagedCollection, the remaining pages are fetched concurrently by a pool of
+    workers once totalItems and itemsPerPage are known from the first page. Each page is retried on
+    failure and merged in page order; a page that still fails is logged and skipped.
+
+    With stream=True each page is appended to filename as N-Triples as soon as it is merged, instead of
+    building the whole catalog graph in memory and serializing it as pretty-xml at the end. The file
+    can then be loaded with format='nt'.
+
+    Otherwise the pages are merged in a graph of the store backend (GRAPH_STORE), e.g. 'sqlite' to merge
+    them on disk.
+
+    Returns the number of harvested triples (None if the first page fails). With keep_graph=True (and not stream)
+    returns the harvested graph instead, so the evaluation does not parse filename again (MqaEvaluate graph); the
+    caller closes it (close_graph).
     """
-    graph = rdflib.Graph()
     try:
-        graph.parse(url, format="application/rdf+xml")
-    except urllib.error.HTTPError as e:
+        # Retried as the other pages (HARVEST_RETRIES, HARVEST_BACKOFF), the harvest stops if it still fails
+        first_page = fetch_page(url, retries)
+    except RequestException as e:
         logging.error(f"{log_module}:Failed to parse URL {url}: {e}")
         return
 
-    items_per_page = retrieve_hydra_value(graph, 'itemsPerPage')
-    total_items = retrieve_hydra_value(graph, 'totalItems')
-    if total_items > items_per_page:
-        i = 2
-        partial_count = items_per_page
-        while partial_count < total_items:
-            page_url = f"{url}?page={i}"
-            try:
-                graph.parse(page_url, format="application/rdf+xml")
-                partial_count += items_per_page
-                i += 1
-            except urllib.error.HTTPError as e:
-                logging.error(f"{log_module}:Failed to parse URL {page_url}: {e}")
+    if stream:
+        triples = 0
+        with open(filename, 'wb') as catalog_file:
+            def merge(page_graph):
+                nonlocal triples
+                triples += len(page_graph)
+                catalog_file.write(page_graph.serialize(format='nt', encoding='utf-8'))
+            merge(first_page)
+            harvest_catalog(first_page, url, merge, workers, retries)
+        return triples
+    else:
+        graph = first_page if store == 'memory' else new_graph(store, filename)
+        def merge(page_graph):
+            graph.addN((s, p, o, graph) for s, p, o in page_graph)
+        if graph is not first_page:
+            for prefix, namespace in first_page.namespaces():
+                graph.bind(prefix, namespace, override=True)
+            merge(first_page)
+        try:
+            harvest_catalog(first_page, url, merge, workers, retries)
+            graph.serialize(destination=filename,format='pretty-xml')
+        except BaseException:
+            close_graph(graph)
+            raise
+        if keep_graph:
+            return graph
+        triples = len(graph)
+        close_graph(graph)
+        return triples
+
+def harvest_catalog(first_page, url, merge, workers = HARVEST_WORKERS, retries = HARVEST_RETRIES):
+    """
+    Harvests the pages after first_page (if the catalog is paged) and passes each one to merge
+    """
+    items_per_page = retrieve_hydra_value(first_page, 'itemsPerPage')
+    total_items = retrieve_hydra_value(first_page, 'totalItems')
+    if items_per_page and total_items and total_items > items_per_page:
+        page_count = math.ceil(total_items / items_per_page)
+        failed_pages = harvest_pages(merge, url, range(2, page_count + 1), workers, retries)
+        logging.info(f"{log_module}:Harvested {page_count - len(failed_pages)}/{page_count} pages of {url}")
+        if failed_pages:
+            logging.error(f"{log_module}:Failed pages of {url}: {failed_pages}")
+
+def get_page_url(url, page):
+    separator = '&' if '?' in url else '?'
+    return f"{url}{separator}page={page}"
+
+def fetch_page(page_url, retries = HARVEST_RETRIES, backoff = HARVEST_BACKOFF):
+    """
+    Parses one catalog page in its own graph, downloaded with the shared HTTP session (controller.http_client:
+    compressed, kept-alive connections, retries with exponential backoff or the Retry-After of the server)
+    """
+    response = http_client.get(page_url, retries=retries, backoff=backoff, headers={'Accept': 'application/rdf+xml, */*;q=0.1'})
+    page_graph = rdflib.Graph()
+    page_graph.parse(data=response.content, format="application/rdf+xml", publicID=page_url)
+    return page_graph
+
+def harvest_pages(merge, url, pages, workers = HARVEST_WORKERS, retries = HARVEST_RETRIES):
+    """
+    Fetches the pages concurrently and passes them to merge in page order.
+    At most 2 * workers pages are in flight or waiting to be merged. Returns the pages that failed.
+    """
+    failed_pages = []
+    pages = iter(pages)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for page in pages:
+            pending.append((page, executor.submit(fetch_page, get_page_url(url, page), retries)))
+            if len(pending) >= 2 * workers:
                 break
-    graph.serialize(destination=filename,format='pretty-xml')
+        while pending:
+            page, future = pending.popleft()
+            try:
+                page_graph = future.result()
+            except Exception as e:
+                logging.error(f"{log_module}:Failed to parse URL {get_page_url(url, page)}: {e}")
+                failed_pages.append(page)
+            else:
+                merge(page_graph)
+            next_page = next(pages, None)
+            if next_page is not None:
+                pending.append((next_page, executor.submit(fetch_page, get_page_url(url, next_page), retries)))
+    return failed_pages
 
 def retrieve_hydra_value(graph, property):
     result = None
@@ -0,0 +1,92 @@
+# inbuilt libraries
+import re
+import csv
+import json
+
+# custom functions
+from config.defaults import RESULTS_FORMATS
+
+RESULTS_FORMAT_NAMES = ('jsonl', 'tsv')
+# Columns of the tsv tables, every table starts with the catalog and the start of the run
+RUN_COLUMNS = ['catalog', 'started', 'catalog_file', 'catalog_type', 'dcat_ap_version', 'shacl_mode', 'datasets', 'distributions',
+               'points', 'percentage', 'rating', 'weight_total', 'seconds']
+INDICATOR_COLUMNS = ['catalog', 'started', 'dimension', 'property', 'count', 'population', 'percentage', 'points', 'weight']
+LINK_COLUMNS = ['catalog', 'started', 'property', 'url', 'ok', 'status', 'error', 'count', 'cached', 'seconds']
+
+
+def dcat_ap_version(shapes_file):
+    '''
+    DCAT-AP version of a shapes file name, e.g. '2.1.1' of dcat-ap_2.1.1_shacl_shapes.ttl
+    '''
+    match = re.search(r'dcat-ap_([0-9.]+)_shacl', str(shapes_file or ''))
+    return match.group(1) if match else None
+
+
+class ResultsWriter:
+    '''
+    Machine-readable results of an evaluation (JSONL and TSV, both row-oriented text), written as they are produced
+    (nothing is kept in memory but the run metadata), next to _results.txt:
+    - jsonl: <prefix>_results.jsonl, one JSON record per line: 'indicator' rows, 'link' check outcomes (every URL of
+      the code=200 indicators) and a last 'run' record with the metadata, totals, rating and durations.
+    - tsv: one row per record and a fixed column per field, <prefix>_results_indicators.tsv,
+      <prefix>_results_links.tsv and <prefix>_results_run.tsv. Tables of many runs can be concatenated (catalog and
+      started columns).
+    A columnar format (Parquet) is not written, pyarrow is not a dependency.
+    '''
+
+    def __init__(self, prefix, metadata, formats=RESULTS_FORMATS):
+        unknown = set(formats) - set(RESULTS_FORMAT_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown results formats {sorted(unknown)}, use {', '.join(RESULTS_FORMAT_NAMES)}")
+        self.metadata = dict(metadata)
+        self.key = {'catalog': self.metadata.get('catalog'), 'started': self.metadata.get('started')}
+        self.files = []
+        self.jsonl = None
+        self.tables = {}
+        if 'jsonl' in formats:
+            self.jsonl = self._open(f"{prefix}_results.jsonl")
+        if 'tsv' in formats:
+            for table, columns in (('indicators', INDICATOR_COLUMNS), ('links', LINK_COLUMNS), ('run', RUN_COLUMNS)):
+                writer = csv.DictWriter(self._open(f"{prefix}_results_{table}.tsv", newline=''), columns, delimiter='\t', extrasaction='ignore')
+                writer.writeheader()
+                self.tables[table] = writer
+
+    def _open(self, filename, newline=None):
+        results_file = open(filename, 'w', encoding='utf-8', newline=newline)
+        self.files.append(results_file)
+        return results_file
+
+    def write(self, record_type, table, record):
+        if self.jsonl is not None:
+            self.jsonl.write(json.dumps({'type': record_type, **record}, ensure_ascii=False) + '\n')
+        if table in self.tables:
+            self.tables[table].writerow({**self.key, **record})
+
+    def indicator(self, dimension, property, count, population, percentage, points, weight):
+        self.write('indicator', 'indicators', {
+            'dimension': dimension, 'property': property, 'count': count, 'population': population,
+            'percentage': percentage, 'points': points, 'weight': weight,
+        })
+
+    def link(self, property, result, count):
+        '''
+        Outcome of the link check of a URL (LinkResult) of property, found count times in the catalog
+        '''
+        self.write('link', 'links', {
+            'property': property, 'url': result.url, 'ok': result.ok, 'status': result.status, 'error': result.error,
+            'count': count, 'cached': result.cached, 'seconds': round(result.seconds, 3) if result.seconds is not None else None,
+        })
+
+    def run(self, **totals):
+        '''
+        Last record: run metadata, totals, rating and durations
+        '''
+        self.write('run', 'run', {**self.metadata, **totals})
+        self.close()
+
+    def close(self):
+        for results_file in self.files:
+            results_file.close()
+        self.files = []
+        self.jsonl = None
+        self.tables = {}
@@ -0,0 +1,299 @@
+# inbuilt libraries
+import os
+import json
+import uuid
+import queue
+import logging
+import threading
+import multiprocessing
+from datetime import datetime
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# custom functions
+from config.log import get_log_module
+from controller.batch import Catalog, catalog_name, evaluation_options, evaluate_catalog, warm_resources
+from config.defaults import (
+    CKAN_URIS,
+    CKAN,
+    EDP,
+    NTI,
+    SERVICE_HOST,
+    SERVICE_PORT,
+    SERVICE_WORKERS,
+    SERVICE_QUEUE_SIZE,
+    SERVICE_MAX_UPLOAD
+)
+
+log_module = get_log_module()
+
+# Content types of the uploaded catalogs and their file extension (evaluate_catalog guesses the format from it)
+UPLOAD_EXTENSIONS = {
+    'application/rdf+xml': 'rdf',
+    'text/turtle': 'ttl',
+    'application/n-triples': 'nt',
+    'application/ld+json': 'jsonld',
+    'text/n3': 'n3',
+}
+CATALOG_TYPES = (CKAN_URIS, CKAN, EDP, NTI)
+# Finished jobs kept in memory, the files of older jobs stay in the output folder
+FINISHED_JOBS = 1000
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class EvaluationService:
+    '''
+    Evaluation jobs of catalogs (URL or uploaded file) run by a pool of worker processes that stay alive between jobs.
+    The shapes graph and the vocabulary matchers are loaded before the pool starts (warm_resources), so the workers
+    share them from the fork and every job only pays for its own harvest, parse, SHACL validation and link checks.
+
+    Jobs wait in a bounded queue (queue_size) and one dispatcher thread by worker hands them to the pool, so a job
+    is 'running' only while a worker evaluates it: queued -> running -> done / failed. The results are written by
+    evaluate_catalog in <output_dir>/<name>_<job id>_<date>/, as a single evaluation.
+    '''
+
+    def __init__(self, output_dir, shapes, app_dir='/app', workers=SERVICE_WORKERS, queue_size=SERVICE_QUEUE_SIZE,
+                 catalog_type=CKAN_URIS, stream=False, incremental=False, dataset_scores=False):
+        self.output_dir = output_dir
+        self.upload_dir = os.path.join(output_dir, 'uploads')
+        self.catalog_type = catalog_type
+        self.options = evaluation_options(output_dir, shapes, app_dir, stream, incremental, dataset_scores)
+        self.workers = max(1, workers)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(queue_size)
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+        warm_resources(self.options['shapes'], app_dir)
+        self.pool = multiprocessing.Pool(self.workers, initializer=warm_resources, initargs=(self.options['shapes'], app_dir))
+        self.dispatchers = [threading.Thread(target=self._dispatch, name=f"dispatcher-{number}", daemon=True) for number in range(self.workers)]
+        for dispatcher in self.dispatchers:
+            dispatcher.start()
+        logging.info(f"{log_module}:Evaluation service with {self.workers} workers and {queue_size} queued jobs")
+
+    def submit(self, source=None, content=None, content_type=None, name=None, catalog_type=None):
+        '''
+        Queues the evaluation of a catalog URL (source) or of an uploaded catalog (content, content_type). Returns the job
+        '''
+        catalog_type = catalog_type or self.catalog_type
+        if catalog_type not in CATALOG_TYPES:
+            raise ServiceError(400, f"Unknown catalog_type '{catalog_type}', use {', '.join(CATALOG_TYPES)}")
+        job_id = uuid.uuid4().hex[:12]
+        if content is not None:
+            if content_type not in UPLOAD_EXTENSIONS:
+                raise ServiceError(415, f"Unsupported content type '{content_type}', use {', '.join(UPLOAD_EXTENSIONS)}")
+            source = os.path.join(self.upload_dir, f"{job_id}.{UPLOAD_EXTENSIONS[content_type]}")
+            with open(source, 'wb') as upload_file:
+                upload_file.write(content)
+        elif not source or urlsplit(source).scheme not in ('http', 'https'):
+            raise ServiceError(400, "A catalog 'url' (http or https) or an uploaded catalog is required")
+
+        name = catalog_name(name or ('upload' if content is not None else source))
+        job = {
+            'id': job_id,
+            'name': name,
+            'source': source if content is None else 'upload',
+            'catalog_type': catalog_type,
+            'status': 'queued',
+            'submitted': datetime.now().isoformat(timespec='seconds'),
+            'catalog': Catalog(f"{name}_{job_id}", source, catalog_type),
+        }
+        with self.lock:
+            try:
+                self.queue.put_nowait(job_id)
+            except queue.Full:
+                self._remove_upload(job)
+                raise ServiceError(503, f"Job queue full ({self.queue.maxsize} jobs), try again later")
+            self.jobs[job_id] = job
+        logging.info(f"{log_module}:Job {job_id} queued: {job['source']}")
+        return self.public(job)
+
+    def _dispatch(self):
+        while True:
+            job_id = self.queue.get()
+            if job_id is None:
+                return
+            job = self.jobs[job_id]
+            job.update({'status': 'running', 'started': datetime.now().isoformat(timespec='seconds')})
+            options = dict(self.options, date=datetime.today().strftime('%Y-%m-%d'))
+            try:
+                summary = self.pool.apply(evaluate_catalog, (job['catalog'], options))
+            except Exception as e:
+                summary = {'status': f"error: {e}"}
+            finally:
+                self._remove_upload(job)
+            with self.lock:
+                job.update({
+                    'status': 'done' if summary['status'] == 'ok' else 'failed',
+                    'finished': datetime.now().isoformat(timespec='seconds'),
+                    'summary': {key: value for key, value in summary.items() if key not in ('catalog', 'source', 'folder')},
+                    'folder': summary.get('folder'),
+                })
+                self._forget_finished()
+            logging.info(f"{log_module}:Job {job_id} {job['status']} in {summary.get('seconds', '-')}s")
+
+    def _remove_upload(self, job):
+        if job['source'] == 'upload' and os.path.exists(job['catalog'].source):
+            os.remove(job['catalog'].source)
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ServiceError(404, f"Job {job_id} not found")
+        return job
+
+    def public(self, job):
+        '''
+        Job as returned by the API, with its results files once it is done
+        '''
+        public = {key: value for key, value in job.items() if key not in ('catalog', 'folder')}
+        if job.get('folder') and os.path.isdir(job['folder']):
+            public['files'] = sorted(os.listdir(job['folder']))
+        return public
+
+    def job_file(self, job_id, filename):
+        '''
+        Path of a results file of a finished job
+        '''
+        job = self.job(job_id)
+        if job['status'] not in ('done', 'failed'):
+            raise ServiceError(409, f"Job {job_id} is {job['status']}")
+        path = os.path.join(job.get('folder') or '', os.path.basename(filename))
+        if not job.get('folder') or not os.path.isfile(path):
+            raise ServiceError(404, f"File {filename} not found in job {job_id}")
+        return path
+
+    def status(self):
+        with self.lock:
+            statuses = [job['status'] for job in self.jobs.values()]
+        return {
+            'workers': self.workers,
+            **{status: statuses.count(status) for status in ('queued', 'running', 'done', 'failed')},
+        }
+
+    def close(self):
+        for _ in self.dispatchers:
+            self.queue.put(None)
+        self.pool.terminate()
+        self.pool.join()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    '''
+    HTTP API of the EvaluationService (self.server.service):
+    - POST /jobs: JSON body {"url": ..., "name": ..., "catalog_type": ...}, or the catalog file itself with its
+      Content-Type (e.g. text/turtle) and optional ?name=&catalog_type= query parameters. 202 with the job.
+    - GET /jobs, GET /jobs/<id>: jobs and their status (queued, running, done, failed) and summary.
+    - GET /jobs/<id>/results: structured results (_results.jsonl) of a finished job.
+    - GET /jobs/<id>/files/<file>: any results file of a finished job (e.g. <name>_results.txt).
+    - GET /health: workers and jobs by status.
+    '''
+
+    server_version = 'ckan2mqa'
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def _handle(self, method):
+        try:
+            method(urlsplit(self.path))
+        except ServiceError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except Exception as e:
+            logging.error(f"{log_module}:{self.command} {self.path} failed: {e}")
+            self._send_json(500, {'error': str(e)})
+
+    def _get(self, url):
+        service = self.server.service
+        parts = [part for part in url.path.split('/') if part]
+        if parts == ['health']:
+            self._send_json(200, service.status())
+        elif parts == ['jobs']:
+            with service.lock:
+                jobs = [service.public(job) for job in service.jobs.values()]
+            self._send_json(200, jobs)
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            self._send_json(200, service.public(service.job(parts[1])))
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'results':
+            # The results files are named as the job folder (<name>_<job id>_<date>)
+            folder = service.job(parts[1]).get('folder') or ''
+            self._send_file(service.job_file(parts[1], f"{os.path.basename(folder)}_results.jsonl"), 'application/x-ndjson')
+        elif len(parts) == 4 and parts[0] == 'jobs' and parts[2] == 'files':
+            self._send_file(service.job_file(parts[1], parts[3]))
+        else:
+            raise ServiceError(404, f"Not found: {url.path}")
+
+    def _post(self, url):
+        if url.path.rstrip('/') != '/jobs':
+            raise ServiceError(404, f"Not found: {url.path}")
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > SERVICE_MAX_UPLOAD * 1024 * 1024:
+            raise ServiceError(413, f"Catalog larger than {SERVICE_MAX_UPLOAD} MB")
+        content = self.rfile.read(length)
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if content_type == 'application/json':
+            try:
+                request = json.loads(content or b'{}')
+            except ValueError as e:
+                raise ServiceError(400, f"Invalid JSON: {e}")
+            job = self.server.service.submit(source=request.get('url'), name=request.get('name'), catalog_type=request.get('catalog_type'))
+        else:
+            job = self.server.service.submit(content=content, content_type=content_type, name=query.get('name'), catalog_type=query.get('catalog_type'))
+        self._send_json(202, job, {'Location': f"/jobs/{job['id']}"})
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False, indent=2).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_file(self, path, content_type='text/plain; charset=utf-8'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, 'rb') as results_file:
+            while True:
+                chunk = results_file.read(64 * 1024)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{log_module}:{self.address_string()} {format % args}")
+
+
+def serve(service, host=SERVICE_HOST, port=SERVICE_PORT):
+    '''
+    Runs the HTTP API of service until interrupted
+    '''
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    logging.info(f"{log_module}:Evaluation service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,87 @@
+# inbuilt libraries
+import os
+import pickle
+import hashlib
+import logging
+
+# third-party libraries
+import rdflib
+
+# custom functions
+from config.log import get_log_module
+from config.defaults import (
+    SHAPES_CACHE_DIR,
+    SHACL_EXTRA_FILES
+)
+
+log_module = get_log_module()
+
+# Combined shapes graphs of this process by hash of their files
+_shapes_graphs = {}
+
+
+def shapes_version_files(shapes, shapes_vocabulary, shapes_deprecateduris, extra=SHACL_EXTRA_FILES):
+    '''
+    Returns the shapes files of a DCAT-AP version: shapes, vocabularies and deprecated URIs, plus the extra files
+    of the same folder, e.g. extra=['range', 'shapes_recommended'] for dcat-ap_<version>_shacl_range.ttl and
+    dcat-ap_<version>_shacl_shapes_recommended.ttl (2.1.1 and 3.0.0)
+    '''
+    files = [shapes, shapes_vocabulary, shapes_deprecateduris]
+    prefix = shapes[:-len('shapes.ttl')] if shapes.endswith('shapes.ttl') else None
+    for name in extra:
+        extra_file = f"{prefix}{name}.ttl"
+        if prefix is not None and os.path.exists(extra_file):
+            files.append(extra_file)
+        else:
+            logging.warning(f"{log_module}:SHACL file '{name}' not available for {shapes}")
+    return files
+
+def hash_files(files):
+    '''
+    sha1 of the files names and contents (and the rdflib version, the cached graphs are rdflib pickles)
+    '''
+    digest = hashlib.sha1(rdflib.__version__.encode('utf-8'))
+    for file in files:
+        digest.update(os.path.basename(file).encode('utf-8'))
+        with open(file, 'rb') as shapes_file:
+            digest.update(shapes_file.read())
+    return digest.hexdigest()
+
+def get_shapes_graph(files, cache_dir=SHAPES_CACHE_DIR):
+    '''
+    Returns the union graph of the Turtle shapes files.
+
+    The graph is built once per process, and stored in cache_dir (pickle) by hash of the files, so it is only
+    parsed again when any of the files changes. Empty cache_dir disables the disk cache.
+    '''
+    digest = hash_files(files)
+    if digest in _shapes_graphs:
+        return _shapes_graphs[digest]
+
+    cache_file = os.path.join(cache_dir, f"shapes_{digest}.pickle") if cache_dir else None
+    graph = None
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as graph_file:
+                graph = pickle.load(graph_file)
+            logging.debug(f"{log_module}:Shapes graph loaded from {cache_file}")
+        except Exception as e:
+            logging.warning(f"{log_module}:Shapes cache {cache_file} not loaded: {e}")
+
+    if graph is None:
+        graph = rdflib.Graph()
+        for file in files:
+            graph.parse(source=file, format='turtle')
+        if cache_file:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                # Write and rename, so another process never reads a partial file
+                temp_file = f"{cache_file}.{os.getpid()}.tmp"
+                with open(temp_file, 'wb') as graph_file:
+                    pickle.dump(graph, graph_file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_file, cache_file)
+            except OSError as e:
+                logging.warning(f"{log_module}:Shapes cache {cache_file} not written: {e}")
+
+    _shapes_graphs[digest] = graph
+    return graph
@@ -0,0 +1,209 @@
+# inbuilt libraries
+import hashlib
+import logging
+import multiprocessing
+from collections import defaultdict, deque
+
+# third-party libraries
+import rdflib
+from rdflib import RDF, BNode, Literal, URIRef
+from rdflib.namespace import DCAT, SH
+
+# custom functions
+from config.log import get_log_module
+from controller.shapes import get_shapes_graph
+from controller.inference import validate_graph
+from config.defaults import (
+    SHACL_WORKERS,
+    SHACL_BATCH_SIZE
+)
+
+log_module = get_log_module()
+
+# Key of the catalog remainder: the catalog record and every node not owned by a dataset (orphan distributions, agents, ...)
+CATALOG_KEY = ''
+
+
+class DatasetShards:
+    '''
+    Splits a catalog graph into one description (shard) per dcat:Dataset.
+
+    Every subject of the graph is owned by exactly one key:
+    - a dataset owns itself, its dcat:distribution nodes and every blank node reachable from them.
+    - CATALOG_KEY owns the rest (catalog record, agents, orphan distributions, ...).
+
+    The shard of a key has the triples of its owned subjects plus, for the nodes it references:
+    all their triples if they are owned by CATALOG_KEY (publishers, licenses, ...), and only their
+    rdf:type if they are owned by another dataset. The fingerprint of a key is a hash of its shard
+    where blank nodes are identified by their content, so it is stable across parses.
+    '''
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.owner = {}
+        self.owned = defaultdict(list)
+        self._bnode_hashes = {}
+        self._references = None
+
+        for dataset in sorted(graph.subjects(RDF.type, DCAT.Dataset, unique=True)):
+            if dataset in self.owner:
+                continue
+            key = str(dataset) if isinstance(dataset, URIRef) else self._term_key(dataset)
+            self._claim(dataset, key)
+            for distribution in graph.objects(dataset, DCAT.distribution):
+                self._claim(distribution, key)
+        for subject in graph.subjects(unique=True):
+            self._claim(subject, CATALOG_KEY)
+
+    def _claim(self, subject, key):
+        stack = [subject]
+        while stack:
+            node = stack.pop()
+            if node in self.owner or isinstance(node, Literal):
+                continue
+            self.owner[node] = key
+            self.owned[key].append(node)
+            for o in self.graph.objects(node):
+                if isinstance(o, BNode) and o not in self.owner:
+                    stack.append(o)
+
+    def keys(self):
+        return list(self.owned)
+
+    def subjects(self, key):
+        return set(self.owned[key])
+
+    def triples(self, key):
+        referenced = set()
+        for subject in self.owned[key]:
+            for triple in self.graph.triples((subject, None, None)):
+                yield triple
+                o = triple[2]
+                if not isinstance(o, Literal) and self.owner.get(o, key) != key:
+                    referenced.add(o)
+        for node in referenced:
+            if self.owner[node] == CATALOG_KEY:
+                yield from self.graph.triples((node, None, None))
+            else:
+                yield from self.graph.triples((node, RDF.type, None))
+
+    def referencing_keys(self, node):
+        '''
+        Returns the dataset keys whose shard references node (a node owned by CATALOG_KEY, e.g. a publisher)
+        '''
+        if self._references is None:
+            self._references = defaultdict(set)
+            for key, subjects in self.owned.items():
+                if key == CATALOG_KEY:
+                    continue
+                for subject in subjects:
+                    for o in self.graph.objects(subject):
+                        if self.owner.get(o) == CATALOG_KEY:
+                            self._references[o].add(key)
+        return self._references.get(node, set())
+
+    def fingerprint(self, key):
+        lines = sorted(f"{self._term_key(s)} {p.n3()} {self._term_key(o)}" for s, p, o in self.triples(key))
+        return hashlib.sha1('\n'.join(lines).encode('utf-8')).hexdigest()
+
+    def _term_key(self, term, path=()):
+        if not isinstance(term, BNode):
+            return term.n3()
+        if term in self._bnode_hashes:
+            return self._bnode_hashes[term]
+        if term in path:
+            return '_:cycle'
+        lines = sorted(f"{p.n3()} {self._term_key(o, path + (term,))}" for p, o in self.graph.predicate_objects(term))
+        key = '_:' + hashlib.sha1('\n'.join(lines).encode('utf-8')).hexdigest()
+        self._bnode_hashes[term] = key
+        return key
+
+
+# Shapes graph of each validation worker process
+_worker_shapes = None
+
+
+def _init_worker(shapes_files):
+    global _worker_shapes
+    _worker_shapes = get_shapes_graph(shapes_files)
+
+def _validate_batch(triples):
+    '''
+    Validates the union of some shards, returns ([(focus node, path, message), ...], error)
+    '''
+    data_graph = rdflib.Graph()
+    data_graph.addN((s, p, o, data_graph) for s, p, o in triples)
+    try:
+        conforms, results_graph, results_text = validate_graph(data_graph, _worker_shapes, abort_on_first=False, inplace=True)
+    except Exception as err:
+        return None, str(err)
+    if conforms:
+        return [], None
+    return [(results_graph.value(result, SH.focusNode), results_graph.value(result, SH.resultPath), results_graph.value(result, SH.resultMessage))
+            for result in results_graph.subjects(RDF.type, SH.ValidationResult)], None
+
+def validate_shards(shards, keys, shapes_files, workers=SHACL_WORKERS, batch_size=SHACL_BATCH_SIZE):
+    '''
+    SHACL validation of the shards of keys (a DatasetShards), in batches of batch_size shards validated by a pool of
+    workers processes, each one with its own copy of the shapes graph.
+
+    A violation is attributed to the key of the batch that owns its focus node, and to the keys of the batch that
+    reference it when the node is owned by CATALOG_KEY (publishers, contact points, ...). Focus nodes owned by keys
+    of other batches are only in the batch with their rdf:type, so their results are ignored.
+
+    Returns ({key: conforms}, [(key, focus node, path, message), ...])
+    '''
+    keys = list(keys)
+    conforms = {key: True for key in keys}
+    violations = []
+    batches = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+    payloads = (list({triple for key in batch for triple in shards.triples(key)}) for batch in batches)
+
+    for batch, (batch_violations, error) in _validate_batches(batches, payloads, shapes_files, workers):
+        if error is not None:
+            logging.error(f"{log_module}:Exception occurred: {error}")
+            for key in batch:
+                conforms[key] = False
+            continue
+        batch_keys = set(batch)
+        for focus_node, path, message in batch_violations:
+            owner = shards.owner.get(focus_node)
+            failing = {owner} & batch_keys
+            if owner == CATALOG_KEY:
+                failing |= shards.referencing_keys(focus_node) & batch_keys
+            for key in failing:
+                conforms[key] = False
+                violations.append((key, focus_node, path, message))
+    logging.debug(f"{log_module}:Validated {len(keys)} shards in {len(batches)} batches, {sum(conforms.values())} conform")
+    return conforms, violations
+
+def _validate_batches(batches, payloads, shapes_files, workers):
+    '''
+    Yields (batch, result) in order. At most 2 * workers batches are queued, so only their triples are copied at a time.
+    A daemon process (e.g. a batch evaluation worker, controller.batch) cannot start a pool, it validates the batches itself.
+    '''
+    if workers <= 1 or len(batches) <= 1 or multiprocessing.current_process().daemon:
+        _init_worker(shapes_files)
+        for batch, payload in zip(batches, payloads):
+            yield batch, _validate_batch(payload)
+        return
+
+    pool = multiprocessing.Pool(min(workers, len(batches)), initializer=_init_worker, initargs=(shapes_files,))
+    try:
+        pending = deque()
+        for batch, payload in zip(batches, payloads):
+            pending.append((batch, pool.apply_async(_validate_batch, (payload,))))
+            if len(pending) >= 2 * workers:
+                done_batch, result = pending.popleft()
+                yield done_batch, result.get()
+        while pending:
+            done_batch, result = pending.popleft()
+            yield done_batch, result.get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+def write_violations(error_file_name, violations):
+    with open(error_file_name, "w", encoding="utf-8") as text_file:
+        for key, focus_node, path, message in violations:
+            text_file.write(f"Dataset: {key or 'catalog'}\tFocus node: {focus_node}\tResult path: {path}\tMessage: {message}\n")
@@ -0,0 +1,109 @@
+# inbuilt libraries
+import os
+import time
+import sqlite3
+import logging
+from collections import namedtuple
+
+# custom functions
+from config.log import get_log_module
+from config.defaults import (
+    URL_CACHE_FILE,
+    URL_CACHE_TTL,
+    URL_CACHE_EVICT_AFTER
+)
+
+log_module = get_log_module()
+
+CacheEntry = namedtuple('CacheEntry', ['url', 'ok', 'status', 'checked_at', 'etag', 'last_modified'])
+
+
+class UrlHealthCache:
+    '''
+    On-disk (SQLite) cache of link check results shared across runs, keyed by URL.
+
+    - Reachable URLs checked less than ttl seconds ago are fresh and are not requested again.
+    - Other entries are revalidated: the ETag/Last-Modified of the previous check are sent as
+      If-None-Match/If-Modified-Since, and a 304 answer keeps the cached status.
+    - Unreachable URLs are never fresh, so transient failures are always retried.
+    - Entries not checked for evict_after seconds are deleted when the cache is closed.
+    '''
+
+    def __init__(self, path=URL_CACHE_FILE, ttl=URL_CACHE_TTL, evict_after=URL_CACHE_EVICT_AFTER):
+        self.path = path
+        self.ttl = ttl
+        self.evict_after = evict_after
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        # Shared by concurrent evaluations (controller.batch): WAL so readers are not blocked, and writers wait for the lock
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # One commit by URL: with WAL, NORMAL syncs at checkpoints instead of every commit (a crash may lose the last
+        # entries, never corrupt the cache)
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS url_health (
+                url TEXT PRIMARY KEY,
+                ok INTEGER NOT NULL,
+                status INTEGER,
+                checked_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )""")
+        self.hits = 0
+        self.revalidated = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, url):
+        row = self.connection.execute(
+            "SELECT url, ok, status, checked_at, etag, last_modified FROM url_health WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(row[0], bool(row[1]), row[2], row[3], row[4], row[5])
+
+    def is_fresh(self, entry, now=None):
+        now = time.time() if now is None else now
+        return entry.ok and now - entry.checked_at < self.ttl
+
+    def put(self, result):
+        '''
+        Stores a result, committed at once so the write lock is not held during the next link checks
+        '''
+        try:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO url_health (url, ok, status, checked_at, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?)",
+                (result.url, int(result.ok), result.status, time.time(), result.etag, result.last_modified))
+            self.connection.commit()
+        except sqlite3.OperationalError as e:
+            logging.warning(f"{log_module}:URL cache entry of {result.url} not stored: {e}")
+
+    def evict(self, now=None):
+        now = time.time() if now is None else now
+        deleted = self.connection.execute("DELETE FROM url_health WHERE checked_at < ?", (now - self.evict_after,)).rowcount
+        if deleted:
+            logging.info(f"{log_module}:Evicted {deleted} URL cache entries older than {self.evict_after}s")
+        return deleted
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.evict()
+        self.connection.commit()
+        self.connection.close()
+        self.connection = None
+        logging.info(f"{log_module}:URL cache '{self.path}': {self.hits} fresh entries reused, {self.revalidated} revalidated")
+
+
+def open_url_cache():
+    '''
+    Returns the UrlHealthCache configured in URL_CACHE_FILE, or None if the cache is disabled (empty URL_CACHE_FILE)
+    '''
+    if not URL_CACHE_FILE:
+        return None
+    return UrlHealthCache()
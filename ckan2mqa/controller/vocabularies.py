@@ -0,0 +1,202 @@
+# inbuilt libraries
+import os
+import glob
+import pickle
+import hashlib
+import logging
+from datetime import datetime
+from collections import deque
+
+# custom functions
+from config.log import get_log_module
+
+log_module = get_log_module()
+
+# Separator used to join the vocabulary entries, never found in the CSV values
+ENTRY_SEPARATOR = '\x00'
+
+# Compiled matchers by (app_dir, vocabulary_file, field)
+_matchers = {}
+# Vocabulary bundles by app_dir (None if missing or of another BUNDLE_FORMAT)
+_bundles = {}
+
+# Precompiled matchers of every column of the vocabulary CSV files, written by download_vocabs (compile_bundle)
+BUNDLE_FILE = 'vocabs/vocabularies.bundle'
+# Version of the bundle layout and of VocabularyMatcher, bundles of other versions are ignored
+BUNDLE_FORMAT = 1
+
+
+def load_vocabulary(vocabulary_file, field = 0, app_dir = '/app'):
+    vocabulary = []
+    vocabulary_file_path =  f"{app_dir}/ckan2mqa/assets/{vocabulary_file}"
+    with open(vocabulary_file_path) as fp:
+        for line in fp:
+            words = line.strip().split(',')
+            if len(words) > field:
+                if words[field] != '':
+                    vocabulary.append(words[field])
+    return vocabulary
+
+def load_vocabulary_matcher(vocabulary_file, field = 0, app_dir = '/app'):
+    '''
+    Returns the VocabularyMatcher of a vocabulary file column, from the vocabulary bundle if it is up to date with
+    the file, otherwise compiled from the file. Loaded once and reused by every indicator
+    '''
+    key = (app_dir, vocabulary_file, field)
+    if key not in _matchers:
+        matcher = bundle_matcher(vocabulary_file, field, app_dir)
+        if matcher is None:
+            matcher = VocabularyMatcher(load_vocabulary(vocabulary_file, field, app_dir))
+            logging.debug(f"{log_module}:Compiled vocabulary matcher for {vocabulary_file} (field {field}) with {len(matcher.entries)} entries")
+        _matchers[key] = matcher
+    return _matchers[key]
+
+def bundle_key(vocabulary_file):
+    # '/vocabs/licenses.csv' and 'vocabs/licenses.csv' are the same file
+    return '/' + vocabulary_file.lstrip('/')
+
+def file_digest(path):
+    with open(path, 'rb') as vocabulary_file:
+        return hashlib.sha1(vocabulary_file.read()).hexdigest()
+
+def compile_bundle(app_dir = '/app', sources = None):
+    '''
+    Compiles the matchers of every column of the vocabulary CSV files (assets/vocabs) and writes them to BUNDLE_FILE
+    with the sha1 of each file, so a file changed after the bundle is compiled again from the file.
+    sources: metadata of the downloaded vocabularies (e.g. their ETag/Last-Modified for the next conditional GET)
+    '''
+    files = {}
+    for path in sorted(glob.glob(f"{app_dir}/ckan2mqa/assets/vocabs/*.csv")):
+        vocabulary_file = f"/vocabs/{os.path.basename(path)}"
+        with open(path) as fp:
+            fields = max((len(line.strip().split(',')) for line in fp), default=0)
+        files[vocabulary_file] = {
+            'digest': file_digest(path),
+            'matchers': {field: VocabularyMatcher(load_vocabulary(vocabulary_file, field, app_dir)) for field in range(fields)},
+        }
+    bundle = {
+        'format': BUNDLE_FORMAT,
+        'version': datetime.now().strftime('%Y%m%d%H%M%S'),
+        'sources': sources or {},
+        'files': files,
+    }
+    bundle_file = f"{app_dir}/ckan2mqa/assets/{BUNDLE_FILE}"
+    # Write and rename, so an evaluation never reads a partial bundle
+    temp_file = f"{bundle_file}.{os.getpid()}.tmp"
+    with open(temp_file, 'wb') as fp:
+        pickle.dump(bundle, fp, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_file, bundle_file)
+    _bundles[app_dir] = bundle
+    logging.info(f"{log_module}:Vocabulary bundle {bundle['version']} with {len(files)} vocabularies written to {bundle_file}")
+    return bundle
+
+def load_bundle(app_dir = '/app', cached = True):
+    '''
+    Returns the vocabulary bundle of app_dir, or None if there is no bundle of this BUNDLE_FORMAT
+    '''
+    if cached and app_dir in _bundles:
+        return _bundles[app_dir]
+    bundle = None
+    bundle_file = f"{app_dir}/ckan2mqa/assets/{BUNDLE_FILE}"
+    if os.path.exists(bundle_file):
+        try:
+            with open(bundle_file, 'rb') as fp:
+                bundle = pickle.load(fp)
+            if bundle.get('format') != BUNDLE_FORMAT:
+                logging.info(f"{log_module}:Vocabulary bundle {bundle_file} ignored, format {bundle.get('format')} instead of {BUNDLE_FORMAT}")
+                bundle = None
+        except Exception as e:
+            logging.warning(f"{log_module}:Vocabulary bundle {bundle_file} not loaded: {e}")
+            bundle = None
+    _bundles[app_dir] = bundle
+    return bundle
+
+def bundle_matcher(vocabulary_file, field, app_dir):
+    '''
+    Matcher of the vocabulary bundle, None if there is no bundle or the file changed after it was compiled
+    '''
+    bundle = load_bundle(app_dir)
+    entry = bundle['files'].get(bundle_key(vocabulary_file)) if bundle else None
+    if entry is None or field not in entry['matchers']:
+        return None
+    if file_digest(f"{app_dir}/ckan2mqa/assets/{vocabulary_file}") != entry['digest']:
+        logging.info(f"{log_module}:{vocabulary_file} changed after the vocabulary bundle {bundle['version']}, compiled from the file")
+        return None
+    return entry['matchers'][field]
+
+
+class VocabularyMatcher:
+    '''
+    Compiled, case-insensitive version of contains_vocabulary_word/contains_word_vocabulary.
+
+    - contains_vocabulary_word: the word is a substring of any entry. Exact matches are answered by a set,
+      the rest by a single search over all the entries joined with ENTRY_SEPARATOR.
+    - contains_word_vocabulary: any entry is a substring of the word. Exact matches are answered by a set,
+      the rest by an Aho-Corasick automaton of all the entries, so each word is scanned once.
+    '''
+
+    def __init__(self, vocabulary):
+        self.entries = [value.lower() for value in vocabulary]
+        self.exact = set(self.entries)
+        self.has_empty_entry = '' in self.exact
+        self.haystack = ENTRY_SEPARATOR.join(self.entries)
+        self._build_automaton([entry for entry in self.exact if entry])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def _build_automaton(self, patterns):
+        # goto transitions, failure links and terminal flags (a state is terminal if any of its suffixes is a pattern)
+        self.goto = [{}]
+        self.fail = [0]
+        self.terminal = [False]
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.terminal.append(False)
+                    self.goto[state][char] = next_state
+                state = next_state
+            self.terminal[state] = True
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                self.terminal[next_state] = self.terminal[next_state] or self.terminal[self.fail[next_state]]
+
+    def contains_vocabulary_word(self, word):
+        word = word.lower()
+        if not self.entries:
+            return False
+        if word in self.exact:
+            return True
+        if ENTRY_SEPARATOR in word:
+            return any(word in value for value in self.entries)
+        return word in self.haystack
+
+    def contains_word_vocabulary(self, word):
+        word = word.lower()
+        if self.has_empty_entry or word in self.exact:
+            return True
+        goto, fail, terminal = self.goto, self.fail, self.terminal
+        state = 0
+        for char in word:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if terminal[state]:
+                return True
+        return False